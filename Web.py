@@ -1,169 +1,352 @@
-from flask import Flask, request, render_template
-import os
-import json
 import asyncio
-import aiohttp
-import re
-import subprocess
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from dataclasses import dataclass
+from multiprocessing.connection import wait
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Union
+from urllib.parse import parse_qs, urlencode
 
-# --- START of ReconDora Logic (Centralized for Web & Bot) ---
+import jinja2
 
-# ==============================================================================
-# 1. API-BASED TOOLS (HackerTarget)
-# ==============================================================================
-ENDPOINTS = {
-    "hostsearch": "https://api.hackertarget.com/hostsearch/?q=",
-    "dnslookup": "https://api.hackertarget.com/dnslookup/?q=",
-    "whois": "https://api.hackertarget.com/whois/?q=",
-    "geoip": "https://api.hackertarget.com/geoip/?q=",
-    "reverseiplookup": "https://api.hackertarget.com/reverseiplookup/?q=",
-    "findshareddns": "https://api.hackertarget.com/findshareddns/?q=",
-    "zonetransfer": "https://api.hackertarget.com/zonetransfer/?q=",
-    "httpheaders": "https://api.hackertarget.com/httpheaders/?q=",
-    "pagelinks": "https://api.hackertarget.com/pagelinks/?q=",
-    "nmap": "https://api.hackertarget.com/nmap/?q=",
-    "mtr": "https://api.hackertarget.com/mtr/?q=",
-    "aslookup": "https://api.hackertarget.com/aslookup/?q="
-}
+from services import http_client, metrics
+# The tool definitions live in recon_tools.py; re-exported here for existing importers
+from recon_tools import ENDPOINTS, TOOL_DESCRIPTIONS, TOOL_GROUPS, LOCAL_TOOLS, fetch_tool, run_local_tool, iter_recon_results, resolve_tools_from_args
 
-TOOL_DESCRIPTIONS = {
-    "hostsearch": "Finds hostnames and subdomains using the same name server.",
-    "dnslookup": "Performs a standard DNS lookup for the target.",
-    "whois": "Retrieves WHOIS registration data for a domain.",
-    "geoip": "Finds the geographical location of an IP address.",
-    "reverseiplookup": "Finds hostnames sharing the same IP address.",
-    "findshareddns": "Finds hosts that share the same DNS servers.",
-    "zonetransfer": "Attempts a DNS zone transfer for the domain.",
-    "httpheaders": "Retrieves the HTTP response headers from the target.",
-    "pagelinks": "Scrapes a page for all links, both internal and external.",
-    "nmap": "Runs a quick Nmap port scan on the target.",
-    "mtr": "Performs an MTR traceroute to the target.",
-    "aslookup": "Looks up the Autonomous System (AS) number for the target."
-}
+# Also configures the spawned workers, which import this module but never run start()
+logging.basicConfig(format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO)
+logger = logging.getLogger(__name__)
 
-TOOL_GROUPS = {
-    "basic": ["hostsearch", "dnslookup", "whois"],
-    "network": ["nmap", "mtr", "geoip", "aslookup"],
-    "web": ["httpheaders", "pagelinks"],
-    "dns": ["hostsearch", "dnslookup", "findshareddns", "zonetransfer", "reverseiplookup"],
-    "all": list(ENDPOINTS.keys())
-}
+# --- Server Configuration ---
+PORT = int(os.environ.get("PORT", 8000))
+WEB_WORKERS = int(os.environ.get("WEB_CONCURRENCY", "2"))         # Worker processes hypercorn spawns
+# Seconds in-flight requests get to finish after SIGTERM; Heroku kills the dyno 30s after sending it
+GRACEFUL_TIMEOUT = float(os.environ.get("WEB_GRACEFUL_TIMEOUT", "25"))
+SSE_KEEPALIVE = 15     # Seconds between comment lines on an idle stream, so proxies keep it open
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
 
-# ==============================================================================
-# 2. LOCAL COMMAND-LINE TOOLS
-# ==============================================================================
-LOCAL_TOOLS = {
-    "local_ping": {
-        "name": "Ping",
-        "description": "Sends 4 ICMP packets to the target to check for reachability.",
-        "command": ["ping", "-c", "4", "{target}"]
-    },
-    "local_curl_headers": {
-        "name": "Curl Headers",
-        "description": "Fetches HTTP headers using the curl command.",
-        "command": ["curl", "-I", "--silent", "{target}"]
-    },
-}
+_templates = jinja2.Environment(
+    loader=jinja2.FileSystemLoader(TEMPLATES_DIR),
+    autoescape=jinja2.select_autoescape(["html"]),
+    enable_async=True,
+)
 
-# ==============================================================================
-# 3. CORE EXECUTOR LOGIC
-# ==============================================================================
 
-# --- API Tool Executor ---
-async def fetch_tool(session: aiohttp.ClientSession, domain: str, tool: str) -> tuple[str, str]:
-    try:
-        url = ENDPOINTS[tool] + domain
-        headers = {'User-Agent': 'Doraemon-Cyber-Tool/1.0'}
-        async with session.get(url, timeout=45, headers=headers) as resp:
-            resp.raise_for_status()
-            text_content = await resp.text()
-            if "error check your search query" in text_content:
-                return tool, "API Error: Invalid domain or query."
-            return tool.strip(), text_content.strip()
-    except aiohttp.ClientError as e:
-        return tool, f"[API Request Error] {e}"
-    except asyncio.TimeoutError:
-        return tool, "[API Request Error] Request timed out after 45 seconds."
-    except Exception as e:
-        return tool, f"[Unexpected Error] {e}"
-
-# --- Local Tool Executor ---
-async def run_local_tool(target: str, tool_key: str) -> tuple[str, str]:
-    tool_config = LOCAL_TOOLS.get(tool_key)
-    tool_name = tool_config.get("name", tool_key)
-
-    if not re.match(r"^[a-zA-Z0-9.-]+$", target):
-        return tool_name, f"[Validation Error] Invalid target format: {target}"
+@dataclass
+class Request:
+    method: str
+    path: str
+    query: Dict[str, List[str]]
 
-    try:
-        command_to_run = [arg.replace("{target}", target) for arg in tool_config["command"]]
-        process = await asyncio.create_subprocess_exec(
-            *command_to_run,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=60)
-        output = (stdout.decode('utf-8', errors='ignore') + stderr.decode('utf-8', errors='ignore')).strip()
-        
-        if not output:
-            output = "[No output from command]"
-        return tool_name, output
-    except FileNotFoundError:
-        return tool_name, f"[Execution Error] Command not found: '{tool_config['command'][0]}'. Is it installed and in your PATH?"
-    except asyncio.TimeoutError:
-        return tool_name, "[Execution Error] Command timed out after 60 seconds."
-    except Exception as e:
-        return tool_name, f"[Unexpected Execution Error] {str(e)}"
-
-# --- END of Core Logic ---
-
-# Create a Flask app instance
-app = Flask(__name__)
-
-@app.route('/')
-def home():
+    def arg(self, name: str) -> Optional[str]:
+        values = self.query.get(name)
+        return values[0] if values else None
+
+    def args(self, name: str) -> List[str]:
+        return self.query.get(name, [])
+
+
+@dataclass
+class Response:
+    body: str
+    content_type: str = "text/html; charset=utf-8"
+    status: int = 200
+
+
+@dataclass
+class StreamingResponse:
+    """A response sent chunk by chunk as `chunks` yields them (Server-Sent Events)."""
+    chunks: AsyncIterator[str]
+    content_type: str = "text/event-stream; charset=utf-8"
+    status: int = 200
+
+
+async def render_template(name: str, **context) -> Response:
+    return Response(await _templates.get_template(name).render_async(**context))
+
+
+def json_response(payload, status: int = 200) -> Response:
+    return Response(json.dumps(payload, ensure_ascii=False), "application/json; charset=utf-8", status)
+
+
+def _selected_tools(request: Request) -> List[str]:
+    """The ?tools= of a recon request with groups expanded, in the order the tools are defined."""
+    # Group names (basic, dns, all, ...) expand like in the bot; nothing selected means "basic"
+    selected = resolve_tools_from_args(request.args('tools'))
+    return [key for key in list(ENDPOINTS) + list(LOCAL_TOOLS) if key in selected]
+
+
+def _tool_name(tool_key: str) -> str:
+    return LOCAL_TOOLS[tool_key]["name"] if tool_key in LOCAL_TOOLS else tool_key
+
+
+# ==============================================================================
+# Routes
+# ==============================================================================
+async def home(request: Request) -> Response:
     """Renders the main page with a form to run recon."""
     default_tools = TOOL_GROUPS.get('basic', [])
-    return render_template(
-        "index.html", 
+    return await render_template(
+        "index.html",
         tool_descriptions=TOOL_DESCRIPTIONS,
         local_tools=LOCAL_TOOLS,
         default_tools=default_tools
     )
 
-@app.route('/recondora')
-async def run_recondora_web():
-    """API endpoint to run recon and display results in HTML."""
-    domain = request.args.get('domain')
-    selected_tools = request.args.getlist('tools')
 
+async def run_recondora_web(request: Request) -> Response:
+    """
+    The results page. It is sent at once with a placeholder per tool; the page's script fills
+    them in from /recondora/stream as each tool finishes.
+    """
+    domain = request.arg('domain')
     if not domain:
-        return render_template("results.html", domain="Error", results=[("Error", "A 'domain' query parameter is required.")])
-    
-    if not selected_tools:
-        selected_tools = TOOL_GROUPS['basic']
+        return await render_template("results.html", domain="Error", results=[("Error", "A 'domain' query parameter is required.")], pending=[])
+
+    tools = _selected_tools(request)
+    query = urlencode([("domain", domain)] + [("tools", key) for key in tools])
+    return await render_template(
+        "results.html",
+        domain=domain,
+        results=[],
+        pending=[(key, _tool_name(key)) for key in tools],
+        stream_url=f"/recondora/stream?{query}",
+        api_url=f"/api/recondora?{query}",
+    )
 
-    api_tasks = []
-    local_tasks = []
 
-    for tool_key in selected_tools:
-        if tool_key in ENDPOINTS:
-            api_tasks.append(tool_key)
-        elif tool_key in LOCAL_TOOLS:
-            local_tasks.append(tool_key)
+async def _recon_events(domain: str, tools: List[str]) -> AsyncIterator[str]:
+    """SSE events: one `result` per tool as it finishes, then `done`. Idle gaps get keep-alive comments."""
+    started = time.monotonic()
+    # The worker's app-lifetime pool (or the bot's, when webhook.py serves both)
+    results = iter_recon_results(domain, tools, http_client.get_session())
+    count = 0
+    try:
+        next_result = asyncio.ensure_future(results.__anext__())
+        while True:
+            done, _ = await asyncio.wait({next_result}, timeout=SSE_KEEPALIVE)
+            if not done:
+                yield ": keep-alive\n\n"
+                continue
+            try:
+                tool_key, name, output = next_result.result()
+            except StopAsyncIteration:
+                break
+            count += 1
+            yield f"event: result\ndata: {json.dumps({'tool': tool_key, 'name': name, 'output': output}, ensure_ascii=False)}\n\n"
+            next_result = asyncio.ensure_future(results.__anext__())
+        yield f"event: done\ndata: {json.dumps({'count': count, 'elapsed': round(time.monotonic() - started, 2)})}\n\n"
+    finally:
+        # The client went away (or the server is stopping): cancel the tools still running
+        next_result.cancel()
+        await asyncio.gather(next_result, return_exceptions=True)
+        await results.aclose()
 
-    async with aiohttp.ClientSession() as session:
-        api_coroutines = [fetch_tool(session, domain, tool) for tool in api_tasks]
-        local_coroutines = [run_local_tool(domain, tool_key) for tool_key in local_tasks]
-        results = await asyncio.gather(*api_coroutines, *local_coroutines)
-    
-    return render_template("results.html", domain=domain, results=results)
+
+async def recondora_stream(request: Request) -> Union[Response, StreamingResponse]:
+    """Server-Sent Events stream of recon results, pushed as each tool finishes."""
+    domain = request.arg('domain')
+    if not domain:
+        return json_response({"error": "A 'domain' query parameter is required."}, 400)
+    return StreamingResponse(_recon_events(domain, _selected_tools(request)))
+
+
+async def recondora_api(request: Request) -> Response:
+    """JSON API: every selected tool's output once all of them have finished."""
+    domain = request.arg('domain')
+    if not domain:
+        return json_response({"error": "A 'domain' query parameter is required."}, 400)
+    tools = _selected_tools(request)
+    started = time.monotonic()
+    results = [
+        {"tool": tool_key, "name": name, "output": output}
+        async for tool_key, name, output in iter_recon_results(domain, tools, http_client.get_session())
+    ]
+    return json_response({"domain": domain, "tools": tools, "elapsed": round(time.monotonic() - started, 2), "results": results})
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    """Prometheus metrics of this process and of the bot (which publishes them under persistence_data/)."""
+    return Response(metrics.REGISTRY.render(), content_type="text/plain; version=0.0.4")
+
+
+ROUTES: Dict[str, Callable[[Request], Awaitable[Union[Response, StreamingResponse]]]] = {
+    "/": home,
+    "/recondora": run_recondora_web,
+    "/recondora/stream": recondora_stream,
+    "/api/recondora": recondora_api,
+    "/metrics": metrics_endpoint,
+}
+
+
+# ==============================================================================
+# ASGI application
+# ==============================================================================
+async def _send_response(send, response: Response, head: bool = False) -> None:
+    body = response.body.encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": response.status,
+        "headers": [(b"content-type", response.content_type.encode()), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": b"" if head else body})
+
+
+async def _send_stream(receive, send, response: StreamingResponse, head: bool = False) -> None:
+    await send({
+        "type": "http.response.start",
+        "status": response.status,
+        "headers": [(b"content-type", response.content_type.encode()), (b"cache-control", b"no-cache"),
+                    (b"x-accel-buffering", b"no")],  # Tells nginx-style proxies not to buffer the stream
+    })
+
+    async def pump() -> None:
+        async for chunk in response.chunks:
+            await send({"type": "http.response.body", "body": chunk.encode("utf-8"), "more_body": True})
+
+    async def wait_for_disconnect() -> None:
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    if not head:
+        pumping = asyncio.ensure_future(pump())
+        watching = asyncio.ensure_future(wait_for_disconnect())
+        try:
+            await asyncio.wait({pumping, watching}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in (pumping, watching):
+                task.cancel()
+            await asyncio.gather(pumping, watching, return_exceptions=True)
+        if pumping.done() and not pumping.cancelled() and pumping.exception() is not None:
+            logger.error("Stream failed", exc_info=pumping.exception())
+    await response.chunks.aclose()
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def _handle_http(scope, receive, send) -> None:
+    route = ROUTES.get(scope["path"])
+    if route is None:
+        await _send_response(send, Response("Not Found", "text/plain", 404))
+        return
+    if scope["method"] not in ("GET", "HEAD"):
+        await _send_response(send, Response("Method Not Allowed", "text/plain", 405))
+        return
+
+    request = Request(scope["method"], scope["path"], parse_qs(scope.get("query_string", b"").decode("latin-1")))
+    try:
+        response = await route(request)
+    except asyncio.CancelledError:
+        raise  # The client went away or the server is shutting down
+    except Exception:
+        logger.exception(f"Unhandled error in {scope['path']}")
+        response = Response("Internal Server Error", "text/plain", 500)
+    if isinstance(response, StreamingResponse):
+        await _send_stream(receive, send, response, head=scope["method"] == "HEAD")
+    else:
+        await _send_response(send, response, head=scope["method"] == "HEAD")
+
+
+async def startup() -> None:
+    # One pooled session per worker for its whole lifetime, bound to the worker's loop
+    http_client.get_session()
+    if WEB_WORKERS > 1:
+        # Each worker publishes its own snapshot, so /metrics shows all of them whichever one answers
+        metrics.start_runtime_metrics(f"web-{os.getpid()}")
+
+
+async def shutdown() -> None:
+    await metrics.stop_runtime_metrics()
+    await http_client.close_session()
+
+
+async def app(scope, receive, send) -> None:
+    """The web UI as an ASGI application (served by hypercorn; mounted by webhook.py in webhook mode)."""
+    if scope["type"] == "http":
+        await _handle_http(scope, receive, send)
+    elif scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await startup()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+def _serve_workers(config) -> int:
+    """
+    Runs config.workers hypercorn worker processes on shared sockets until SIGTERM/SIGINT.
+    Replaces hypercorn.run.run, which terminates the remaining workers as soon as the first one
+    exits: an idle worker stops at once and a busy one would be killed mid-request. Here every
+    worker is told to stop and then joined, so each gets GRACEFUL_TIMEOUT for its requests.
+    """
+    # asyncio_worker is hypercorn's internal per-process entry point (what hypercorn.run.run spawns);
+    # it is not public API, hence the exact hypercorn pin in requirements.txt
+    from hypercorn.asyncio.run import asyncio_worker
+
+    sockets = config.create_sockets()
+    ctx = multiprocessing.get_context("spawn")
+    shutdown_event = ctx.Event()
+
+    def spawn():
+        # Workers inherit ignored signals: Heroku sends SIGTERM to every process of the dyno,
+        # and only this process should react to it (by setting shutdown_event)
+        handlers = {sig: signal.signal(sig, signal.SIG_IGN) for sig in (signal.SIGINT, signal.SIGTERM)}
+        try:
+            worker = ctx.Process(target=asyncio_worker, kwargs={"config": config, "sockets": sockets, "shutdown_event": shutdown_event})
+            worker.start()
+        finally:
+            for sig, handler in handlers.items():
+                signal.signal(sig, handler)
+        return worker
+
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: shutdown_event.set())
+    workers = [spawn() for _ in range(config.workers)]
+
+    exitcode = 0
+    while not shutdown_event.is_set():
+        for finished in wait([worker.sentinel for worker in workers], timeout=1):
+            worker = next(w for w in workers if w.sentinel == finished)
+            worker.join()
+            workers.remove(worker)
+            if worker.exitcode != 0 and not shutdown_event.is_set():
+                logger.error(f"Web worker {worker.pid} exited with code {worker.exitcode}; shutting down.")
+                exitcode = worker.exitcode
+                shutdown_event.set()
+            elif not shutdown_event.is_set():
+                workers.append(spawn())  # Recycled (hypercorn's max_requests); keep the pool full
+
+    logger.info(f"Shutting down: waiting up to {config.graceful_timeout:.0f}s for requests in flight.")
+    for worker in workers:
+        worker.join()
+    for sock in sockets.secure_sockets + sockets.insecure_sockets:
+        sock.close()
+    return exitcode
 
 
 def start():
-    """This function starts the simple web server."""
-    port = int(os.environ.get("PORT", 8000))
-    app.run(host="0.0.0.0", port=port)
+    """
+    Serves the web UI with hypercorn: WEB_CONCURRENCY worker processes share the port, and on
+    SIGTERM/SIGINT they stop accepting, let in-flight requests finish (up to WEB_GRACEFUL_TIMEOUT)
+    and close their HTTP pools.
+    """
+    from hypercorn.config import Config
+
+    config = Config()
+    config.application_path = "Web:app"
+    config.bind = [f"0.0.0.0:{PORT}"]
+    config.workers = WEB_WORKERS
+    config.graceful_timeout = GRACEFUL_TIMEOUT
+    config.accesslog = None
+    logger.info(f"Serving the web UI on port {PORT} with {WEB_WORKERS} worker(s).")
+    return _serve_workers(config)
 
 if __name__ == "__main__":
-    start()
+    sys.exit(start())
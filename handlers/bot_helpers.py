@@ -1,38 +1,54 @@
 # 666-main/handlers/bot_helpers.py
 
 from typing import Set
-# Import tool definitions for argument processing
-from Web import TOOL_GROUPS, ENDPOINTS, LOCAL_TOOLS
+# Tool group resolution is shared with the web UI
+from recon_tools import resolve_tools_from_args
 # Import templates for report formatting
 from . import bot_templates
+from services.message_chunker import Block, Markup, iter_chunks
+from services.progress import ProgressReporter
+from utils import escape_markdown_v2
 
-def resolve_tools_from_args(args: list[str]) -> Set[str]:
+def format_telegram_report(domain: str, results: list[tuple[str, str]]) -> list[Block]:
     """
-    Resolves a list of user-provided arguments into a final set of tools to run.
-    Handles tool groups and individual tool keys.
+    Builds the final report as MarkdownV2 blocks for send_long_message to chunk.
     """
-    # If no tools are specified, default to the 'basic' group.
-    selected_keys = args if args else ['basic']
-    
-    tools_to_run = set()
-    for key in selected_keys:
-        key = key.lower()
-        if key in TOOL_GROUPS:
-            tools_to_run.update(TOOL_GROUPS[key])
-        elif key in ENDPOINTS or key in LOCAL_TOOLS:
-            tools_to_run.add(key)
-            
-    return tools_to_run
-
-def format_telegram_report(domain: str, results: list[tuple[str, str]]) -> str:
-    """
-    Builds the final, formatted report string to be sent to Telegram.
-    """
-    report_parts = [bot_templates.format_report_header(domain)]
+    report_blocks: list[Block] = [Markup(bot_templates.format_report_header(domain))]
     
     for tool_name, result_text in results:
-        report_parts.append(
+        report_blocks.extend(
             bot_templates.format_report_section(tool_name, result_text)
         )
         
-    return "".join(report_parts)
+    return report_blocks
+
+
+class RecondoraProgress(ProgressReporter):
+    """
+    Status message for /recondora that grows by one report section per finished tool.
+    Edits are throttled by ProgressReporter; sections that no longer fit in one message
+    wait for the final report.
+    """
+
+    def __init__(self, message, domain: str, tools: Set[str]):
+        super().__init__(message, title="")
+        self.domain = domain
+        self.pending = set(tools)
+        self.total = len(tools)
+        self.sections: list[Block] = []
+
+    def add_result(self, tool_key: str, tool_name: str, result_text: str) -> None:
+        self.pending.discard(tool_key)
+        self.sections.extend(bot_templates.format_report_section(tool_name, result_text))
+        self.refresh()
+
+    def render(self) -> str:
+        done = self.total - len(self.pending)
+        status = f"⏳ {done}/{self.total} tools done"
+        if self.pending:
+            status += f" · waiting for: {', '.join(sorted(self.pending))}"
+        blocks = [
+            Markup(bot_templates.format_report_header(self.domain) + "\n" + escape_markdown_v2(status)),
+            *self.sections,
+        ]
+        return next(iter_chunks(blocks))
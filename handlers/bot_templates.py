@@ -1,9 +1,10 @@
 # 666-main/handlers/bot_templates.py
 
 from utils import escape_markdown_v2
+from services.message_chunker import Block, Markup, Pre
 
 # Import tool definitions to build the help text dynamically
-from Web import ENDPOINTS, LOCAL_TOOLS
+from recon_tools import ENDPOINTS, LOCAL_TOOLS
 
 def get_recondora_help_text() -> str:
     """Generates the detailed help message for the /recondora command."""
@@ -32,7 +33,7 @@ def format_report_header(domain: str) -> str:
     escaped_domain = escape_markdown_v2(domain)
     return f">_ *Recon Report for `{escaped_domain}`*"
 
-def format_report_section(tool_name: str, result_text: str) -> str:
-    """Formats a single tool's section in the report."""
-    # The result_text is inside a code block, so it doesn't need escaping.
-    return f"\n\n*{escape_markdown_v2(f'[{tool_name.upper()}]')}*\n```\n{result_text}\n```"
+def format_report_section(tool_name: str, result_text: str) -> list[Block]:
+    """Formats a single tool's section in the report as a heading and a code block."""
+    # The code block is escaped when the report is chunked, so backticks in tool output are safe
+    return [Markup(f"\n\n*{escape_markdown_v2(f'[{tool_name.upper()}]')}*\n"), Pre(result_text)]
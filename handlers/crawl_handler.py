@@ -4,6 +4,7 @@ from telegram.ext import ContextTypes
 from services.crawler import AdvancedCrawler
 from services.injection_scanner import scan_for_injections
 from services.report_generator import generate_vulnerability_report
+from handlers.pager import send_paged
 
 logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -53,15 +54,8 @@ async def crawl_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # Generate report
         report = generate_vulnerability_report(vulnerabilities)
         
-        # Send results
-        await context.bot.edit_message_text(
-            chat_id=update.effective_chat.id,
-            message_id=msg.message_id,
-            text=report[:4000]  # Telegram message limit
-        )
-        
-        if len(report) > 4000:
-            await update.effective_chat.send_message(report[4000:8000])
+        # Send results; long reports get ◀ ▶ buttons instead of being cut off
+        await send_paged(update, report, edit=msg)
             
     except Exception as e:
         logger.error(f"Crawl error: {str(e)}")
@@ -4,13 +4,16 @@ import base64
 import hashlib
 import urllib.parse
 import json
-import requests
 import re
+import asyncio
+import aiohttp
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 from telegram.constants import ParseMode
 from typing import Optional, Tuple, Any
 from utils import escape_markdown_v2, send_long_message # Added send_long_message for consistency
+from services.http_client import get_session, track_endpoint
+from services.result_cache import result_cache
 
 # --- API Configuration ---
 USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
@@ -18,18 +21,32 @@ BREACH_API_URL = "https://atelegramuser.wuaze.com/email-leaked.php"
 CMS_API_URL = "https://tools.prinsh.com/API/cms-scan.php"
 ANALYSE_API_URL = "https://api.webtech.sh/api/v1/technologies"
 EXTRACT_EMAIL_API_URL = "https://tools.prinsh.com/API/email.php"
+track_endpoint("breach", BREACH_API_URL)
+track_endpoint("cms", CMS_API_URL)
+track_endpoint("webtech", ANALYSE_API_URL)
+track_endpoint("extract_email", EXTRACT_EMAIL_API_URL)
 
 # --- Internal Helper Functions ---
-def _make_api_request(url: str, params: dict) -> Tuple[Optional[Any], Optional[str]]:
+async def _fetch_api(url: str, params: dict) -> Any:
     headers = {'User-Agent': USER_AGENT}
-    try:
-        response = requests.get(url, params=params, headers=headers, timeout=45)
+    async with get_session().get(url, params=params, headers=headers, timeout=aiohttp.ClientTimeout(total=45)) as response:
         response.raise_for_status()
         if 'application/json' in response.headers.get('content-type', ''):
-            return response.json(), None
-        return response.text, None
-    except requests.RequestException as e:
-        return None, f"An API error occurred: {e}"
+            return await response.json()
+        return await response.text()
+
+async def _make_api_request(url: str, params: dict, cache_tool: Optional[str] = None) -> Tuple[Optional[Any], Optional[str]]:
+    """
+    GETs the API and returns (result, error). With cache_tool set, successful answers are
+    cached per (cache_tool, first parameter value) in the shared result cache.
+    """
+    try:
+        if cache_tool:
+            target = next(iter(params.values()))
+            return await result_cache.get_or_fetch(cache_tool, target, lambda: _fetch_api(url, params)), None
+        return await _fetch_api(url, params), None
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+        return None, f"An API error occurred: {str(e) or 'Request timed out.'}"
 
 def _strip_html(text: str) -> str:
     return re.sub('<[^<]+?>', '', text)
@@ -101,7 +118,7 @@ async def breach_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     email, escaped_email = context.args[0], escape_markdown_v2(context.args[0])
     # **FIX APPLIED HERE**: Escaped the "..."
     await update.message.reply_text(f"🔐 Checking `{escaped_email}` for breaches{escape_markdown_v2('...')}", parse_mode=ParseMode.MARKDOWN_V2)
-    api_result, error_msg = _make_api_request(BREACH_API_URL, {'email': email})
+    api_result, error_msg = await _make_api_request(BREACH_API_URL, {'email': email})
 
     if error_msg:
         await update.message.reply_text(f"❌ Error: {escape_markdown_v2(error_msg)}", parse_mode=ParseMode.MARKDOWN_V2)
@@ -144,7 +161,7 @@ async def cms_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
     url, escaped_url = context.args[0], escape_markdown_v2(context.args[0])
     # **FIX APPLIED HERE**: Escaped the "..."
     await update.message.reply_text(f"🔍 Scanning `{escaped_url}` for CMS info{escape_markdown_v2('...')}", parse_mode=ParseMode.MARKDOWN_V2)
-    api_result, error_msg = _make_api_request(CMS_API_URL, {'url': url})
+    api_result, error_msg = await _make_api_request(CMS_API_URL, {'url': url}, cache_tool="cms")
     if error_msg:
         await update.message.reply_text(f"❌ Error: {escape_markdown_v2(error_msg)}", parse_mode=ParseMode.MARKDOWN_V2)
         return
@@ -163,7 +180,7 @@ async def analyse_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     url, escaped_url = context.args[0], escape_markdown_v2(context.args[0])
     # **FIX APPLIED HERE**: Escaped the "..."
     await update.message.reply_text(f"🔬 Analysing `{escaped_url}`{escape_markdown_v2('...')}", parse_mode=ParseMode.MARKDOWN_V2)
-    api_result, error_msg = _make_api_request(ANALYSE_API_URL, {'url': url})
+    api_result, error_msg = await _make_api_request(ANALYSE_API_URL, {'url': url}, cache_tool="analyse")
     if error_msg:
         await update.message.reply_text(f"❌ Analysis Error: {escape_markdown_v2(error_msg)}", parse_mode=ParseMode.MARKDOWN_V2)
         return
@@ -193,7 +210,7 @@ async def extract_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     url, escaped_url = context.args[0], escape_markdown_v2(context.args[0])
     # **FIX APPLIED HERE**: Escaped the "..."
     await update.message.reply_text(f"📭 Extracting emails from `{escaped_url}`{escape_markdown_v2('...')}", parse_mode=ParseMode.MARKDOWN_V2)
-    api_result, error_msg = _make_api_request(EXTRACT_EMAIL_API_URL, {'url': url})
+    api_result, error_msg = await _make_api_request(EXTRACT_EMAIL_API_URL, {'url': url})
     if error_msg:
         await update.message.reply_text(f"❌ Extraction Error: {escape_markdown_v2(error_msg)}", parse_mode=ParseMode.MARKDOWN_V2)
         return
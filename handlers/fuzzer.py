@@ -1,6 +1,5 @@
 import asyncio
 import concurrent.futures
-import requests
 import os
 import logging
 import hashlib
@@ -16,6 +15,9 @@ from telegram.ext import (
     filters,
 )
 
+from utils import scheduled_job
+from services.job_scheduler import QueueFullError
+
 # --- Constants ---
 UPLOAD_DIR = 'uploads'
 AWAIT_FILE = 0
@@ -26,6 +28,7 @@ logger = logging.getLogger(__name__)
 
 # --- Core Fuzzer Logic (Unchanged) ---
 def check_url(session, target_url):
+    import requests  # Imported by the first fuzz run, not when the bot starts (main.py registers these handlers eagerly)
     try:
         with session.get(target_url, timeout=10, allow_redirects=False, stream=True) as response:
             if response.status_code != 404:
@@ -35,12 +38,13 @@ def check_url(session, target_url):
     return None
 
 def run_directory_fuzzer(base_url, wordlist_path, threads=50):
+    from services.http_client import create_requests_session
     if not os.path.exists(wordlist_path):
         raise FileNotFoundError(f"Wordlist not found at: {wordlist_path}")
     with open(wordlist_path, 'r', errors='ignore') as f:
         words = [line.strip() for line in f if line.strip()]
     found_results = []
-    with requests.Session() as session:
+    with create_requests_session() as session:
         with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as executor:
             futures = {executor.submit(check_url, session, f"{base_url}/{word}"): word for word in words}
             for future in concurrent.futures.as_completed(futures):
@@ -76,7 +80,8 @@ async def fuzz_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
 
     try:
         status_message = await context.bot.send_message(chat_id, f"🚀 Starting fuzzer on {target_url}...")
-        found_paths = await asyncio.to_thread(run_directory_fuzzer, target_url, wordlist_file)
+        async with scheduled_job(update, "fuzz"):
+            found_paths = await asyncio.to_thread(run_directory_fuzzer, target_url, wordlist_file)
         # ... (reporting logic remains the same) ...
         if not found_paths:
             result_text = f"✅ Fuzzing complete on {target_url}.\n\nNo directories or files found."
@@ -89,6 +94,8 @@ async def fuzz_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         await status_message.edit_text(result_text, parse_mode='HTML')
     except FileNotFoundError as e:
         await status_message.edit_text(f"❌ Error: {e}")
+    except QueueFullError as e:
+        await status_message.edit_text(f"🚦 {e}")
     except Exception as e:
         await status_message.edit_text(f"❌ An unexpected error occurred: {e}")
         logger.error(f"Fuzzer error: {e}", exc_info=True)
@@ -234,7 +241,7 @@ def register_handlers(application: Application):
     )
     
     application.add_handler(conv_handler)
-    application.add_handler(CommandHandler("fuzz", fuzz_command))
+    application.add_handler(CommandHandler("fuzz", fuzz_command, block=False))  # Waits in the job scheduler's queue
     
     # --- Schedule the daily cleanup job ---
     job_queue = application.job_queue
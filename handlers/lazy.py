@@ -0,0 +1,34 @@
+# handlers/lazy.py
+
+import asyncio
+import importlib
+import logging
+import time
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+def lazy_callback(target: str) -> Callable[..., Awaitable]:
+    """
+    A handler callback for "module:function" that imports the module the first time it is called.
+    main.py registers the rarely used commands with these, so starting the bot does not import
+    their dependencies (aiohttp, dnspython, whois, bs4 ...) before the first update is served.
+    The import runs in a worker thread; the event loop keeps serving other chats meanwhile.
+    """
+    module_name, _, name = target.partition(":")
+    callback = None
+
+    async def load_and_call(update, context):
+        nonlocal callback
+        if callback is None:
+            started = time.monotonic()
+            module = await asyncio.to_thread(importlib.import_module, module_name)
+            callback = getattr(module, name)
+            logger.info(f"Loaded {module_name} for {name} in {time.monotonic() - started:.2f}s")
+        return await callback(update, context)
+
+    # Handler listings and the stall monitor show the real callback's name
+    load_and_call.__name__ = load_and_call.__qualname__ = name
+    load_and_call.__module__ = module_name
+    return load_and_call
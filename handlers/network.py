@@ -1,47 +1,56 @@
 # handlers/network.py
 
-import whois
 import dns.resolver
-import subprocess
 import re
-import requests
-from datetime import datetime
+import asyncio
+import aiohttp
 from telegram import Update
 from telegram.ext import ContextTypes
 from telegram.constants import ParseMode
 from typing import Optional, Tuple, Any, Dict, List
-from utils import escape_markdown_v2, send_long_message, is_tool_installed
+from utils import escape_markdown_v2, send_long_message, is_tool_installed, scheduled_job
+from services.api_quota import HACKERTARGET_QUERY_ERROR, HACKERTARGET_URL, QuotaExceededError, hackertarget_get, hackertarget_ttl
+from services.http_client import get_session
+from services.message_chunker import Markup, Pre
+from handlers.pager import send_paged
+from services.result_cache import result_cache
+from services import dns_resolver
+from services.whois_lookup import lookup_whois
+from services.job_scheduler import QueueFullError
+from services.process_supervisor import run_tool
+from services.progress import ProgressReporter, parse_nmap_line, parse_rustscan_line, without_status_lines
 
 # --- Config ---
 USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-REV_IP_API_URL = "https://api.hackertarget.com/reverseiplookup/"
+REV_IP_API_URL = f"{HACKERTARGET_URL}/reverseiplookup/"
 
 # --- Internal Helper for /headers ---
-def _get_header_data(domain: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+async def _get_header_data(domain: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
     try:
-        ipv4 = [ip.to_text() for ip in dns.resolver.resolve(domain, 'A')]
+        ipv4, ipv6_result = await asyncio.gather(
+            dns_resolver.resolve(domain, 'A'),
+            dns_resolver.resolve(domain, 'AAAA'),
+            return_exceptions=True,
+        )
+        if isinstance(ipv4, BaseException):
+            raise ipv4
         ipv6: List[str] = []
-        try:
-            ipv6 = [ip.to_text() for ip in dns.resolver.resolve(domain, 'AAAA')]
-        except (dns.resolver.NoAnswer, dns.resolver.NoNameservers):
-            pass
+        if isinstance(ipv6_result, list):
+            ipv6 = ipv6_result
 
         headers: Dict[str, str] = {}
         final_url = f"https://{domain}"
-        try:
-            response = requests.get(final_url, timeout=10, headers={'User-Agent': USER_AGENT}, allow_redirects=True)
-            headers = response.headers
-            final_url = response.url
-        except requests.RequestException:
+        session = get_session()
+        for candidate_url in (f"https://{domain}", f"http://{domain}"):
             try:
-                final_url = f"http://{domain}"
-                response = requests.get(final_url, timeout=10, headers={'User-Agent': USER_AGENT}, allow_redirects=True)
-                headers = response.headers
-                final_url = response.url
-            except requests.RequestException:
-                pass
-
-        return {"domain": domain, "final_url": final_url, "ipv4": ipv4, "ipv6": ipv6, "headers": dict(headers)}, None
+                async with session.get(candidate_url, timeout=aiohttp.ClientTimeout(total=10), headers={'User-Agent': USER_AGENT}, allow_redirects=True) as response:
+                    headers = dict(response.headers)
+                    final_url = str(response.url)
+                break
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                final_url = candidate_url
+
+        return {"domain": domain, "final_url": final_url, "ipv4": ipv4, "ipv6": ipv6, "headers": headers}, None
     except (dns.resolver.NXDOMAIN, dns.resolver.NoNameservers, dns.resolver.Timeout) as e:
         return None, f"Could not resolve domain: {e}"
     except Exception as e:
@@ -71,17 +80,24 @@ async def nmap_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     # **FIX APPLIED HERE**: Escaped the "..."
     sent_message = await update.message.reply_text(f"Starting Nmap scan on `{escape_markdown_v2(target)}`{escape_markdown_v2('...')} This can take up to 5 minutes.", parse_mode=ParseMode.MARKDOWN_V2)
     
-    command = ['nmap'] + user_flags + [target]
+    # --stats-every makes nmap print progress lines that the reporter turns into status edits
+    command = ['nmap', '--stats-every', '10s'] + user_flags + [target]
     response_text = ""
     try:
-        result = subprocess.run(command, capture_output=True, text=True, timeout=300)
-        output = result.stdout or result.stderr or "Scan completed with no output."
-        response_text = f"*Nmap Scan Results for `{escape_markdown_v2(target)}`*\n\n```\n{escape_markdown_v2(output)}\n```"
+        title = f"⏳ *Nmap scan on `{escape_markdown_v2(target)}` in progress{escape_markdown_v2('...')}*"
+        async with scheduled_job(update, "nmap"):
+            async with ProgressReporter(sent_message, title, parse_nmap_line) as progress:
+                result = await run_tool(command, timeout=300, on_line=progress.feed)
+        # The --stats-every lines were shown as status edits; keep them out of the report
+        output = without_status_lines(result.stdout, parse_nmap_line).strip() or result.stderr or "Scan completed with no output."
+        report = [Markup(f"*Nmap Scan Results for `{escape_markdown_v2(target)}`*\n\n"), Pre(output)]
         await sent_message.delete()
-        await send_long_message(update, context, response_text, parse_mode=ParseMode.MARKDOWN_V2)
-    except subprocess.TimeoutExpired:
+        await send_long_message(update, context, report, parse_mode=ParseMode.MARKDOWN_V2)
+    except asyncio.TimeoutError:
         response_text = escape_markdown_v2(f"❌ Scan timed out after 5 minutes for target: {target}")
         await sent_message.edit_text(response_text, parse_mode=ParseMode.MARKDOWN_V2)
+    except QueueFullError as e:
+        await sent_message.edit_text(escape_markdown_v2(f"🚦 {e}"), parse_mode=ParseMode.MARKDOWN_V2)
     except Exception as e:
         response_text = escape_markdown_v2(f"❌ Nmap scan error: {str(e)}")
         await sent_message.edit_text(response_text, parse_mode=ParseMode.MARKDOWN_V2)
@@ -104,15 +120,20 @@ async def rustscan_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     
     command = ['rustscan', '-a', target, '--ulimit', '5000', '--', '-sV']
     try:
-        result = subprocess.run(command, capture_output=True, text=True, timeout=300)
+        title = f"⏳ *RustScan on `{escape_markdown_v2(target)}` in progress{escape_markdown_v2('...')}*"
+        async with scheduled_job(update, "rustscan"):
+            async with ProgressReporter(sent_message, title, parse_rustscan_line) as progress:
+                result = await run_tool(command, timeout=300, on_line=progress.feed)
         output = result.stdout or result.stderr or "Scan completed with no output."
         cleaned_output = "\n".join([line for line in output.split('\n') if 'Starting Nmap' not in line and 'METADATA' not in line and 'ulimit' not in line])
-        response_text = f"*RustScan Results for `{escape_markdown_v2(target)}`*\n\n```\n{escape_markdown_v2(cleaned_output)}\n```"
+        report = [Markup(f"*RustScan Results for `{escape_markdown_v2(target)}`*\n\n"), Pre(cleaned_output)]
         await sent_message.delete()
-        await send_long_message(update, context, response_text, parse_mode=ParseMode.MARKDOWN_V2)
-    except subprocess.TimeoutExpired:
+        await send_long_message(update, context, report, parse_mode=ParseMode.MARKDOWN_V2)
+    except asyncio.TimeoutError:
         response_text = escape_markdown_v2(f"❌ Scan timed out after 5 minutes for target: {target}")
         await sent_message.edit_text(response_text, parse_mode=ParseMode.MARKDOWN_V2)
+    except QueueFullError as e:
+        await sent_message.edit_text(escape_markdown_v2(f"🚦 {e}"), parse_mode=ParseMode.MARKDOWN_V2)
     except Exception as e:
         response_text = escape_markdown_v2(f"❌ RustScan error: {str(e)}")
         await sent_message.edit_text(response_text, parse_mode=ParseMode.MARKDOWN_V2)
@@ -128,22 +149,10 @@ async def lookup_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     response_text = f"🔎 *Lookup Report for `{escaped_domain}`*\n" + escape_markdown_v2("----------------------------------------\n\n")
     
     try:
-        w = whois.whois(domain)
+        whois_details = await lookup_whois(domain)
         response_text += "*WHOIS Information:*\n"
-        if w.domain_name:
-            whois_details = {
-                'Domain': w.domain_name, 'Registrar': w.registrar,
-                'Creation Date': w.creation_date, 'Expiration Date': w.expiration_date,
-                'Last Updated': w.updated_date, 'Name Servers': w.name_servers, 'Status': w.status,
-            }
-            for key, value in whois_details.items():
-                if not value: continue
-                if isinstance(value, list):
-                    value_str = ", ".join(sorted([str(v) for v in value]))
-                elif isinstance(value, datetime):
-                    value_str = value.strftime('%Y-%m-%d')
-                else:
-                    value_str = str(value)
+        if whois_details:
+            for key, value_str in whois_details.items():
                 response_text += f"  *{escape_markdown_v2(key)}:* `{escape_markdown_v2(value_str)}`\n"
         else:
             response_text += "  `No public WHOIS data found.`\n"
@@ -152,16 +161,12 @@ async def lookup_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     
     response_text += "\n*DNS Records:*\n"
     has_dns_records = False
-    for r_type in ['A', 'AAAA', 'MX', 'NS', 'TXT', 'SOA', 'CNAME']:
-        try:
-            answers = dns.resolver.resolve(domain, r_type)
-            records = sorted([str(r).strip() for r in answers])
-            if records:
-                has_dns_records = True
-                response_text += f"  *{escape_markdown_v2(r_type)}:*\n"
-                for record in records: response_text += f"    `{escape_markdown_v2(record)}`\n"
-        except (dns.resolver.NoAnswer, dns.resolver.NXDOMAIN, dns.resolver.NoNameservers, dns.exception.Timeout):
-            pass
+    dns_records = await dns_resolver.resolve_many(domain, ['A', 'AAAA', 'MX', 'NS', 'TXT', 'SOA', 'CNAME'])
+    for r_type, records in dns_records.items():
+        if records:
+            has_dns_records = True
+            response_text += f"  *{escape_markdown_v2(r_type)}:*\n"
+            for record in records: response_text += f"    `{escape_markdown_v2(record)}`\n"
     if not has_dns_records:
         response_text += "  `No common DNS records found.`\n"
 
@@ -176,7 +181,7 @@ async def headers_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     # **FIX APPLIED HERE**: Escaped the "..."
     sent_message = await update.message.reply_text(f"📡 Getting headers for `{escaped_domain}`{escape_markdown_v2('...')}", parse_mode=ParseMode.MARKDOWN_V2)
     
-    data, error = _get_header_data(domain)
+    data, error = await _get_header_data(domain)
     if error: await sent_message.edit_text(f"❌ Error: {escape_markdown_v2(error)}", parse_mode=ParseMode.MARKDOWN_V2); return
     
     if data:
@@ -203,14 +208,12 @@ async def headers_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             for key, val in data['headers'].items():
                 headers_str += f"*{escape_markdown_v2(key)}:* `{escape_markdown_v2(val)}`\n"
             
-            if len(response_text + headers_str) > 4000:
-                response_text += "\n\n_Full headers list is too long to display\\._"
-            else:
-                response_text += headers_str
+            # Long header lists continue on further pages instead of being dropped
+            response_text += headers_str
         else:
             response_text += "\n\n_Could not retrieve HTTP headers\\._"
 
-        await sent_message.edit_text(response_text, parse_mode=ParseMode.MARKDOWN_V2, disable_web_page_preview=True)
+        await send_paged(update, response_text, parse_mode=ParseMode.MARKDOWN_V2, edit=sent_message, disable_web_page_preview=True)
 
 async def methods_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     if not context.args: await update.message.reply_text(escape_markdown_v2("Usage: /methods <url>"), parse_mode=ParseMode.MARKDOWN_V2); return
@@ -222,11 +225,11 @@ async def methods_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     sent_message = await update.message.reply_text(f"🔎 Checking methods for `{escaped_url}`{escape_markdown_v2('...')}", parse_mode=ParseMode.MARKDOWN_V2)
     
     try:
-        response = requests.options(url, timeout=10, headers={'User-Agent': USER_AGENT}, allow_redirects=True)
-        allowed_methods = response.headers.get('Allow', 'Not Specified (OPTIONS may not be enabled)')
-        response_text = f"📋 *Allowed Methods for `{escaped_url}`*\n`{escape_markdown_v2(allowed_methods)}`\n_(Status: {response.status_code})_"
-    except requests.RequestException as e:
-        response_text = f"❌ Could not connect to `{escaped_url}`.\n*Error:* `{escape_markdown_v2(str(e))}`"
+        async with get_session().options(url, timeout=aiohttp.ClientTimeout(total=10), headers={'User-Agent': USER_AGENT}, allow_redirects=True) as response:
+            allowed_methods = response.headers.get('Allow', 'Not Specified (OPTIONS may not be enabled)')
+            response_text = f"📋 *Allowed Methods for `{escaped_url}`*\n`{escape_markdown_v2(allowed_methods)}`\n_(Status: {response.status})_"
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        response_text = f"❌ Could not connect to `{escaped_url}`.\n*Error:* `{escape_markdown_v2(str(e) or type(e).__name__)}`"
     
     await sent_message.edit_text(response_text, parse_mode=ParseMode.MARKDOWN_V2)
 
@@ -237,15 +240,23 @@ async def revip_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     # **FIX APPLIED HERE**: Escaped the "..."
     sent_message = await update.message.reply_text(f"🌐 Performing reverse lookup on `{escaped_query}`{escape_markdown_v2('...')}", parse_mode=ParseMode.MARKDOWN_V2)
     
+    def fetch():
+        return hackertarget_get(
+            get_session(), REV_IP_API_URL, params={'q': query}, headers={'User-Agent': USER_AGENT},
+            timeout=aiohttp.ClientTimeout(total=45),
+        )
+
     try:
-        response = requests.get(REV_IP_API_URL, params={'q': query}, headers={'User-Agent': USER_AGENT}, timeout=45)
-        response.raise_for_status()
-        
-        if "error check your search query" in response.text:
+        # Same cache key as the web UI's "reverseiplookup" tool, which queries the same endpoint
+        body = await result_cache.get_or_fetch("reverseiplookup", query, fetch, ttl=hackertarget_ttl)
+
+        if HACKERTARGET_QUERY_ERROR in body:
              response_text = f"❌ API Error: Invalid IP or domain provided: `{escaped_query}`"
         else:
-             response_text = f"*Reverse IP Results for `{escaped_query}`:*\n\n```\n{escape_markdown_v2(response.text.strip())}\n```"
-    except requests.RequestException as e:
-        response_text = f"❌ API Error: {escape_markdown_v2(str(e))}"
+             response_text = f"*Reverse IP Results for `{escaped_query}`:*\n\n```\n{escape_markdown_v2(body.strip())}\n```"
+    except QuotaExceededError as e:
+        response_text = f"🚦 {escape_markdown_v2(str(e))}"
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        response_text = f"❌ API Error: {escape_markdown_v2(str(e) or 'Request timed out.')}"
     
     await sent_message.edit_text(response_text, parse_mode=ParseMode.MARKDOWN_V2)
@@ -0,0 +1,77 @@
+# handlers/operator.py
+
+import logging
+import os
+from telegram import Update
+from telegram.ext import ContextTypes
+from telegram.constants import ParseMode
+from typing import FrozenSet
+from utils import escape_markdown_v2, send_long_message
+from services.message_chunker import Markup, Pre
+from services.profiler import ProfilerBusyError, profile_for
+
+logger = logging.getLogger(__name__)
+
+# --- Config ---
+# Comma-separated Telegram user IDs allowed to run operator commands, e.g. OPERATOR_IDS=12345,67890
+OPERATOR_IDS: FrozenSet[int] = frozenset(
+    int(part) for part in os.environ.get("OPERATOR_IDS", "").replace(" ", "").split(",") if part.lstrip("-").isdigit()
+)
+DEFAULT_PROFILE_SECONDS = 30
+MAX_PROFILE_SECONDS = 300
+
+
+def is_operator(update: Update) -> bool:
+    user = update.effective_user
+    return user is not None and user.id in OPERATOR_IDS
+
+
+async def profile_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    /profile [seconds] — profiles the whole bot process while it keeps serving everyone else,
+    then replies with the hottest functions, the handlers that ran meanwhile, and the raw profile.
+    Registered with block=False, so the updates arriving during the window are still handled.
+    """
+    if not is_operator(update):
+        await update.message.reply_text(escape_markdown_v2("⛔ This command is only available to bot operators."), parse_mode=ParseMode.MARKDOWN_V2)
+        return
+
+    seconds = DEFAULT_PROFILE_SECONDS
+    if context.args:
+        try:
+            seconds = float(context.args[0])
+        except ValueError:
+            seconds = 0
+        if not 0 < seconds <= MAX_PROFILE_SECONDS:
+            await update.message.reply_text(escape_markdown_v2(f"Usage: /profile [seconds]  (1-{MAX_PROFILE_SECONDS}, default {DEFAULT_PROFILE_SECONDS})"), parse_mode=ParseMode.MARKDOWN_V2)
+            return
+
+    sent_message = await update.message.reply_text(escape_markdown_v2(f"🔬 Profiling the bot for {seconds:g}s..."), parse_mode=ParseMode.MARKDOWN_V2)
+    logger.info(f"Operator {update.effective_user.id} started a {seconds:g}s profile.")
+    try:
+        report = await profile_for(seconds)
+    except ProfilerBusyError as e:
+        await sent_message.edit_text(escape_markdown_v2(f"🚦 {e}"), parse_mode=ParseMode.MARKDOWN_V2)
+        return
+    except Exception as e:
+        logger.exception("Profiling failed")
+        await sent_message.edit_text(escape_markdown_v2(f"❌ Profiling failed: {e}"), parse_mode=ParseMode.MARKDOWN_V2)
+        return
+
+    if report.mode == "sampling":
+        details = f"{report.samples} samples, event loop idle {100 * report.idle_share:.0f}% of the time"
+    else:
+        details = "cProfile, event-loop thread only"
+    handlers = "\n".join(
+        f"{name}  (ran {running_for:.1f}s)" for name, running_for in sorted(report.handlers.items(), key=lambda item: -item[1])
+    ) or "(none)"
+    summary = [
+        Markup(f"*🔬 Profile of {escape_markdown_v2(f'{report.seconds:g}s')}* {escape_markdown_v2(f'({details})')}\n\n*Hot functions*"),
+        Pre(report.summary),
+        Markup("*Handlers running during the window*"),
+        Pre(handlers),
+    ]
+    await sent_message.delete()
+    await send_long_message(update, context, summary, parse_mode=ParseMode.MARKDOWN_V2)
+    caption = "Collapsed stacks (flamegraph.pl / speedscope)" if report.mode == "sampling" else "pstats, by cumulative time"
+    await update.message.reply_document(document=report.document, filename=report.filename, caption=caption)
@@ -0,0 +1,71 @@
+# handlers/pager.py
+
+import logging
+from typing import Optional, Sequence, Union
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Message, Update
+from telegram.error import BadRequest
+from telegram.ext import ContextTypes
+
+from services.message_chunker import Block, chunk_message
+from services.paged_output import paged_output
+
+logger = logging.getLogger(__name__)
+
+
+def _page_keyboard(doc_id: str, page_no: int, page_count: int) -> InlineKeyboardMarkup:
+    """◀ n/N ▶ row; the arrows are left out on the first and last page."""
+    row = []
+    if page_no > 0:
+        row.append(InlineKeyboardButton("◀", callback_data=f"page_{doc_id}_{page_no - 1}"))
+    row.append(InlineKeyboardButton(f"{page_no + 1}/{page_count}", callback_data=f"page_{doc_id}_{page_no}"))
+    if page_no < page_count - 1:
+        row.append(InlineKeyboardButton("▶", callback_data=f"page_{doc_id}_{page_no + 1}"))
+    return InlineKeyboardMarkup([row])
+
+
+async def send_paged(update: Update, content: Union[str, Sequence[Block]], parse_mode: Optional[str] = None,
+                     edit: Optional[Message] = None, **kwargs) -> None:
+    """
+    Sends long output as one message with ◀ ▶ buttons instead of many messages.
+    content is finished text in parse_mode or a list of Markup/Pre blocks. When it needs more
+    than one page, all pages are stored and later ones are served by page_callback_handler.
+    If edit is given, that (status) message is replaced with the first page.
+    """
+    pages = list(chunk_message(content, parse_mode))
+    if not pages:
+        return
+    reply_markup = None
+    if len(pages) > 1:
+        doc_id = await paged_output.save(pages, parse_mode)
+        reply_markup = _page_keyboard(doc_id, 0, len(pages))
+    if edit is not None:
+        await edit.edit_text(pages[0], parse_mode=parse_mode, reply_markup=reply_markup, **kwargs)
+    else:
+        await update.effective_message.reply_text(pages[0], parse_mode=parse_mode, reply_markup=reply_markup, **kwargs)
+
+
+async def page_callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Shows the requested page of a stored output in place of the current one."""
+    query = update.callback_query
+    try:
+        _, doc_id, page_no = query.data.split("_")
+        page_no = int(page_no)
+    except ValueError:
+        await query.answer()
+        return
+
+    page = await paged_output.load(doc_id, page_no)
+    if page is None:
+        await query.answer("This output has expired. Please run the command again.", show_alert=True)
+        return
+    text, page_count, parse_mode = page
+    await query.answer()
+    try:
+        await query.edit_message_text(
+            text, parse_mode=parse_mode, reply_markup=_page_keyboard(doc_id, page_no, page_count),
+            disable_web_page_preview=True,
+        )
+    except BadRequest as e:
+        if "not modified" not in str(e).lower():  # Pressing the page counter re-sends the same page
+            logger.warning(f"Could not show page {page_no} of {doc_id}: {e}")
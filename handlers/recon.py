@@ -1,7 +1,6 @@
 # handlers/recon.py
 
 import logging
-import subprocess
 import shutil
 import os
 import re
@@ -14,7 +13,12 @@ from telegram import Update
 from telegram.ext import ContextTypes, CommandHandler
 from telegram.constants import ParseMode
 
-from utils import escape_markdown_v2, send_long_message
+from utils import escape_markdown_v2, send_long_message, scheduled_job
+from services.process_supervisor import run_tool, LineCallback
+from services.progress import ProgressReporter, parse_gobuster_line
+from services.job_scheduler import QueueFullError
+from services.message_chunker import Markup, Pre
+from handlers.pager import send_paged
 
 logger = logging.getLogger(__name__)
 
@@ -48,21 +52,16 @@ async def check_and_install_tool(tool_name: str, update: Update, context: Contex
 
     try:
         logger.info(f"Running installation script for {tool_name}: {install_script_path} {tool_name}")
-        process = await asyncio.create_subprocess_exec(
-            install_script_path, tool_name,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=600)
-        output = (stdout + stderr).decode('utf-8', errors='ignore')
-
-        if process.returncode == 0 and shutil.which(tool_name):
+        run = await run_tool([install_script_path, tool_name], timeout=600, tool="install_tool.sh", memory_limit=None)
+        output = run.stdout + run.stderr
+
+        if run.returncode == 0 and shutil.which(tool_name):
             success_msg = f"✅ Tool '{tool_name}' installed successfully."
             await update.message.reply_text(escape_markdown_v2(success_msg), parse_mode=ParseMode.MARKDOWN_V2)
             return True
         else:
             error_msg = f"❌ Failed to install '{tool_name}'. Installation script output:\n```\n{output[:1000]}...\n```"
-            logger.error(f"Installation script failed for {tool_name} (exit code {process.returncode}): {output}")
+            logger.error(f"Installation script failed for {tool_name} (exit code {run.returncode}): {output}")
             await update.message.reply_text(escape_markdown_v2(error_msg), parse_mode=ParseMode.MARKDOWN_V2)
             return False
     except asyncio.TimeoutError:
@@ -77,20 +76,15 @@ async def check_and_install_tool(tool_name: str, update: Update, context: Contex
         return False
 
 
-# --- Subprocess Execution Helper (No changes needed here) ---
-async def run_subprocess_command(command: list[str], update: Update, context: ContextTypes.DEFAULT_TYPE, timeout: int = 300, description: str = "command") -> Optional[str]:
+# --- Subprocess Execution Helper (runs through services/process_supervisor.py) ---
+async def run_subprocess_command(command: list[str], update: Update, context: ContextTypes.DEFAULT_TYPE, timeout: int = 300, description: str = "command", on_line: Optional[LineCallback] = None) -> Optional[str]:
     try:
         logger.info(f"Running command: {' '.join(command)}")
-        process = await asyncio.create_subprocess_exec(
-            *command,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
-        output = (stdout or stderr).decode('utf-8', errors='ignore')
-        if process.returncode != 0:
-             logger.error(f"{description} failed with return code {process.returncode}. Command: {' '.join(command)}. Output: {output}")
-             response_text = f"❌ The {description} failed (exit code {process.returncode}). Output:\n```\n{output[:1000]}...\n```"
+        run = await run_tool(command, timeout=timeout, on_line=on_line)
+        output = run.stdout or run.stderr
+        if run.returncode != 0:
+             logger.error(f"{description} failed with return code {run.returncode}. Command: {' '.join(command)}. Output: {output}")
+             response_text = f"❌ The {description} failed (exit code {run.returncode}). Output:\n```\n{output[:1000]}...\n```"
              await update.message.reply_text(escape_markdown_v2(response_text), parse_mode=ParseMode.MARKDOWN_V2)
              return None
         return output
@@ -134,10 +128,18 @@ async def dirbuster_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
 
     # **FIX APPLIED HERE**: Escape the entire message string
     status_msg = f"🚀 Starting directory scan on `{target_url}` using wordlist `{wordlist_path}`... This may take some time."
-    await update.message.reply_text(escape_markdown_v2(status_msg), parse_mode=ParseMode.MARKDOWN_V2)
+    sent_message = await update.message.reply_text(escape_markdown_v2(status_msg), parse_mode=ParseMode.MARKDOWN_V2)
 
-    command = ['gobuster', 'dir', '-u', target_url, '-w', wordlist_path, '-t', '50', '-f']
-    output = await run_subprocess_command(command, update, context, timeout=600, description="directory scan")
+    # --no-progress: gobuster's progress bar is redrawn with \r and never ends a line
+    command = ['gobuster', 'dir', '-u', target_url, '-w', wordlist_path, '-t', '50', '-f', '--no-progress']
+    title = f"⏳ *Directory scan on `{escape_markdown_v2(target_url)}` in progress{escape_markdown_v2('...')}*"
+    try:
+        async with scheduled_job(update, "dirbuster"):
+            async with ProgressReporter(sent_message, title, parse_gobuster_line) as progress:
+                output = await run_subprocess_command(command, update, context, timeout=600, description="directory scan", on_line=progress.feed)
+    except QueueFullError as e:
+        await sent_message.edit_text(escape_markdown_v2(f"🚦 {e}"), parse_mode=ParseMode.MARKDOWN_V2)
+        return
 
     if output:
         results = "\n".join([
@@ -211,19 +213,28 @@ async def wpscan_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 
     # **FIX APPLIED HERE**: Escape the entire message string
     status_msg = f"🛡️ Starting WPScan on `{target_url}`... This may take some time."
-    await update.message.reply_text(escape_markdown_v2(status_msg), parse_mode=ParseMode.MARKDOWN_V2)
+    sent_message = await update.message.reply_text(escape_markdown_v2(status_msg), parse_mode=ParseMode.MARKDOWN_V2)
 
     command = ['wpscan', '--url', target_url, '--api-token', api_token, '--enumerate', 'vp,vt,dbe', '--format', 'json']
-    output = await run_subprocess_command(command, update, context, timeout=900, description="WPScan")
+    title = f"⏳ *WPScan on `{escape_markdown_v2(target_url)}` in progress{escape_markdown_v2('...')}*"
+    try:
+        async with scheduled_job(update, "wpscan"):
+            async with ProgressReporter(sent_message, title) as progress:
+                output = await run_subprocess_command(command, update, context, timeout=900, description="WPScan", on_line=progress.feed)
+    except QueueFullError as e:
+        await sent_message.edit_text(escape_markdown_v2(f"🚦 {e}"), parse_mode=ParseMode.MARKDOWN_V2)
+        return
 
     if output:
         try:
             scan_results = json.loads(output)
-            response_text = f"✅ WPScan Results for `{target_url}` (JSON Output):\n```json\n{json.dumps(scan_results, indent=2)[:3500]}...\n```"
-            await update.message.reply_text(escape_markdown_v2(response_text), parse_mode=ParseMode.MARKDOWN_V2)
+            report = [
+                Markup(f"✅ WPScan Results for `{escape_markdown_v2(target_url)}` \\(JSON Output\\):\n"),
+                Pre(json.dumps(scan_results, indent=2), "json"),
+            ]
         except json.JSONDecodeError:
-            response_text = f"✅ WPScan Results for `{target_url}` (raw output):\n```\n{output[:3800]}...\n```"
-            await update.message.reply_text(escape_markdown_v2(response_text), parse_mode=ParseMode.MARKDOWN_V2)
+            report = [Markup(f"✅ WPScan Results for `{escape_markdown_v2(target_url)}` \\(raw output\\):\n"), Pre(output)]
+        await send_paged(update, report, parse_mode=ParseMode.MARKDOWN_V2)
 
 
 async def searchsploit_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -244,14 +255,14 @@ async def searchsploit_command(update: Update, context: ContextTypes.DEFAULT_TYP
     output = await run_subprocess_command(command, update, context, timeout=60, description="searchsploit")
 
     if output:
-        response_text = f"*Exploit-DB Search Results for `{keywords}`:*\n```\n{output[:3800]}...\n```"
-        await update.message.reply_text(escape_markdown_v2(response_text), parse_mode=ParseMode.MARKDOWN_V2)
+        report = [Markup(f"*Exploit\\-DB Search Results for `{escape_markdown_v2(keywords)}`:*\n"), Pre(output)]
+        await send_paged(update, report, parse_mode=ParseMode.MARKDOWN_V2)
 
 
 # List of handlers to be registered in main.py
 recon_handlers = [
-    CommandHandler("dirbuster", dirbuster_command),
+    CommandHandler("dirbuster", dirbuster_command, block=False),
     CommandHandler("search", search_command),
-    CommandHandler("wpscan", wpscan_command),
+    CommandHandler("wpscan", wpscan_command, block=False),
     CommandHandler("searchsploit", searchsploit_command),
     ]
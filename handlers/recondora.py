@@ -3,15 +3,15 @@
 from telegram import Update
 from telegram.ext import ContextTypes
 from telegram.constants import ParseMode
-import aiohttp
-import asyncio
 
-# Import the core execution logic from Web.py
-from Web import ENDPOINTS, LOCAL_TOOLS, fetch_tool, run_local_tool
+# Import the core execution logic from recon_tools.py (shared with the web UI)
+from recon_tools import iter_recon_results
 # Import the new helper functions and templates
-from .bot_helpers import resolve_tools_from_args, format_telegram_report
+from .bot_helpers import resolve_tools_from_args, format_telegram_report, RecondoraProgress
 from .bot_templates import get_recondora_help_text, get_status_message
-from utils import send_long_message
+from utils import send_long_message, scheduled_job
+from services.job_scheduler import QueueFullError
+from services.message_chunker import chunk_message
 
 async def recon_doraemon_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
@@ -35,20 +35,33 @@ async def recon_doraemon_command(update: Update, context: ContextTypes.DEFAULT_T
         parse_mode=ParseMode.MARKDOWN_V2
     )
 
-    # 3. Execute tasks
-    api_coroutines = []
-    local_coroutines = []
-    async with aiohttp.ClientSession() as session:
-        for tool_key in tools_to_run:
-            if tool_key in ENDPOINTS:
-                api_coroutines.append(fetch_tool(session, domain, tool_key))
-            elif tool_key in LOCAL_TOOLS:
-                local_coroutines.append(run_local_tool(domain, tool_key))
-        
-        results = await asyncio.gather(*api_coroutines, *local_coroutines)
+    # 3. Execute tasks, showing each section in the status message as soon as its tool finishes
+    results = []
+
+    async def collect() -> None:
+        async with RecondoraProgress(status_msg, domain, tools_to_run) as progress:
+            async for tool_key, name, output in iter_recon_results(domain, tools_to_run):
+                results.append((name, output))
+                progress.add_result(tool_key, name, output)
+
+    # Only the full 'all' sweep is heavy enough to go through the fair-share scheduler
+    if 'all' in (arg.lower() for arg in context.args[1:]):
+        try:
+            async with scheduled_job(update, "recondora_all"):
+                await collect()
+        except QueueFullError as e:
+            await status_msg.edit_text(f"🚦 {e}")
+            return
+    else:
+        await collect()
 
     # 4. Format and send the final report
     final_report = format_telegram_report(domain, results)
-    
+    chunks = chunk_message(final_report, ParseMode.MARKDOWN_V2)
+    first = next(chunks, None)
+    if first is not None and next(chunks, None) is None:
+        # The whole report fits in the status message: replace it instead of sending a new one
+        await status_msg.edit_text(first, parse_mode=ParseMode.MARKDOWN_V2)
+        return
     await status_msg.delete()
     await send_long_message(update, context, final_report, parse_mode=ParseMode.MARKDOWN_V2)
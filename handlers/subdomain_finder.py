@@ -1,53 +1,76 @@
 # handlers/subdomain_finder.py
 
 import logging
-import requests
+import os
+import json
+import asyncio
+import aiohttp
 from telegram import Update
 from telegram.ext import ContextTypes
 from telegram.constants import ParseMode
 from typing import Optional, Tuple, Set
 
-from utils import escape_markdown_v2, send_long_message
+from utils import escape_markdown_v2
+from services.http_client import get_session, track_endpoint
+from services.message_chunker import Markup, Pre
+from handlers.pager import send_paged
+from services.result_cache import result_cache
 
 logger = logging.getLogger(__name__)
 
-def find_subdomains_crtsh(domain: str) -> Tuple[Optional[list], Optional[str]]:
+CRTSH_URL = os.environ.get("CRTSH_URL", "https://crt.sh").rstrip("/")
+track_endpoint("crtsh", CRTSH_URL)
+
+async def _query_crtsh(domain: str) -> Optional[list]:
     """
-    Finds subdomains by querying the crt.sh Certificate Transparency log search.
+    Fetches the certificate log for the domain and returns the sorted host names in it,
+    or None if the log has no entries at all.
     """
     logger.info(f"Starting crt.sh subdomain lookup for {domain}")
-    subdomains: Set[str] = set()
-    url = f"https://crt.sh/?q=%.{domain}&output=json"
+    url = f"{CRTSH_URL}/?q=%.{domain}&output=json"
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
     }
+    async with get_session().get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=45)) as response:
+        response.raise_for_status()
+        body = await response.text()
+
+    if not body:
+        return None
+    json_data = json.loads(body)
+    if not json_data:
+        return None
+    return _parse_crtsh_entries(json_data)
+
+def _parse_crtsh_entries(json_data: list) -> list:
+    """Collects the distinct, non-wildcard host names from crt.sh certificate entries."""
+    subdomains: Set[str] = set()
+    for entry in json_data:
+        names = entry.get('name_value', '').split('\n')
+        for name in names:
+            clean_name = name.strip()
+            if clean_name and not clean_name.startswith('*.'):
+                subdomains.add(clean_name)
+    return sorted(subdomains)
 
+async def find_subdomains_crtsh(domain: str) -> Tuple[Optional[list], Optional[str]]:
+    """
+    Finds subdomains by querying the crt.sh Certificate Transparency log search.
+    Parsed answers are cached per domain, so repeated lookups skip the slow crt.sh round trip.
+    """
     try:
-        response = requests.get(url, headers=headers, timeout=45)
-        response.raise_for_status()
+        subdomains = await result_cache.get_or_fetch("crtsh", domain, lambda: _query_crtsh(domain))
 
-        if not response.text:
+        if subdomains is None:
             return None, "No subdomains found. The certificate log may be empty for this domain."
-            
-        json_data = response.json()
-        if not json_data:
-            return None, "No subdomains found. The certificate log may be empty for this domain."
-
-        for entry in json_data:
-            names = entry.get('name_value', '').split('\n')
-            for name in names:
-                clean_name = name.strip()
-                if clean_name and not clean_name.startswith('*.'):
-                    subdomains.add(clean_name)
-        
         if subdomains:
-            return sorted(list(subdomains)), None
+            return subdomains, None
         else:
             return None, "No subdomains found after parsing the certificate logs."
 
-    except requests.RequestException as e:
-        logger.error(f"crt.sh lookup failed for {domain}: {e}")
-        return None, f"An API error occurred: {str(e)}"
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.error(f"crt.sh lookup failed for {domain}: {e!r}")
+        return None, f"An API error occurred: {str(e) or 'Request timed out.'}"
     except ValueError:
         logger.error(f"Failed to decode JSON from crt.sh for domain {domain}")
         return None, "The API returned an invalid (non-JSON) response. It may be temporarily unavailable."
@@ -63,7 +86,7 @@ async def subdo_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     # **FIX APPLIED HERE**: Escaped the "..." and "."
     await update.message.reply_text(f"🔍 Searching certificate logs for `{escaped_domain}`{escape_markdown_v2('...')} This can take some time{escape_markdown_v2('.')}", parse_mode=ParseMode.MARKDOWN_V2)
     
-    subdomains, error = find_subdomains_crtsh(domain)
+    subdomains, error = await find_subdomains_crtsh(domain)
 
     if error:
         await update.message.reply_text(f"⚠️ {escape_markdown_v2(error)}", parse_mode=ParseMode.MARKDOWN_V2)
@@ -71,8 +94,7 @@ async def subdo_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
 
     if subdomains:
         header = f"🧾 *Found {len(subdomains)} subdomains for `{escaped_domain}` via crt\\.sh:*\n"
-        # Text inside a ``` code block does NOT need to be escaped.
-        result_text = "\n".join(subdomains)
-        full_message = f"{header}```\n{result_text}\n```"
+        # Long lists are browsed page by page instead of arriving as a burst of messages
+        report = [Markup(header), Pre("\n".join(subdomains))]
         
-        await send_long_message(update, context, full_message, parse_mode=ParseMode.MARKDOWN_V2)
+        await send_paged(update, report, parse_mode=ParseMode.MARKDOWN_V2)
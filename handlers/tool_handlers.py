@@ -7,9 +7,13 @@ from telegram.ext import (
     filters,
 )
 
-import subprocess
+import os
 import shutil
 
+from handlers.pager import send_paged
+from services.message_chunker import Pre
+from services.process_supervisor import run_tool
+
 # List of tools
 TOOL_LIST = ["sqlmap", "nmap", "rustscan", "xssstrike", "ffuf"]
 
@@ -38,8 +42,10 @@ async def safe_reply(target, text):
 # GitHub fallback installer
 async def install_tool(tool: str) -> bool:
     try:
-        subprocess.run(["apt", "install", "-y", tool], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        return True
+        run = await run_tool(["apt", "install", "-y", tool], timeout=600, tool="apt", memory_limit=None)
+        if run.returncode == 0:
+            return True
+        print(f"[!] Apt install failed for {tool}")
     except Exception:
         print(f"[!] Apt install failed for {tool}")
 
@@ -47,18 +53,23 @@ async def install_tool(tool: str) -> bool:
     if not repo_url:
         return False
 
+    async def run_checked(command, timeout=600):
+        run = await run_tool(command, timeout=timeout, memory_limit=None)
+        if run.returncode != 0:
+            raise RuntimeError(f"{' '.join(command)} exited with {run.returncode}: {run.stderr.strip()[:200]}")
+
     try:
         path = f"/tmp/{tool}"
-        subprocess.run(["rm", "-rf", path])
-        subprocess.run(["git", "clone", repo_url, path], check=True)
+        shutil.rmtree(path, ignore_errors=True)
+        await run_checked(["git", "clone", repo_url, path])
 
         if tool == "xssstrike":
-            subprocess.run(["chmod", "+x", f"{path}/xssstrike.py"])
-            subprocess.run(["ln", "-s", f"{path}/xssstrike.py", "/usr/local/bin/xssstrike"], check=True)
+            os.chmod(f"{path}/xssstrike.py", 0o755)
+            os.symlink(f"{path}/xssstrike.py", "/usr/local/bin/xssstrike")
 
         elif tool == "ffuf":
-            subprocess.run(["apt", "install", "-y", "golang"])
-            subprocess.run(["go", "install", "github.com/ffuf/ffuf@latest"], check=True)
+            await run_tool(["apt", "install", "-y", "golang"], timeout=600, tool="apt", memory_limit=None)
+            await run_checked(["go", "install", "github.com/ffuf/ffuf@latest"])
 
         return shutil.which(tool) is not None
     except Exception as e:
@@ -104,9 +115,8 @@ async def tool_args_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await safe_reply(update.message, f"✅ *{tool}* installed successfully.")
 
     try:
-        result = subprocess.run(full_cmd, capture_output=True, text=True, timeout=30)
+        result = await run_tool(full_cmd, timeout=30)
         output = result.stdout or result.stderr or "No output."
-        output = escape_md(output[:3900]) + ("\n\n...truncated" if len(output) > 3900 else "")
-        await update.message.reply_text(f"```\n{output}\n```", parse_mode="MarkdownV2")
+        await send_paged(update, [Pre(output)], parse_mode="MarkdownV2")
     except Exception as e:
         await safe_reply(update.message, f"⚠️ Error running *{tool}*:\n`{str(e)}`")
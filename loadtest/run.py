@@ -0,0 +1,205 @@
+# loadtest/run.py
+# End-to-end load test: the real Application from main.py, long-polling a fake Bot API while
+# simulated users send commands. Upstreams (HackerTarget, crt.sh, DNS, a target website) are
+# local stand-ins, so it runs offline. See loadtest/world.py for the fakes.
+#
+#   python -m loadtest.run --users 20                          # default mix of /lookup /recondora /fuzz /subdo
+#   python -m loadtest.run --users 50 --mix recondora=3,lookup=1 --json out.json
+#
+# Latency is measured from the moment an update is handed to the bot to its first and last Bot API
+# call for that chat; a command counts as finished after --quiet seconds without further output.
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from dataclasses import asdict
+from typing import Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)  # Run from anywhere: the repo root must be importable
+
+from loadtest.world import TARGET_DOMAIN, Options, world_main  # noqa: E402
+
+LAG_INTERVAL = 0.05     # Seconds between event-loop lag probes
+RSS_INTERVAL = 0.5      # Seconds between memory samples
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile; None for an empty list."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # Peak, in KiB on Linux
+
+
+def _parse_mix(text: str) -> Dict[str, int]:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip().lstrip("/")] = int(weight or 1)
+    return mix
+
+
+def _configure_environment(ports: Dict[str, int]) -> None:
+    """Points the bot at the stand-ins. Must run before main (and with it every handler) is imported."""
+    os.environ.update({
+        "BOT_TOKEN": "123456789:LOADTEST",
+        "TELEGRAM_API_URL": f"http://127.0.0.1:{ports['telegram']}",
+        "HACKERTARGET_URL": f"http://127.0.0.1:{ports['hackertarget']}",
+        "CRTSH_URL": f"http://127.0.0.1:{ports['crtsh']}",
+        "DNS_NAMESERVERS": "127.0.0.1",
+        "DNS_PORT": str(ports["dns"]),
+        # The stand-in has no quota; keep the client-side limiter from being what is measured
+        "HACKERTARGET_DAILY_LIMIT": "1000000",
+        "HACKERTARGET_RATE": "1000",
+        "HACKERTARGET_BURST": "1000",
+    })
+    os.environ.pop("WEBHOOK_URL", None)
+
+
+async def _sample(bot_stats: dict, rate_limiter) -> None:
+    loop = asyncio.get_running_loop()
+    next_rss = 0.0
+    while True:
+        started = loop.time()
+        await asyncio.sleep(LAG_INTERVAL)
+        bot_stats["loop_lag"].append(max(0.0, loop.time() - started - LAG_INTERVAL))
+        if started >= next_rss:
+            bot_stats["rss"].append(_rss_bytes())
+            if rate_limiter is not None:
+                bot_stats["queue_depth"] = max(bot_stats["queue_depth"], rate_limiter.queue_depth)
+            next_rss = started + RSS_INTERVAL
+
+
+async def _drive(conn, log_level: str) -> dict:
+    import main
+    from services.result_cache import result_cache
+
+    logging.getLogger().setLevel(log_level)
+
+    application = main.build_application()
+    rate_limiter = application.bot.rate_limiter
+    bot_stats = {"loop_lag": [], "rss": [_rss_bytes()], "queue_depth": 0}
+    async with application:
+        await application.post_init(application)  # Like post_shutdown below, normally run by run_polling()
+        # python-whois only speaks to real port-43 servers, so /lookup gets its WHOIS record from a warm cache
+        await result_cache.set("whois_record", TARGET_DOMAIN, {"Domain": TARGET_DOMAIN, "Registrar": "Load Test Registrar"})
+        await application.updater.start_polling(timeout=10)
+        await application.start()
+        sampler = asyncio.create_task(_sample(bot_stats, rate_limiter))
+        conn.send("start")
+        world = await asyncio.get_running_loop().run_in_executor(None, conn.recv)
+        sampler.cancel()
+        await application.updater.stop()
+        await application.stop()
+    await application.post_shutdown(application)  # Only run_polling() calls it on its own
+    bot_stats["merged_edits"] = getattr(rate_limiter, "merged_edits", 0)
+    return {**world, "bot": bot_stats}
+
+
+def _seconds(value: Optional[float]) -> str:
+    return "      -" if value is None else f"{value:7.2f}"
+
+
+def print_report(report: dict) -> None:
+    by_command = defaultdict(list)
+    for result in report["results"]:
+        by_command[result["command"]].append(result)
+
+    print(f"\n{'command':<12}{'n':>5}{'err':>5}{'t/o':>5}   first p50    p95   done p50    p90    p95    p99    max")
+    for command, results in sorted(by_command.items()):
+        first = [r["first_response"] for r in results if r["first_response"] is not None]
+        done = [r["completed"] for r in results if r["completed"] is not None]
+        print(
+            f"{command:<12}{len(results):>5}{sum(r['error'] for r in results):>5}{sum(r['timed_out'] for r in results):>5}"
+            f"  {_seconds(percentile(first, 50))}{_seconds(percentile(first, 95))}"
+            f"  {_seconds(percentile(done, 50))}{_seconds(percentile(done, 90))}{_seconds(percentile(done, 95))}"
+            f"{_seconds(percentile(done, 99))}{_seconds(max(done, default=None))}"
+        )
+
+    bot = report["bot"]
+    lag_ms = [lag * 1000 for lag in bot["loop_lag"]]
+    mib = [rss / 2 ** 20 for rss in bot["rss"]]
+    print(f"\n{len(report['results'])} commands in {report['duration']:.1f}s "
+          f"({len(report['results']) / report['duration']:.2f}/s), latencies in seconds")
+    print(f"event-loop lag  p50 {percentile(lag_ms, 50) or 0:.1f} ms  p99 {percentile(lag_ms, 99) or 0:.1f} ms  "
+          f"max {max(lag_ms, default=0):.1f} ms")
+    print(f"memory (RSS)    start {mib[0]:.1f} MiB  peak {max(mib):.1f} MiB  end {mib[-1]:.1f} MiB")
+    print(f"outbound queue  max depth {bot['queue_depth']}  merged edits {bot['merged_edits']}")
+    print("Bot API calls   " + ", ".join(f"{method} {count}" for method, count in sorted(report["api_calls"].items())))
+
+
+def main(argv=None) -> int:
+    defaults = Options()
+    parser = argparse.ArgumentParser(description="End-to-end load test against local stand-ins.")
+    parser.add_argument("--users", type=int, default=defaults.users, help="simulated users")
+    parser.add_argument("--commands", type=int, default=defaults.commands_per_user, help="commands per user")
+    parser.add_argument("--mix", default=",".join(f"{k}={v}" for k, v in defaults.mix.items()),
+                        help="command weights, e.g. recondora=2,fuzz=1,lookup=1,subdo=1")
+    parser.add_argument("--ramp", type=float, default=defaults.ramp, help="seconds over which users join")
+    parser.add_argument("--think", type=float, default=defaults.think, help="seconds between a user's commands")
+    parser.add_argument("--quiet", type=float, default=defaults.quiet,
+                        help="seconds without bot output after which a command counts as finished")
+    parser.add_argument("--timeout", type=float, default=defaults.command_timeout, help="per-command timeout")
+    parser.add_argument("--upstream-latency", type=float, default=defaults.upstream_latency,
+                        help="mean seconds the HackerTarget and crt.sh stand-ins take to answer")
+    parser.add_argument("--api-latency", type=float, default=defaults.api_latency,
+                        help="seconds added to every Bot API call")
+    parser.add_argument("--fuzz-words", type=int, default=defaults.fuzz_words, help="wordlist size for /fuzz")
+    parser.add_argument("--shared-target", action="store_true", help="every user queries the same domain")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--log-level", default="WARNING", help="log level of the bot while under load")
+    parser.add_argument("--json", dest="json_path", help="also write the raw results to this file")
+    args = parser.parse_args(argv)
+
+    options = Options(
+        users=args.users, commands_per_user=args.commands, mix=_parse_mix(args.mix), ramp=args.ramp,
+        think=args.think, quiet=args.quiet, command_timeout=args.timeout, upstream_latency=args.upstream_latency,
+        api_latency=args.api_latency, fuzz_words=args.fuzz_words, shared_target=args.shared_target, seed=args.seed,
+    )
+    conn, child_conn = multiprocessing.Pipe()
+    world = multiprocessing.get_context("spawn").Process(
+        target=world_main, args=(child_conn, json.dumps(asdict(options))), daemon=True,
+    )
+    world.start()
+    ports = conn.recv()
+    _configure_environment(ports)
+
+    # The bot writes its databases under persistence_data/ in the working directory: use a scratch one
+    with tempfile.TemporaryDirectory(prefix="loadtest-") as workdir:
+        os.chdir(workdir)
+        started = time.monotonic()
+        try:
+            report = asyncio.run(_drive(conn, args.log_level.upper()))
+        finally:
+            conn.send("stop")
+            world.join(timeout=10)
+            os.chdir(REPO_ROOT)
+    report["options"] = asdict(options)
+    report["wall_time"] = time.monotonic() - started
+
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if any(r["timed_out"] for r in report["results"]) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,346 @@
+# loadtest/world.py
+# Everything outside the bot, for the load test: a fake Telegram Bot API, HackerTarget, crt.sh,
+# a target website and a DNS server, plus the simulated users. Runs in its own process so the
+# bot's event loop and memory figures only contain the bot.
+
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from collections import Counter, defaultdict
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import dns.message
+import dns.rcode
+import dns.rdatatype
+import dns.rrset
+from aiohttp import web
+
+BOT_USER = {"id": 100000001, "is_bot": True, "first_name": "Doraemon", "username": "doraemon_loadtest_bot"}
+TARGET_DOMAIN = "loadtest.test"          # Every simulated target is a subdomain of this
+FOUND_PATHS = {"admin", "login", "backup", "api", "uploads", "config"}
+
+
+@dataclass
+class Options:
+    users: int = 10
+    commands_per_user: int = 3
+    mix: Dict[str, int] = field(default_factory=lambda: {"lookup": 1, "recondora": 1, "fuzz": 1, "subdo": 1})
+    ramp: float = 5.0                 # Seconds over which the users join
+    think: float = 1.0                # Seconds a user waits between two commands
+    quiet: float = 6.0                # A command counts as finished after this long without bot output
+    command_timeout: float = 300.0
+    upstream_latency: float = 0.3     # Mean response time of the HackerTarget / crt.sh stand-ins
+    api_latency: float = 0.0          # Added to every Bot API call
+    fuzz_words: int = 100
+    shared_target: bool = False       # All users query the same domain (exercises the caches)
+    seed: int = 1
+
+
+@dataclass
+class CommandResult:
+    user: int
+    command: str
+    text: str
+    first_response: Optional[float]   # Seconds until the bot's first API call for this chat
+    completed: Optional[float]        # Seconds until its last one
+    api_calls: int
+    error: bool
+    timed_out: bool
+
+
+async def _upstream_delay(options: Options) -> None:
+    if options.upstream_latency > 0:
+        await asyncio.sleep(options.upstream_latency * random.uniform(0.5, 1.5))
+
+
+# ==============================================================================
+# 1. FAKE TELEGRAM BOT API
+# ==============================================================================
+class FakeBotApi:
+    """
+    Answers the Bot API methods the bot uses and serves getUpdates from a queue of synthetic
+    updates. Every call that targets a chat is timestamped, which is what latencies are measured from.
+    """
+
+    def __init__(self, options: Options):
+        self.options = options
+        self.calls: Counter = Counter()
+        self._updates: List[dict] = []
+        self._next_update_id = 1
+        self._next_message_id: Dict[int, int] = defaultdict(lambda: 1)
+        self._new_update = asyncio.Condition()
+        self._chat_log: Dict[int, List[Tuple[float, str, str]]] = defaultdict(list)
+        self._chat_activity: Dict[int, asyncio.Event] = defaultdict(asyncio.Event)
+
+    def app(self) -> web.Application:
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post("/bot{token}/{method}", self._handle)
+        return app
+
+    # --- Driving side ---
+    async def send_command(self, user_id: int, text: str) -> float:
+        """Queues a private-chat message for the bot and returns the time it became available."""
+        command = text.split()[0]
+        message_id = self._take_message_id(user_id)
+        update = {
+            "update_id": self._next_update_id,
+            "message": {
+                "message_id": message_id, "date": int(time.time()), "text": text,
+                "chat": {"id": user_id, "type": "private", "first_name": f"load{user_id}"},
+                "from": {"id": user_id, "is_bot": False, "first_name": f"load{user_id}"},
+                "entities": [{"type": "bot_command", "offset": 0, "length": len(command)}],
+            },
+        }
+        self._next_update_id += 1
+        async with self._new_update:
+            self._updates.append(update)
+            self._new_update.notify_all()
+        return time.monotonic()
+
+    async def wait_until_quiet(self, chat_id: int, since: float) -> Tuple[List[Tuple[float, str, str]], bool]:
+        """
+        Waits until the bot has answered and then stayed silent in this chat for options.quiet seconds.
+        Returns the calls made since `since` and whether the command timed out instead.
+        """
+        deadline = since + self.options.command_timeout
+        activity = self._chat_activity[chat_id]
+        while True:
+            activity.clear()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return self._calls_since(chat_id, since), True
+            try:
+                await asyncio.wait_for(activity.wait(), timeout=min(self.options.quiet, remaining))
+            except asyncio.TimeoutError:
+                calls = self._calls_since(chat_id, since)
+                if calls and time.monotonic() - calls[-1][0] >= self.options.quiet:
+                    return calls, False
+
+    def _calls_since(self, chat_id: int, since: float) -> List[Tuple[float, str, str]]:
+        return [call for call in self._chat_log[chat_id] if call[0] >= since]
+
+    # --- Bot API side ---
+    def _take_message_id(self, chat_id: int) -> int:
+        message_id = self._next_message_id[chat_id]
+        self._next_message_id[chat_id] += 1
+        return message_id
+
+    def _message(self, chat_id: int, message_id: int, **extra) -> dict:
+        return {
+            "message_id": message_id, "date": int(time.time()), "from": BOT_USER,
+            "chat": {"id": chat_id, "type": "private", "first_name": f"load{chat_id}"}, **extra,
+        }
+
+    async def _get_updates(self, params: Dict[str, str]):
+        offset = int(params.get("offset") or 0)
+        timeout = float(params.get("timeout") or 0)
+        async with self._new_update:
+            self._updates = [u for u in self._updates if u["update_id"] >= offset]
+            if not self._updates and timeout > 0:
+                try:
+                    await asyncio.wait_for(self._new_update.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+            return list(self._updates[:int(params.get("limit") or 100)])
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        params = {key: value for key, value in (await request.post()).items() if isinstance(value, str)}
+        self.calls[method] += 1
+        if self.options.api_latency > 0 and method != "getUpdates":
+            await asyncio.sleep(self.options.api_latency)
+
+        chat_id = int(params["chat_id"]) if params.get("chat_id", "").lstrip("-").isdigit() else None
+        text = params.get("text") or params.get("caption") or ""
+        if method == "getMe":
+            result = BOT_USER
+        elif method == "getUpdates":
+            result = await self._get_updates(params)
+        elif chat_id is None:
+            result = True
+        elif method in ("sendMessage", "sendDocument", "sendPhoto"):
+            extra = {"text": text} if method == "sendMessage" else {
+                "document": {"file_id": "loadtest", "file_unique_id": "loadtest"}, "caption": text,
+            }
+            result = self._message(chat_id, self._take_message_id(chat_id), **extra)
+        elif method in ("editMessageText", "editMessageReplyMarkup"):
+            result = self._message(chat_id, int(params.get("message_id", 0)), text=text)
+        else:
+            result = True
+
+        if chat_id is not None:
+            self._chat_log[chat_id].append((time.monotonic(), method, text))
+            self._chat_activity[chat_id].set()
+        return web.json_response({"ok": True, "result": result})
+
+
+# ==============================================================================
+# 2. UPSTREAM STAND-INS
+# ==============================================================================
+def hackertarget_app(options: Options) -> web.Application:
+    """Plain-text answers shaped like HackerTarget's for every /<tool>/?q= endpoint."""
+
+    async def handle(request: web.Request) -> web.Response:
+        await _upstream_delay(options)
+        tool, query = request.match_info["tool"], request.query.get("q", "")
+        if tool in ("hostsearch", "reverseiplookup", "findshareddns"):
+            body = "\n".join(f"host{n}.{query},127.0.0.{n}" for n in range(1, 21))
+        elif tool == "dnslookup":
+            body = f"A : 127.0.0.1\nMX : 10 mail.{query}.\nNS : ns1.{TARGET_DOMAIN}.\nTXT : \"v=spf1 -all\""
+        elif tool == "whois":
+            body = f"Domain Name: {query}\nRegistrar: Load Test Registrar\nCreation Date: 2001-01-01"
+        else:
+            body = "\n".join(f"{tool} line {n} for {query}" for n in range(1, 31))
+        return web.Response(text=body)
+
+    app = web.Application()
+    app.router.add_get("/{tool}/", handle)
+    return app
+
+
+def crtsh_app(options: Options) -> web.Application:
+    async def handle(request: web.Request) -> web.Response:
+        await _upstream_delay(options)
+        domain = request.query.get("q", "").lstrip("%.")
+        entries = [
+            {"issuer_name": "C=US, O=Load Test CA", "common_name": f"www{n}.{domain}",
+             "name_value": f"www{n}.{domain}\napi{n}.{domain}\n*.{domain}", "id": n}
+            for n in range(50)
+        ]
+        return web.json_response(entries)
+
+    app = web.Application()
+    app.router.add_get("/", handle)
+    return app
+
+
+def target_site_app() -> web.Application:
+    """A website where a handful of well-known paths exist and everything else is a 404."""
+
+    async def handle(request: web.Request) -> web.Response:
+        name = request.path.rstrip("/").rsplit("/", 1)[-1]
+        if name in FOUND_PATHS:
+            return web.Response(text=f"<html><body>{name}</body></html>", content_type="text/html")
+        return web.Response(status=404, text="Not Found")
+
+    app = web.Application()
+    app.router.add_route("*", "/{path:.*}", handle)
+    return app
+
+
+class FakeDns(asyncio.DatagramProtocol):
+    """Answers every name with fixed records (A 127.0.0.1 and friends); CNAME gets an empty answer."""
+
+    RECORDS = {
+        dns.rdatatype.A: "127.0.0.1", dns.rdatatype.AAAA: "::1", dns.rdatatype.MX: f"10 mail.{TARGET_DOMAIN}.",
+        dns.rdatatype.NS: f"ns1.{TARGET_DOMAIN}.", dns.rdatatype.TXT: '"v=spf1 -all"',
+        dns.rdatatype.SOA: f"ns1.{TARGET_DOMAIN}. admin.{TARGET_DOMAIN}. 1 3600 600 86400 300",
+    }
+
+    def connection_made(self, transport) -> None:
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        try:
+            query = dns.message.from_wire(data)
+        except Exception:
+            return
+        response = dns.message.make_response(query)
+        question = query.question[0]
+        value = self.RECORDS.get(question.rdtype)
+        if value is not None:
+            response.answer.append(dns.rrset.from_text(question.name, 300, "IN", question.rdtype, value))
+        self.transport.sendto(response.to_wire(), addr)
+
+
+# ==============================================================================
+# 3. SIMULATED USERS
+# ==============================================================================
+def _command_text(name: str, target: str, site_url: str, wordlist: str) -> str:
+    if name == "recondora":
+        return f"/recondora {target} basic"
+    if name == "fuzz":
+        return f"/fuzz {site_url}/{target} {wordlist}"
+    return f"/{name} {target}"
+
+
+async def _simulated_user(user_id: int, options: Options, api: FakeBotApi, site_url: str, wordlist: str,
+                          results: List[CommandResult]) -> None:
+    rng = random.Random(options.seed * 100003 + user_id)
+    await asyncio.sleep(rng.uniform(0, options.ramp))
+    names, weights = zip(*options.mix.items())
+    for n in range(options.commands_per_user):
+        target = TARGET_DOMAIN if options.shared_target else f"u{user_id}-{n}.{TARGET_DOMAIN}"
+        name = rng.choices(names, weights)[0]
+        text = _command_text(name, target, site_url, wordlist)
+        sent_at = await api.send_command(user_id, text)
+        calls, timed_out = await api.wait_until_quiet(user_id, sent_at)
+        results.append(CommandResult(
+            user=user_id, command=name, text=text,
+            first_response=calls[0][0] - sent_at if calls else None,
+            completed=calls[-1][0] - sent_at if calls and not timed_out else None,
+            api_calls=len(calls),
+            error=any("❌" in call_text for _, _, call_text in calls),
+            timed_out=timed_out,
+        ))
+        await asyncio.sleep(options.think)
+
+
+async def _serve(app: web.Application, runners: list) -> int:
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    runners.append(runner)
+    return site._server.sockets[0].getsockname()[1]
+
+
+async def _world(conn, options: Options) -> None:
+    random.seed(options.seed)
+    api = FakeBotApi(options)
+    runners: list = []
+    ports = {
+        "telegram": await _serve(api.app(), runners),
+        "hackertarget": await _serve(hackertarget_app(options), runners),
+        "crtsh": await _serve(crtsh_app(options), runners),
+        "site": await _serve(target_site_app(), runners),
+    }
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(FakeDns, local_addr=("127.0.0.1", 0))
+    ports["dns"] = transport.get_extra_info("sockname")[1]
+
+    with tempfile.NamedTemporaryFile("w", prefix="loadtest-words-", suffix=".txt", delete=False) as f:
+        words = sorted(FOUND_PATHS) + [f"notfound{n}" for n in range(max(options.fuzz_words - len(FOUND_PATHS), 0))]
+        f.write("\n".join(words) + "\n")
+        wordlist = f.name
+
+    try:
+        conn.send(ports)
+        await loop.run_in_executor(None, conn.recv)  # The bot is up and polling
+
+        results: List[CommandResult] = []
+        started = time.monotonic()
+        site_url = f"http://127.0.0.1:{ports['site']}"
+        await asyncio.gather(*(
+            _simulated_user(1000 + n, options, api, site_url, wordlist, results) for n in range(options.users)
+        ))
+        conn.send({
+            "results": [asdict(result) for result in results],
+            "duration": time.monotonic() - started,
+            "api_calls": dict(api.calls),
+        })
+        await loop.run_in_executor(None, conn.recv)  # Keep answering until the bot has shut down
+    finally:
+        transport.close()
+        for runner in runners:
+            await runner.cleanup()
+        os.unlink(wordlist)
+
+
+def world_main(conn, options_json: str) -> None:
+    """Process entry point: reports the listening ports, then runs the users once told to start."""
+    asyncio.run(_world(conn, Options(**json.loads(options_json))))
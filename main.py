@@ -1,5 +1,7 @@
+import asyncio
 import logging
 import os
+import sys
 from telegram.ext import (
     Application,
     CommandHandler,
@@ -8,21 +10,9 @@ from telegram.ext import (
     filters,
     ConversationHandler, # Keep import if other conversations exist or for structure
     PersistenceInput, # Import PersistenceInput if using persistence
-    PicklePersistence, # Example: Import PicklePersistence
 )
-import Web
-# Import all command handlers
+# Import the handlers every session uses; the rest are imported on first use (handlers/lazy.py)
 from handlers.basic import start_command, help_command
-from handlers.network import (
-    lookup_command, nmap_command, rustscan_command, headers_command,
-    methods_command, revip_command
-)
-from handlers.data import (
-    base64_command, base64_button_handler, md5_command, urlencode_command,
-    urldecode_command, breach_command, cms_command, analyse_command, extract_command
-)
-from handlers.subdomain_finder import subdo_command
-from handlers.autoupload import autoupload_command # Assuming this was intended to be used
 from handlers.tool_handlers import (
     tool_command,
     tool_callback_handler,
@@ -32,7 +22,13 @@ from handlers.tool_handlers import (
 from handlers.recon import recon_handlers
 # Import fuzzer handlers and job registration
 from handlers.fuzzer import register_handlers as register_fuzzer_handlers
-from handlers.recondora import recon_doraemon_command # ADDED THIS LINE
+from handlers.lazy import lazy_callback as lazy
+from handlers.pager import page_callback_handler
+from handlers.operator import profile_command
+from services import metrics, stall_monitor
+from services.sqlite_persistence import SQLitePersistence
+from services.telegram_rate_limiter import TelegramRateLimiter
+from services.update_processor import ChatOrderedUpdateProcessor
 
 
 from utils import BOT_VERSION
@@ -40,6 +36,8 @@ from utils import BOT_VERSION
 # --- Configuration ---
 # The bot token is fetched from the environment variables.
 BOT_TOKEN = os.environ.get("BOT_TOKEN", "YOUR_BOT_TOKEN_HERE") # Use a default placeholder
+# Bot API server; point this at a local Bot API server (or the load-test stand-in) if needed
+TELEGRAM_API_URL = os.environ.get("TELEGRAM_API_URL", "https://api.telegram.org").rstrip("/")
 
 # Configure logging before application creation
 logging.basicConfig(
@@ -53,27 +51,55 @@ logging.getLogger("asyncio").setLevel(logging.WARNING) # Reduce verbosity for as
 
 logger = logging.getLogger(__name__) # Get logger for main script
 
-def main() -> None:
+
+async def post_init(application: Application) -> None:
+    # Publishes the bot's metrics for the /metrics route of Web.py (services/metrics.py)
+    metrics.start_runtime_metrics("bot")
+    # Logs the stack of whatever blocks the event loop for longer than LOOP_STALL_THRESHOLD
+    stall_monitor.watchdog.start()
+
+
+async def post_shutdown(application: Application) -> None:
+    await stall_monitor.watchdog.stop()
+    await metrics.stop_runtime_metrics()
+    http_client = sys.modules.get("services.http_client")
+    if http_client is not None:  # Only imported once a command has made an HTTP request
+        await http_client.close_session()
+
+def build_application() -> Application:
     """
-    This function sets up and runs the bot using polling.
-    It is completely independent of any web server.
+    Creates the Application with persistence and every handler registered.
+    Used by both polling mode and webhook mode (webhook.py).
     """
-    if not BOT_TOKEN or "YOUR_BOT_TOKEN_HERE" in BOT_TOKEN:
-        logger.critical("CRITICAL: BOT_TOKEN is not set or is using the default placeholder. The bot cannot start.")
-        print("Please set the BOT_TOKEN environment variable.")
-        return
-
     # Setup persistence
     # Make sure the directory for the persistence file exists
     persistence_dir = "persistence_data"
     os.makedirs(persistence_dir, exist_ok=True)
-    persistence_file = os.path.join(persistence_dir, "bot_persistence.pkl")
-    persistence = PicklePersistence(filepath=persistence_file)
+    persistence_file = os.path.join(persistence_dir, "bot_persistence.sqlite3")
+    # Rows are written only when they change; the old pickle file is imported once on first start
+    persistence = SQLitePersistence(
+        filepath=persistence_file,
+        legacy_pickle=os.path.join(persistence_dir, "bot_persistence.pkl"),
+    )
 
 
     # Create the Application instance
     # Use persistence to save conversation states and bot_data (like wordlist usage)
-    application = Application.builder().token(BOT_TOKEN).persistence(persistence).build()
+    # The shared HTTP pool (services/http_client.py) is closed when the bot shuts down
+    application = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .base_url(f"{TELEGRAM_API_URL}/bot")
+        .base_file_url(f"{TELEGRAM_API_URL}/file/bot")
+        .persistence(persistence)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        # Every outgoing message is paced per chat and globally to stay under Telegram's flood limits
+        .rate_limiter(TelegramRateLimiter())
+        # Different chats are served concurrently (bounded); each chat's updates stay in order for conversations
+        .concurrent_updates(ChatOrderedUpdateProcessor())
+        .build()
+    )
 
 
     # A single list of standard command/callback handlers
@@ -83,28 +109,36 @@ def main() -> None:
         CommandHandler("help", help_command),
 
         # Network handlers
-        CommandHandler("subdo", subdo_command),
-        CommandHandler("lookup", lookup_command),
-        CommandHandler("headers", headers_command),
-        CommandHandler("methods", methods_command),
-        CommandHandler("revip", revip_command),
-        CommandHandler("analyse", analyse_command),
-        CommandHandler("cms", cms_command),
-        CommandHandler("nmap", nmap_command),
-        CommandHandler("rustscan", rustscan_command),
-        CommandHandler("recondora", recon_doraemon_command), # ADDED THIS LINE
+        # Scheduled, long-running commands are non-blocking: they wait in the job scheduler's queue
+        # without holding an update slot or their chat's turn (services/update_processor.py)
+        CommandHandler("subdo", lazy("handlers.subdomain_finder:subdo_command")),
+        CommandHandler("lookup", lazy("handlers.network:lookup_command")),
+        CommandHandler("headers", lazy("handlers.network:headers_command")),
+        CommandHandler("methods", lazy("handlers.network:methods_command")),
+        CommandHandler("revip", lazy("handlers.network:revip_command")),
+        CommandHandler("analyse", lazy("handlers.data:analyse_command")),
+        CommandHandler("cms", lazy("handlers.data:cms_command")),
+        CommandHandler("nmap", lazy("handlers.network:nmap_command"), block=False),
+        CommandHandler("rustscan", lazy("handlers.network:rustscan_command"), block=False),
+        CommandHandler("recondora", lazy("handlers.recondora:recon_doraemon_command"), block=False), # ADDED THIS LINE
 
         # Data & Security handlers
-        CommandHandler("breach", breach_command),
-        CommandHandler("extract", extract_command),
-        CommandHandler("base64", base64_command),
-        CallbackQueryHandler(base64_button_handler, pattern="^b64_"),
-        CommandHandler("md5", md5_command),
-        CommandHandler("urlencode", urlencode_command),
-        CommandHandler("urldecode", urldecode_command),
+        CommandHandler("breach", lazy("handlers.data:breach_command")),
+        CommandHandler("extract", lazy("handlers.data:extract_command")),
+        CommandHandler("base64", lazy("handlers.data:base64_command")),
+        CallbackQueryHandler(lazy("handlers.data:base64_button_handler"), pattern="^b64_"),
+
+        # ◀ ▶ buttons of long, paged outputs
+        CallbackQueryHandler(page_callback_handler, pattern="^page_"),
+        CommandHandler("md5", lazy("handlers.data:md5_command")),
+        CommandHandler("urlencode", lazy("handlers.data:urlencode_command")),
+        CommandHandler("urldecode", lazy("handlers.data:urldecode_command")),
+
+        # Operator-only diagnostics; non-blocking so the bot keeps serving updates while it profiles
+        CommandHandler("profile", profile_command, block=False),
 
         # Autoupload handler
-        CommandHandler("autoupload", autoupload_command),
+        CommandHandler("autoupload", lazy("handlers.autoupload:autoupload_command")),
 
         # Tool handlers (/tool command and callback)
         CommandHandler("tool", tool_command),
@@ -129,8 +163,10 @@ def main() -> None:
     # Register fuzzer handlers which also schedules the cleanup job
     register_fuzzer_handlers(application)
 
+    # Time, log and count every handler invocation (logs and /metrics)
+    stall_monitor.instrument(application)
+
 
-    logger.info(f"Doraemon Cyber Team Bot v{BOT_VERSION} is starting in polling mode...")
     logger.info("Registered Handlers:")
     # List handlers for debugging/verification
     # Note: Getting a clean list of all registered handlers can be complex
@@ -149,14 +185,30 @@ def main() -> None:
              logger.info(f"- MessageHandler (Filters: {handler.filters})")
 
 
-    # Start the bot polling loop
-    # The Web.start() call is outside this loop and won't be reached in polling mode.
-    application.run_polling(poll_interval=3.0) # Add poll_interval
+    return application
+
+
+def main() -> None:
+    """
+    Runs the bot. With WEBHOOK_URL set, one hypercorn process serves the Telegram webhook
+    and the web UI (see webhook.py); otherwise the bot long-polls and Web.py runs separately.
+    """
+    if not BOT_TOKEN or "YOUR_BOT_TOKEN_HERE" in BOT_TOKEN:
+        logger.critical("CRITICAL: BOT_TOKEN is not set or is using the default placeholder. The bot cannot start.")
+        print("Please set the BOT_TOKEN environment variable.")
+        return
+
+    application = build_application()
+
+    if os.environ.get("WEBHOOK_URL"):
+        import webhook
+        logger.info(f"Doraemon Cyber Team Bot v{BOT_VERSION} is starting in webhook mode...")
+        asyncio.run(webhook.run_webhook(application))
+    else:
+        logger.info(f"Doraemon Cyber Team Bot v{BOT_VERSION} is starting in polling mode...")
+        # Long polling returns as soon as an update arrives, so no extra poll_interval delay
+        application.run_polling()
 
 
 if __name__ == "__main__":
-    # This Web.start() call will only run if main() exits, which it won't in polling mode.
-    # Consider removing or refactoring for a proper web/webhook deployment.
-    #Web.start() # Commenting out as it won't be reached in polling mode
     main()
-    Web.start()
@@ -0,0 +1,191 @@
+# recon_tools.py
+# The ReconDora tool definitions and executors, shared by the bot handlers and the web UI (Web.py).
+# Kept apart from Web.py so the bot does not import the web frontend to learn which tools exist.
+
+import asyncio
+import re
+from typing import AsyncIterator, Optional, Set
+
+import aiohttp
+import dns.exception
+import dns.resolver
+
+from services import api_quota, http_client, dns_resolver
+from services.process_supervisor import run_tool
+from services.result_cache import result_cache
+from services.singleflight import SingleFlight
+
+# --- START of ReconDora Logic (Centralized for Web & Bot) ---
+
+# ==============================================================================
+# 1. API-BASED TOOLS (HackerTarget)
+# ==============================================================================
+ENDPOINTS = {
+    "hostsearch": f"{api_quota.HACKERTARGET_URL}/hostsearch/?q=",
+    "dnslookup": f"{api_quota.HACKERTARGET_URL}/dnslookup/?q=",
+    "whois": f"{api_quota.HACKERTARGET_URL}/whois/?q=",
+    "geoip": f"{api_quota.HACKERTARGET_URL}/geoip/?q=",
+    "reverseiplookup": f"{api_quota.HACKERTARGET_URL}/reverseiplookup/?q=",
+    "findshareddns": f"{api_quota.HACKERTARGET_URL}/findshareddns/?q=",
+    "zonetransfer": f"{api_quota.HACKERTARGET_URL}/zonetransfer/?q=",
+    "httpheaders": f"{api_quota.HACKERTARGET_URL}/httpheaders/?q=",
+    "pagelinks": f"{api_quota.HACKERTARGET_URL}/pagelinks/?q=",
+    "nmap": f"{api_quota.HACKERTARGET_URL}/nmap/?q=",
+    "mtr": f"{api_quota.HACKERTARGET_URL}/mtr/?q=",
+    "aslookup": f"{api_quota.HACKERTARGET_URL}/aslookup/?q="
+}
+
+TOOL_DESCRIPTIONS = {
+    "hostsearch": "Finds hostnames and subdomains using the same name server.",
+    "dnslookup": "Performs a standard DNS lookup for the target.",
+    "whois": "Retrieves WHOIS registration data for a domain.",
+    "geoip": "Finds the geographical location of an IP address.",
+    "reverseiplookup": "Finds hostnames sharing the same IP address.",
+    "findshareddns": "Finds hosts that share the same DNS servers.",
+    "zonetransfer": "Attempts a DNS zone transfer for the domain.",
+    "httpheaders": "Retrieves the HTTP response headers from the target.",
+    "pagelinks": "Scrapes a page for all links, both internal and external.",
+    "nmap": "Runs a quick Nmap port scan on the target.",
+    "mtr": "Performs an MTR traceroute to the target.",
+    "aslookup": "Looks up the Autonomous System (AS) number for the target."
+}
+
+TOOL_GROUPS = {
+    "basic": ["hostsearch", "dnslookup", "whois"],
+    "network": ["nmap", "mtr", "geoip", "aslookup"],
+    "web": ["httpheaders", "pagelinks"],
+    "dns": ["hostsearch", "dnslookup", "findshareddns", "zonetransfer", "reverseiplookup"],
+    "all": list(ENDPOINTS.keys())
+}
+
+# ==============================================================================
+# 2. LOCAL COMMAND-LINE TOOLS
+# ==============================================================================
+LOCAL_TOOLS = {
+    "local_ping": {
+        "name": "Ping",
+        "description": "Sends 4 ICMP packets to the target to check for reachability.",
+        "command": ["ping", "-c", "4", "{target}"]
+    },
+    "local_curl_headers": {
+        "name": "Curl Headers",
+        "description": "Fetches HTTP headers using the curl command.",
+        "command": ["curl", "-I", "--silent", "{target}"]
+    },
+}
+
+def resolve_tools_from_args(args: list[str]) -> Set[str]:
+    """
+    Resolves a list of user-provided arguments into a final set of tools to run.
+    Handles tool groups and individual tool keys.
+    """
+    # If no tools are specified, default to the 'basic' group.
+    selected_keys = args if args else ['basic']
+    
+    tools_to_run = set()
+    for key in selected_keys:
+        key = key.lower()
+        if key in TOOL_GROUPS:
+            tools_to_run.update(TOOL_GROUPS[key])
+        elif key in ENDPOINTS or key in LOCAL_TOOLS:
+            tools_to_run.add(key)
+            
+    return tools_to_run
+
+# ==============================================================================
+# 3. CORE EXECUTOR LOGIC
+# ==============================================================================
+
+# --- API Tool Executor ---
+async def fetch_tool(domain: str, tool: str, session: Optional[aiohttp.ClientSession] = None) -> tuple[str, str]:
+    """
+    Runs one HackerTarget tool. Uses the shared pooled session unless one is passed in.
+    Answers are cached per (tool, domain); request errors are not. Calls go through the
+    HackerTarget quota, so they fail at once when the API would refuse them anyway.
+    """
+    try:
+        session = session or http_client.get_session()
+        url = ENDPOINTS[tool] + domain
+        headers = {'User-Agent': 'Doraemon-Cyber-Tool/1.0'}
+        text_content = await result_cache.get_or_fetch(
+            tool, domain,
+            lambda: api_quota.hackertarget_get(
+                session, url, timeout=aiohttp.ClientTimeout(total=45), headers=headers
+            ),
+            ttl=api_quota.hackertarget_ttl,  # "error check your search query" answers are not cached
+        )
+        if api_quota.HACKERTARGET_QUERY_ERROR in text_content:
+            return tool, "API Error: Invalid domain or query."
+        return tool.strip(), text_content.strip()
+    except api_quota.QuotaExceededError as e:
+        return tool, f"[API Quota] {e}"
+    except aiohttp.ClientError as e:
+        return tool, f"[API Request Error] {e}"
+    except asyncio.TimeoutError:
+        return tool, "[API Request Error] Request timed out after 45 seconds."
+    except Exception as e:
+        return tool, f"[Unexpected Error] {e}"
+
+# --- Local Tool Executor ---
+_local_tool_flights = SingleFlight("local_tools")
+
+async def run_local_tool(target: str, tool_key: str) -> tuple[str, str]:
+    tool_config = LOCAL_TOOLS.get(tool_key)
+    tool_name = tool_config.get("name", tool_key)
+
+    if not re.match(r"^[a-zA-Z0-9.-]+$", target):
+        return tool_name, f"[Validation Error] Invalid target format: {target}"
+
+    # Fail fast on names that do not exist instead of spawning a process to find out.
+    # The answer is cached by the shared resolver, which the tool's own lookup then benefits from.
+    if not re.match(r"^[0-9.]+$", target):
+        try:
+            await dns_resolver.resolve(target, "A")
+        except dns.resolver.NXDOMAIN:
+            return tool_name, f"[Resolution Error] The domain '{target}' does not exist."
+        except dns.exception.DNSException:
+            pass
+
+    try:
+        command_to_run = [arg.replace("{target}", target) for arg in tool_config["command"]]
+        # Identical runs started while this one is going (a link shared in a group) wait for it
+        run = await _local_tool_flights.do(
+            (tool_key, target.lower()), lambda: run_tool(command_to_run, timeout=60)
+        )
+        output = (run.stdout + run.stderr).strip()
+        
+        if not output:
+            output = "[No output from command]"
+        return tool_name, output
+    except FileNotFoundError:
+        return tool_name, f"[Execution Error] Command not found: '{tool_config['command'][0]}'. Is it installed and in your PATH?"
+    except asyncio.TimeoutError:
+        return tool_name, "[Execution Error] Command timed out after 60 seconds."
+    except Exception as e:
+        return tool_name, f"[Unexpected Execution Error] {str(e)}"
+
+# --- Recon Orchestration ---
+async def _keyed(tool_key: str, coroutine) -> tuple[str, str, str]:
+    name, output = await coroutine
+    return tool_key, name, output
+
+async def iter_recon_results(domain: str, tools, session: Optional[aiohttp.ClientSession] = None) -> AsyncIterator[tuple[str, str, str]]:
+    """
+    Runs the selected API and local tools concurrently and yields (tool_key, name, output)
+    as each one finishes, so fast tools are shown without waiting for nmap or mtr.
+    Tools still running are cancelled if the caller stops iterating.
+    """
+    tasks = []
+    for tool_key in tools:
+        if tool_key in ENDPOINTS:
+            tasks.append(asyncio.ensure_future(_keyed(tool_key, fetch_tool(domain, tool_key, session))))
+        elif tool_key in LOCAL_TOOLS:
+            tasks.append(asyncio.ensure_future(_keyed(tool_key, run_local_tool(domain, tool_key))))
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            yield await next_result
+    finally:
+        for task in tasks:
+            task.cancel()
+
+# --- END of Core Logic ---
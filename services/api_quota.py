@@ -0,0 +1,208 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+import aiohttp
+
+from services import http_client
+
+logger = logging.getLogger(__name__)
+
+# --- Quota Configuration ---
+HACKERTARGET_URL = os.environ.get("HACKERTARGET_URL", "https://api.hackertarget.com").rstrip("/")  # Overridable for local stand-ins
+http_client.track_endpoint("hackertarget", HACKERTARGET_URL, by_path=True)
+# Free HackerTarget plans allow a fixed number of queries per IP per day and a few per second.
+HACKERTARGET_DAILY_LIMIT = int(os.environ.get("HACKERTARGET_DAILY_LIMIT", "100"))
+HACKERTARGET_RATE = float(os.environ.get("HACKERTARGET_RATE", "2"))      # Requests per second
+HACKERTARGET_BURST = int(os.environ.get("HACKERTARGET_BURST", "3"))      # Requests allowed back to back
+MAX_WAIT = float(os.environ.get("QUOTA_MAX_WAIT", "30"))                # Longer waits fail fast instead
+BACKOFF_INITIAL = 30         # Seconds to stop calling after a 429 without Retry-After
+BACKOFF_MAX = 900
+STATE_FILE = os.path.join("persistence_data", "api_quota.json")
+
+# HackerTarget answers 200 with this body once the daily quota is used up
+HACKERTARGET_LIMIT_MARKER = "API count exceeded"
+# ... and with this one for a query it cannot answer (a malformed domain or IP)
+HACKERTARGET_QUERY_ERROR = "error check your search query"
+
+_state_file_lock = threading.Lock()
+
+
+def hackertarget_ttl(body: str) -> Optional[float]:
+    """Result cache lifetime of a HackerTarget answer: 0 (not cached) for error bodies, else the tool's TTL."""
+    return 0 if HACKERTARGET_QUERY_ERROR in body else None
+
+
+class QuotaExceededError(Exception):
+    """Raised instead of making a call that is certain to be refused by the upstream API."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _utc_day() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+def _seconds_until_utc_midnight() -> float:
+    now = datetime.now(timezone.utc)
+    midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return (midnight - now).total_seconds()
+
+
+class ApiQuota:
+    """
+    Client-side quota for one upstream API: a token bucket (GCRA) for the per-second rate,
+    a daily counter that resets at UTC midnight and survives restarts, and a back-off window
+    after the API reports it is rate limiting us. Thread-safe; the daily counter is shared
+    with the web workers through the state file.
+    """
+
+    def __init__(self, name: str, rate: float, burst: int, daily_limit: int, state_file: Optional[str] = STATE_FILE):
+        self.name = name
+        self.interval = 1.0 / rate
+        self.tolerance = (burst - 1) * self.interval
+        self.daily_limit = daily_limit
+        self.state_file = state_file
+        self._lock = threading.Lock()
+        self._tat = 0.0                 # Theoretical arrival time of the next request (monotonic clock)
+        self._blocked_until = 0.0       # Wall-clock time before which every call fails fast
+        self._backoff = BACKOFF_INITIAL
+        self._day = _utc_day()
+        self._used = 0
+        self._load_state()
+
+    # --- Daily counter persistence ---
+
+    def _load_state(self) -> None:
+        if not self.state_file:
+            return
+        try:
+            with open(self.state_file, 'r') as f:
+                state = json.load(f).get(self.name, {})
+        except (OSError, ValueError):
+            return
+        if state.get("day") == self._day:
+            self._used = int(state.get("used", 0))
+        self._blocked_until = float(state.get("blocked_until", 0))
+
+    def _save_state(self) -> None:
+        if not self.state_file:
+            return
+        with _state_file_lock:
+            try:
+                with open(self.state_file, 'r') as f:
+                    states = json.load(f)
+            except (OSError, ValueError):
+                states = {}
+            with self._lock:
+                states[self.name] = {"day": self._day, "used": self._used, "blocked_until": self._blocked_until}
+            try:
+                os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+                tmp_path = f"{self.state_file}.tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump(states, f)
+                os.replace(tmp_path, self.state_file)
+            except OSError as e:
+                logger.warning(f"Could not persist {self.name} quota state: {e}")
+
+    # --- Admission ---
+
+    @property
+    def remaining_today(self) -> int:
+        with self._lock:
+            self._roll_day()
+            return max(self.daily_limit - self._used, 0)
+
+    def _roll_day(self) -> None:
+        day = _utc_day()
+        if day != self._day:
+            self._day, self._used = day, 0
+
+    def _reserve(self, max_wait: float) -> float:
+        """Claims the next request slot and returns how long to sleep before using it."""
+        with self._lock:
+            self._roll_day()
+            if time.time() < self._blocked_until:
+                raise QuotaExceededError(
+                    f"{self.name} is refusing requests; try again later.", self._blocked_until - time.time()
+                )
+            if self._used >= self.daily_limit:
+                raise QuotaExceededError(
+                    f"Daily {self.name} quota of {self.daily_limit} requests is used up.", _seconds_until_utc_midnight()
+                )
+            now = time.monotonic()
+            tat = max(self._tat, now)
+            wait = max(tat - self.tolerance - now, 0.0)
+            if wait > max_wait:
+                raise QuotaExceededError(f"Too many queued {self.name} requests; try again shortly.", wait)
+            self._tat = tat + self.interval
+            self._used += 1
+            return wait
+
+    async def acquire(self, max_wait: float = MAX_WAIT) -> None:
+        """
+        Waits for a request slot, at most max_wait seconds.
+        Raises QuotaExceededError immediately when the call could not succeed.
+        """
+        wait = self._reserve(max_wait)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        await asyncio.to_thread(self._save_state)
+
+    # --- Feedback from responses ---
+
+    async def report_limited(self, retry_after: Optional[float] = None, daily: bool = False) -> None:
+        """Stops all calls for a while after the API said we are over a limit."""
+        with self._lock:
+            if daily:
+                self._used = self.daily_limit
+                delay = _seconds_until_utc_midnight()
+            else:
+                delay = retry_after if retry_after is not None else self._backoff
+                self._backoff = min(self._backoff * 2, BACKOFF_MAX)
+            self._blocked_until = max(self._blocked_until, time.time() + delay)
+        logger.warning(f"{self.name} reported a rate limit; pausing calls for {delay:.0f}s.")
+        await asyncio.to_thread(self._save_state)
+
+    def report_success(self) -> None:
+        with self._lock:
+            self._backoff = BACKOFF_INITIAL
+
+    def status(self) -> Dict[str, float]:
+        with self._lock:
+            self._roll_day()
+            return {
+                "used_today": self._used,
+                "daily_limit": self.daily_limit,
+                "blocked_for": max(self._blocked_until - time.time(), 0.0),
+            }
+
+
+hackertarget = ApiQuota("HackerTarget", HACKERTARGET_RATE, HACKERTARGET_BURST, HACKERTARGET_DAILY_LIMIT)
+
+
+async def hackertarget_get(session: aiohttp.ClientSession, url: str, **kwargs) -> str:
+    """
+    GETs a HackerTarget API URL within the shared quota and returns the body text.
+    Raises QuotaExceededError (without calling out when possible), or aiohttp errors.
+    """
+    await hackertarget.acquire()
+    async with session.get(url, **kwargs) as resp:
+        if resp.status == 429:
+            retry_after = resp.headers.get("Retry-After")
+            await hackertarget.report_limited(float(retry_after) if retry_after and retry_after.isdigit() else None)
+            raise QuotaExceededError("HackerTarget is rate limiting requests; try again later.", hackertarget.status()["blocked_for"])
+        resp.raise_for_status()
+        body = await resp.text()
+    if HACKERTARGET_LIMIT_MARKER in body:
+        await hackertarget.report_limited(daily=True)
+        raise QuotaExceededError("Daily HackerTarget quota is used up.", _seconds_until_utc_midnight())
+    hackertarget.report_success()
+    return body
@@ -0,0 +1,347 @@
+import asyncio
+import atexit
+import base64
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import warnings
+from collections import defaultdict
+from io import BytesIO
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+import aiohttp
+import requests
+from multidict import CIMultiDict, CIMultiDictProxy
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from yarl import URL
+
+logger = logging.getLogger(__name__)
+
+# --- Cassette Configuration ---
+# HTTP_CASSETTE=tests/cassettes/recon.jsonl.gz HTTP_CASSETTE_MODE=record python main.py
+CASSETTE_PATH = os.environ.get("HTTP_CASSETTE", "")
+CASSETTE_MODE = os.environ.get("HTTP_CASSETTE_MODE", "replay")
+
+RECORD = "record"               # Real requests; every response is appended to the cassette
+REPLAY = "replay"               # Recorded responses only, each delayed by its original response time
+REPLAY_FAST = "replay-fast"     # Recorded responses only, returned at once
+MODES = (RECORD, REPLAY, REPLAY_FAST)
+
+# The stored body is already decoded, so these would describe it wrongly on replay
+_DROPPED_HEADERS = {"content-encoding", "transfer-encoding", "content-length"}
+
+
+class CassetteMissError(LookupError):
+    """No recorded response matches a request made while replaying."""
+
+
+def request_key(method: str, url: str, body: Optional[bytes]) -> Tuple[str, str, Optional[str]]:
+    """(METHOD, URL with sorted query, body digest) — what a replayed request is matched on."""
+    parsed = URL(url)
+    if parsed.query:
+        parsed = parsed.with_query(sorted(parsed.query.items()))
+    digest = hashlib.sha1(body).hexdigest()[:16] if body else None
+    return method.upper(), str(parsed), digest
+
+
+class Cassette:
+    """
+    A gzip-compressed JSON-lines file of HTTP interactions, one object per line:
+    {"method", "url", "body", "status", "reason", "headers", "text" | "b64", "elapsed"}.
+    While replaying, interactions with the same key are returned in recorded order and
+    the last one is repeated once they run out, so a benchmark can loop over a short recording.
+    """
+
+    def __init__(self, path: str, mode: str = REPLAY):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode {mode!r}; expected one of {', '.join(MODES)}.")
+        self.path = path
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._interactions: Dict[Tuple[str, str, Optional[str]], List[dict]] = defaultdict(list)
+        self._cursor: Dict[Tuple[str, str, Optional[str]], int] = defaultdict(int)
+        self._writer: Optional[gzip.GzipFile] = None
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+        if mode != RECORD:
+            self._load()
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode != RECORD
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            logger.warning(f"Cassette {self.path} does not exist; every request will miss.")
+            return
+        count = 0
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            try:
+                for line in f:
+                    if line.strip():
+                        interaction = json.loads(line)
+                        key = (interaction["method"], interaction["url"], interaction.get("body"))
+                        self._interactions[key].append(interaction)
+                        count += 1
+            except EOFError:
+                logger.warning(f"Cassette {self.path} ends mid-stream (recording was interrupted); using what was read.")
+        logger.info(f"Loaded {count} recorded HTTP interactions from {self.path} ({self.mode}).")
+
+    def find(self, method: str, url: str, body: Optional[bytes]) -> dict:
+        key = request_key(method, url, body)
+        with self._lock:
+            recorded = self._interactions.get(key)
+            if not recorded:
+                self.misses += 1
+                raise CassetteMissError(f"No recorded response for {key[0]} {key[1]} in {self.path}")
+            index = self._cursor[key]
+            self._cursor[key] = min(index + 1, len(recorded) - 1)
+            self.hits += 1
+            return recorded[index]
+
+    def record(self, method: str, url: str, body: Optional[bytes], status: int, reason: str,
+               headers: List[Tuple[str, str]], content: bytes, elapsed: float) -> None:
+        key_method, key_url, digest = request_key(method, url, body)
+        interaction: Dict[str, Any] = {
+            "method": key_method, "url": key_url, "body": digest, "status": status, "reason": reason or "",
+            "headers": [[k, v] for k, v in headers if k.lower() not in _DROPPED_HEADERS],
+            "elapsed": round(elapsed, 4),
+        }
+        try:
+            interaction["text"] = content.decode("utf-8")
+        except UnicodeDecodeError:
+            interaction["b64"] = base64.b64encode(content).decode("ascii")
+        line = (json.dumps(interaction, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        with self._lock:
+            if self._writer is None:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self._writer = gzip.open(self.path, "ab")  # Appends a new gzip member; readers see one stream
+                atexit.register(self.close)
+            self._writer.write(line)
+            self._writer.flush()  # Sync flush: a killed process keeps everything written so far
+            self.recorded += 1
+
+    def close(self) -> None:
+        with self._lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+
+def body_of(interaction: dict) -> bytes:
+    if "b64" in interaction:
+        return base64.b64decode(interaction["b64"])
+    return interaction.get("text", "").encode("utf-8")
+
+
+_active: Optional[Cassette] = None
+_configured = False
+
+
+def current() -> Optional[Cassette]:
+    """The cassette HTTP traffic goes through, or None. The first call applies HTTP_CASSETTE."""
+    global _active, _configured
+    if not _configured:
+        _configured = True
+        if CASSETTE_PATH and _active is None:
+            _active = Cassette(CASSETTE_PATH, CASSETTE_MODE)
+    return _active
+
+
+def activate(path: str, mode: str = REPLAY) -> Cassette:
+    """
+    Routes HTTP traffic through the given cassette (for tests and benchmarks). aiohttp sessions
+    created before this call are plain sessions; call http_client.close_session() first.
+    """
+    global _active, _configured
+    deactivate()
+    _active, _configured = Cassette(path, mode), True
+    return _active
+
+
+def deactivate() -> None:
+    global _active, _configured
+    if _active is not None:
+        _active.close()
+    _active, _configured = None, True
+
+
+# ==============================================================================
+# aiohttp
+# ==============================================================================
+def _aiohttp_body(data: Any, json_body: Any) -> Optional[bytes]:
+    """Request body bytes for matching; multipart/streamed bodies are not part of the key."""
+    if json_body is not None:
+        return json.dumps(json_body, sort_keys=True).encode("utf-8")
+    if isinstance(data, bytes):
+        return data
+    if isinstance(data, str):
+        return data.encode("utf-8")
+    if isinstance(data, dict):
+        return urlencode(sorted(data.items()), doseq=True).encode("utf-8")
+    return None
+
+
+class _ReplayedStream:
+    """The parts of aiohttp.StreamReader (ClientResponse.content) callers use."""
+
+    def __init__(self, body: bytes):
+        self._buffer = BytesIO(body)
+
+    async def read(self, n: int = -1) -> bytes:
+        return self._buffer.read(n)
+
+    async def iter_chunked(self, n: int):
+        while chunk := self._buffer.read(n):
+            yield chunk
+
+
+class ReplayedResponse:
+    """The parts of aiohttp.ClientResponse the handlers use, backed by a recorded interaction."""
+
+    def __init__(self, interaction: dict, method: str, url: URL):
+        self.status = interaction["status"]
+        self.reason = interaction.get("reason", "")
+        self.headers = CIMultiDictProxy(CIMultiDict(interaction["headers"]))
+        self.method = method
+        self.url = self.real_url = url
+        self.history = ()
+        self.request_info = aiohttp.RequestInfo(url, method, CIMultiDictProxy(CIMultiDict()), url)
+        self._body = body_of(interaction)
+        self.content = _ReplayedStream(self._body)
+        self.content_type = self.headers.get("Content-Type", "application/octet-stream").split(";")[0].strip()
+        self.charset = get_encoding_from_headers(self.headers) if "charset=" in self.headers.get("Content-Type", "") else None
+
+    @property
+    def ok(self) -> bool:
+        return self.status < 400
+
+    async def read(self) -> bytes:
+        return self._body
+
+    async def text(self, encoding: Optional[str] = None, errors: str = "strict") -> str:
+        return self._body.decode(encoding or self.charset or "utf-8", errors)
+
+    async def json(self, *, encoding: Optional[str] = None, loads=json.loads, content_type: Optional[str] = None) -> Any:
+        text = await self.text(encoding)
+        return loads(text) if text.strip() else None
+
+    def raise_for_status(self) -> None:
+        if self.status >= 400:
+            raise aiohttp.ClientResponseError(
+                self.request_info, self.history, status=self.status, message=self.reason, headers=self.headers,
+            )
+
+    def release(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    async def wait_for_close(self) -> None:
+        pass
+
+    async def __aenter__(self) -> "ReplayedResponse":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        pass
+
+
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore", DeprecationWarning)  # aiohttp discourages subclassing; _request is the one hook that sees every call
+
+    class CassetteClientSession(aiohttp.ClientSession):
+        """
+        ClientSession that records to, or replays from, the active cassette. It overrides aiohttp's
+        private _request, so http_client only uses it while a cassette is active.
+        """
+
+        async def _request(self, method: str, str_or_url, *, params=None, data=None, json=None, **kwargs):
+            cassette = current()
+            if cassette is None:
+                return await super()._request(method, str_or_url, params=params, data=data, json=json, **kwargs)
+
+            url = URL(str_or_url) if self._base_url is None else self._base_url.join(URL(str_or_url))
+            if params:
+                url = url.extend_query(params)
+            body = _aiohttp_body(data, json)
+
+            if cassette.replaying:
+                try:
+                    interaction = cassette.find(method, str(url), body)
+                except CassetteMissError as e:
+                    logger.warning(str(e))
+                    raise aiohttp.ClientConnectionError(str(e)) from e
+                if cassette.mode == REPLAY:
+                    await asyncio.sleep(interaction["elapsed"])
+                return ReplayedResponse(interaction, method.upper(), url)
+
+            started = time.monotonic()
+            response = await super()._request(method, url, data=data, json=json, **kwargs)
+            content = await response.read()  # Cached on the response, so the caller can still read it
+            response.content = _ReplayedStream(content)  # ... or stream it, which read() has drained
+            cassette.record(method, str(url), body, response.status, response.reason,
+                            list(response.headers.items()), content, time.monotonic() - started)
+            return response
+
+
+# ==============================================================================
+# requests
+# ==============================================================================
+class CassetteAdapter(HTTPAdapter):
+    """HTTPAdapter that records to, or replays from, the active cassette (a plain adapter when there is none)."""
+
+    def send(self, request: requests.PreparedRequest, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        cassette = current()
+        if cassette is None:
+            return super().send(request, stream=stream, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+
+        body = request.body.encode("utf-8") if isinstance(request.body, str) else request.body
+        if not isinstance(body, bytes) or "multipart/" in request.headers.get("Content-Type", ""):
+            body = None  # Streamed or multipart bodies (random boundary) are not part of the key
+
+        if cassette.replaying:
+            try:
+                interaction = cassette.find(request.method, request.url, body)
+            except CassetteMissError as e:
+                logger.warning(str(e))
+                raise requests.exceptions.ConnectionError(str(e), request=request) from e
+            if cassette.mode == REPLAY:
+                time.sleep(interaction["elapsed"])  # requests callers already run in worker threads
+            return self._replayed(request, interaction)
+
+        started = time.monotonic()
+        response = super().send(request, stream=stream, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+        cassette.record(request.method, request.url, body, response.status_code, response.reason,
+                        list(response.headers.items()), response.content, time.monotonic() - started)
+        return response
+
+    @staticmethod
+    def _replayed(request: requests.PreparedRequest, interaction: dict) -> requests.Response:
+        response = requests.Response()
+        response.status_code = interaction["status"]
+        response.reason = interaction.get("reason", "")
+        response.headers = CaseInsensitiveDict(interaction["headers"])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response._content = body_of(interaction)
+        response.raw = BytesIO(response._content)
+        return response
+
+
+def mount(session: requests.Session) -> requests.Session:
+    """Routes a requests Session's http(s) traffic through the cassette adapter."""
+    adapter = CassetteAdapter()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
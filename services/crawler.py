@@ -1,75 +1,199 @@
 import asyncio
-from urllib.parse import urljoin, urlparse
-import requests
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode, urljoin, urlparse, urlsplit, urlunsplit
+
+import aiohttp
 from bs4 import BeautifulSoup
-from collections import deque
+
+from services import http_client
+
+logger = logging.getLogger(__name__)
+
+# --- Crawler Configuration ---
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) TelegramBotCrawler/1.0"
+CONCURRENCY = int(os.environ.get("CRAWLER_CONCURRENCY", "8"))        # Pages fetched at once per crawl
+PER_HOST_CONCURRENCY = int(os.environ.get("CRAWLER_PER_HOST", "4"))  # Requests in flight to one host
+PER_HOST_DELAY = float(os.environ.get("CRAWLER_PER_HOST_DELAY", "0.05"))  # Seconds between request starts to one host
+MAX_BODY_BYTES = 2 * 1024 * 1024    # Larger pages are parsed up to this size
+FETCH_TIMEOUT = aiohttp.ClientTimeout(total=10, connect=5)
+READ_CHUNK = 64 * 1024
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical form used to deduplicate the frontier: lower-case scheme and host, no default port,
+    no credentials or fragment, "/" for an empty path and the query parameters sorted.
+    Raises ValueError for URLs with an invalid port.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if ":" in host:
+        host = f"[{host}]"  # IPv6 literal
+    port = parts.port
+    netloc = host if port is None or _DEFAULT_PORTS.get(scheme) == port else f"{host}:{port}"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, netloc, parts.path or "/", query, ""))
+
 
 class AdvancedCrawler:
-    def __init__(self, base_url, max_depth=2, max_pages=10):
+    """
+    Breadth-first crawler of one site over the shared aiohttp pool.
+    `concurrency` fetchers work off one frontier. URLs are normalised and deduplicated when they
+    are queued, so every page is requested once. Pages deeper than max_depth are never queued,
+    and at most max_pages pages are kept: a fetch only starts while the successful fetches plus
+    the ones in flight are below it, so failed fetches do not use up the budget. Requests to
+    one host are limited to `per_host` at a time, started at least PER_HOST_DELAY apart.
+    """
+
+    def __init__(self, base_url, max_depth=2, max_pages=10, concurrency=CONCURRENCY, per_host=PER_HOST_CONCURRENCY):
         self.base_url = base_url
         self.max_depth = max_depth
         self.max_pages = max_pages
+        self.concurrency = max(1, concurrency)
+        self.per_host = max(1, per_host)
         self.visited = set()
         self.discovered_urls = set()
-        self.session = requests.Session()
-        self.session.headers.update({
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) TelegramBotCrawler/1.0"
-        })
-    
+        self._base_netloc = urlparse(base_url).netloc.lower()
+        self._queued: Set[str] = set()
+        self._in_flight = 0
+        self._budget: Optional[asyncio.Condition] = None
+        self._hosts: Dict[str, Tuple[asyncio.Semaphore, List[float]]] = {}
+
     async def crawl(self):
-        queue = deque([(self.base_url, 0)])
-        
-        while queue and len(self.visited) < self.max_pages:
-            url, depth = queue.popleft()
-            
-            if depth > self.max_depth:
-                continue
-                
-            if url in self.visited:
-                continue
-                
+        try:
+            start = normalize_url(self.base_url)
+        except ValueError:
+            return
+        session = http_client.get_session()
+        frontier: "asyncio.Queue[Tuple[str, int]]" = asyncio.Queue()
+        self._budget = asyncio.Condition()
+        self._queued.add(start)
+        frontier.put_nowait((start, 0))
+
+        started = time.monotonic()
+        fetchers = [asyncio.create_task(self._fetcher(session, frontier)) for _ in range(self.concurrency)]
+        try:
+            await frontier.join()
+        finally:
+            for fetcher in fetchers:
+                fetcher.cancel()
+            await asyncio.gather(*fetchers, return_exceptions=True)
+        logger.info(
+            f"Crawled {len(self.visited)} page(s) of {self.base_url} in {time.monotonic() - started:.1f}s "
+            f"({len(self._queued)} URL(s) queued, depth {self.max_depth}, limit {self.max_pages})."
+        )
+
+    async def _fetcher(self, session: aiohttp.ClientSession, frontier: "asyncio.Queue[Tuple[str, int]]") -> None:
+        while True:
+            url, depth = await frontier.get()
             try:
-                response = await asyncio.to_thread(
-                    self.session.get,
-                    url,
-                    timeout=5
-                )
-                response.raise_for_status()
-                
-                self.visited.add(url)
-                self.discovered_urls.add(url)
-                
-                if "text/html" in response.headers.get("Content-Type", ""):
-                    soup = BeautifulSoup(response.text, "html.parser")
-                    
-                    # Extract all possible endpoints
-                    for element in soup.find_all(["a", "form", "link"]):
-                        new_url = None
-                        
-                        if element.name == "a" and element.get("href"):
-                            new_url = urljoin(url, element["href"])
-                        elif element.name == "form" and element.get("action"):
-                            new_url = urljoin(url, element["action"])
-                        elif element.name == "link" and element.get("href"):
-                            new_url = urljoin(url, element["href"])
-                            
-                        if new_url and self._is_valid_url(new_url):
-                            if new_url not in self.visited:
-                                queue.append((new_url, depth + 1))
-                                
-                await asyncio.sleep(0.5)  # Be polite
-                
-            except Exception:
+                if await self._claim_page():
+                    try:
+                        html, final_url = await self._fetch(session, url)
+                    except Exception as e:
+                        logger.debug(f"Crawler skipped {url}: {e!r}")
+                        await self._release_page()
+                        continue
+                    self.visited.add(url)
+                    self.discovered_urls.add(url)
+                    await self._release_page()
+                    if html is not None and depth < self.max_depth:
+                        self._enqueue(frontier, await asyncio.to_thread(self._extract_links, html, final_url), depth + 1)
+            finally:
+                frontier.task_done()
+
+    async def _claim_page(self) -> bool:
+        """Reserves one of the max_pages slots, waiting while fetches in flight could still fail."""
+        async with self._budget:
+            while len(self.visited) + self._in_flight >= self.max_pages:
+                if len(self.visited) >= self.max_pages or self._in_flight == 0:
+                    return False
+                await self._budget.wait()
+            self._in_flight += 1
+            return True
+
+    async def _release_page(self) -> None:
+        async with self._budget:
+            self._in_flight -= 1
+            self._budget.notify_all()
+
+    def _enqueue(self, frontier: "asyncio.Queue[Tuple[str, int]]", links: List[str], depth: int) -> None:
+        if len(self.visited) >= self.max_pages:
+            return  # The budget is spent; nothing queued now could be fetched
+        for link in links:
+            try:
+                url = normalize_url(link)
+            except ValueError:
                 continue
-    
+            if url not in self._queued:
+                self._queued.add(url)
+                frontier.put_nowait((url, depth))
+
+    @asynccontextmanager
+    async def _polite(self, host: str) -> AsyncIterator[None]:
+        """At most `per_host` requests to one host at a time, started PER_HOST_DELAY apart."""
+        semaphore, next_start = self._hosts.setdefault(host, (asyncio.Semaphore(self.per_host), [0.0]))
+        async with semaphore:
+            now = time.monotonic()
+            wait = next_start[0] - now
+            next_start[0] = max(now, next_start[0]) + PER_HOST_DELAY
+            if wait > 0:
+                await asyncio.sleep(wait)
+            yield
+
+    async def _fetch(self, session: aiohttp.ClientSession, url: str) -> Tuple[Optional[str], str]:
+        """
+        GETs a page. Returns (HTML, final URL after redirects), with HTML None for other content types;
+        bodies are read up to MAX_BODY_BYTES. Raises for error statuses and network errors.
+        """
+        async with self._polite(urlsplit(url).netloc):
+            async with session.get(url, timeout=FETCH_TIMEOUT, headers={"User-Agent": USER_AGENT}) as response:
+                response.raise_for_status()
+                if "text/html" not in response.headers.get("Content-Type", ""):
+                    return None, str(response.url)
+                body = bytearray()
+                async for chunk in response.content.iter_chunked(READ_CHUNK):
+                    body += chunk
+                    if len(body) >= MAX_BODY_BYTES:
+                        logger.debug(f"Crawler truncated {url} at {MAX_BODY_BYTES} bytes.")
+                        del body[MAX_BODY_BYTES:]
+                        break
+                return bytes(body).decode(response.charset or "utf-8", errors="replace"), str(response.url)
+
+    def _extract_links(self, html, page_url):
+        """Returns the in-scope URLs of all links, forms and <link> tags on a page, in page order."""
+        soup = BeautifulSoup(html, "html.parser")
+        links = []
+
+        # Extract all possible endpoints
+        for element in soup.find_all(["a", "form", "link"]):
+            new_url = None
+
+            if element.name == "a" and element.get("href"):
+                new_url = urljoin(page_url, element["href"])
+            elif element.name == "form" and element.get("action"):
+                new_url = urljoin(page_url, element["action"])
+            elif element.name == "link" and element.get("href"):
+                new_url = urljoin(page_url, element["href"])
+
+            if new_url and self._is_valid_url(new_url):
+                links.append(new_url)
+        return links
+
     def _is_valid_url(self, url):
         parsed = urlparse(url)
-        base_parsed = urlparse(self.base_url)
         return (
             parsed.scheme in ["http", "https"]
-            and parsed.netloc == base_parsed.netloc
+            and parsed.netloc.lower() == self._base_netloc
             and not parsed.path.endswith((".jpg", ".png", ".pdf"))  # Skip static files
         )
-    
+
     def get_discovered_urls(self):
-        return list(self.discovered_urls)
\ No newline at end of file
+        return list(self.discovered_urls)
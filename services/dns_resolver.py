@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import dns.asyncresolver
+import dns.exception
+import dns.rdatatype
+import dns.resolver
+
+from services.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# --- Resolver Configuration ---
+QUERY_LIFETIME = float(os.environ.get("DNS_TIMEOUT", "5"))
+NAMESERVERS = [ns for ns in os.environ.get("DNS_NAMESERVERS", "").split(",") if ns]  # Empty = system resolv.conf
+NAMESERVER_PORT = int(os.environ.get("DNS_PORT", "53"))  # Applies to DNS_NAMESERVERS only
+MIN_TTL = 5                 # Never cache for less than this, even if the record says 0
+MAX_TTL = 3600              # Cap very long TTLs so renumbered hosts are picked up eventually
+DEFAULT_NEGATIVE_TTL = 300  # NXDOMAIN / NoAnswer lifetime when the response carries no SOA
+MAX_CACHE_ENTRIES = 10000
+
+# (name, rdtype) -> (expires_at, records, error). An NXDOMAIN is stored under rdtype "*".
+_cache: Dict[Tuple[str, str], Tuple[float, Optional[List[str]], Optional[Exception]]] = {}
+_in_flight = SingleFlight("dns")
+_resolver: Optional[dns.asyncresolver.Resolver] = None
+
+
+def _get_resolver() -> dns.asyncresolver.Resolver:
+    global _resolver
+    if _resolver is None:
+        _resolver = dns.asyncresolver.Resolver(configure=not NAMESERVERS)
+        if NAMESERVERS:
+            _resolver.port = NAMESERVER_PORT  # Must be set first: assigning nameservers binds the port
+            _resolver.nameservers = NAMESERVERS
+        _resolver.lifetime = QUERY_LIFETIME
+    return _resolver
+
+
+def _clamp(ttl: float) -> float:
+    return max(MIN_TTL, min(MAX_TTL, ttl))
+
+
+def _negative_ttl(responses) -> float:
+    """Uses the SOA in the authority section (RFC 2308) to decide how long a negative answer lives."""
+    for response in responses:
+        for rrset in getattr(response, "authority", []):
+            if rrset.rdtype == dns.rdatatype.SOA:
+                return _clamp(min(rrset.ttl, rrset[0].minimum))
+    return DEFAULT_NEGATIVE_TTL
+
+
+def _store(key: Tuple[str, str], ttl: float, records: Optional[List[str]], error: Optional[Exception]) -> None:
+    if len(_cache) >= MAX_CACHE_ENTRIES:
+        now = time.monotonic()
+        for stale_key in [k for k, (expires, _, _) in _cache.items() if expires <= now]:
+            del _cache[stale_key]
+        while len(_cache) >= MAX_CACHE_ENTRIES:
+            del _cache[next(iter(_cache))]
+    _cache[key] = (time.monotonic() + ttl, records, error)
+
+
+def _cached(key: Tuple[str, str]) -> Optional[Tuple[Optional[List[str]], Optional[Exception]]]:
+    entry = _cache.get(key)
+    if entry is None:
+        return None
+    expires, records, error = entry
+    if expires <= time.monotonic():
+        del _cache[key]
+        return None
+    return records, error
+
+
+async def _query(name: str, rdtype: str) -> List[str]:
+    try:
+        answer = await _get_resolver().resolve(name, rdtype)
+    except dns.resolver.NXDOMAIN as e:
+        _store((name, "*"), _negative_ttl(e.responses().values()), None, e)
+        raise
+    except dns.resolver.NoAnswer as e:
+        _store((name, rdtype), _negative_ttl([e.response()]), None, e)
+        raise
+    records = sorted(str(r).strip() for r in answer)
+    _store((name, rdtype), _clamp(answer.rrset.ttl), records, None)
+    return records
+
+
+async def resolve(name: str, rdtype: str) -> List[str]:
+    """
+    Resolves one record type and returns the records as sorted strings.
+    Answers are cached for their TTL; NXDOMAIN and NoAnswer are cached negatively and
+    re-raised from the cache. Identical concurrent queries share one network lookup.
+    Raises the usual dns.resolver exceptions (NXDOMAIN, NoAnswer, NoNameservers, Timeout).
+    """
+    name = name.lower().rstrip(".")
+    rdtype = rdtype.upper()
+    for key in ((name, "*"), (name, rdtype)):
+        hit = _cached(key)
+        if hit is not None:
+            records, error = hit
+            if error is not None:
+                raise error.with_traceback(None)
+            return list(records)
+
+    return list(await _in_flight.do((name, rdtype), lambda: _query(name, rdtype)))
+
+
+async def resolve_many(name: str, rdtypes: Iterable[str]) -> Dict[str, List[str]]:
+    """
+    Resolves several record types for one name concurrently.
+    Returns {rdtype: records} in the order given; types that failed map to an empty list.
+    """
+    rdtypes = list(rdtypes)
+    results = await asyncio.gather(*(resolve(name, rdtype) for rdtype in rdtypes), return_exceptions=True)
+    answers = {}
+    for rdtype, result in zip(rdtypes, results):
+        if isinstance(result, BaseException):
+            if not isinstance(result, dns.exception.DNSException):
+                logger.warning(f"Unexpected error resolving {rdtype} for {name}: {result!r}")
+            answers[rdtype] = []
+        else:
+            answers[rdtype] = result
+    return answers
@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import time
+from typing import List, Optional, Tuple
+
+import aiohttp
+import requests
+from yarl import URL
+
+from services import metrics
+from services import cassette
+from services.cassette import CassetteClientSession, mount
+
+logger = logging.getLogger(__name__)
+
+# --- Pool Configuration ---
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+MAX_CONNECTIONS = 100           # Total open sockets across all hosts
+MAX_CONNECTIONS_PER_HOST = 10   # Keeps one busy API from starving the others
+DNS_CACHE_TTL = 300             # Seconds aiohttp keeps resolved addresses
+KEEPALIVE_TIMEOUT = 30          # Seconds an idle connection stays in the pool
+DEFAULT_TIMEOUT = aiohttp.ClientTimeout(total=45, connect=10)
+
+_session: Optional[aiohttp.ClientSession] = None
+_session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+# --- Request Metrics ---
+# Only registered API endpoints get their own label; arbitrary target sites are counted as "other"
+_endpoints: List[Tuple[str, str, bool]] = []
+REQUEST_DURATION = metrics.Histogram(
+    "doraemon_http_client_request_duration_seconds", "Outbound HTTP request latency by endpoint.", ["endpoint"],
+)
+REQUESTS = metrics.Counter(
+    "doraemon_http_client_requests_total", "Outbound HTTP requests by endpoint and status class.", ["endpoint", "status"],
+)
+
+
+def track_endpoint(name: str, base_url: str, by_path: bool = False) -> None:
+    """
+    Labels requests under base_url as `name` in the request metrics. With by_path the first
+    path segment after base_url is appended (hackertarget/hostsearch).
+    """
+    _endpoints.append((base_url.rstrip("/"), name, by_path))
+
+
+def endpoint_label(url: URL) -> str:
+    text = str(url)
+    for base_url, name, by_path in _endpoints:
+        if text.startswith(base_url):
+            if by_path:
+                segment = text[len(base_url):].lstrip("/").split("/", 1)[0].split("?", 1)[0]
+                return f"{name}/{segment}" if segment else name
+            return name
+    return "other"
+
+
+def _trace_config() -> aiohttp.TraceConfig:
+    trace_config = aiohttp.TraceConfig()
+
+    async def on_request_start(session, context, params) -> None:
+        context.started = time.monotonic()
+
+    async def on_request_end(session, context, params) -> None:
+        endpoint = endpoint_label(params.url)
+        REQUEST_DURATION.labels(endpoint).observe(time.monotonic() - context.started)
+        REQUESTS.labels(endpoint, f"{params.response.status // 100}xx").inc()
+
+    async def on_request_exception(session, context, params) -> None:
+        endpoint = endpoint_label(params.url)
+        REQUEST_DURATION.labels(endpoint).observe(time.monotonic() - context.started)
+        REQUESTS.labels(endpoint, "error").inc()
+
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_request_end.append(on_request_end)
+    trace_config.on_request_exception.append(on_request_exception)
+    return trace_config
+
+
+def create_session(**kwargs) -> aiohttp.ClientSession:
+    """
+    Creates a ClientSession with the shared pool settings. Only use this directly
+    when the caller owns the session's lifetime; handlers should use get_session().
+    While an HTTP cassette (services/cassette.py) is active the session records to or replays
+    from it; otherwise it is a plain aiohttp.ClientSession, untouched by the cassette hooks.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=MAX_CONNECTIONS,
+        limit_per_host=MAX_CONNECTIONS_PER_HOST,
+        ttl_dns_cache=DNS_CACHE_TTL,
+        keepalive_timeout=KEEPALIVE_TIMEOUT,
+    )
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    kwargs.setdefault("headers", {"User-Agent": USER_AGENT})
+    kwargs.setdefault("trace_configs", [_trace_config()])
+    session_class = CassetteClientSession if cassette.current() is not None else aiohttp.ClientSession
+    return session_class(connector=connector, **kwargs)
+
+
+def create_requests_session() -> requests.Session:
+    """A requests Session for the blocking callers that run in worker threads, routed through the HTTP cassette."""
+    return mount(requests.Session())
+
+
+def get_session() -> aiohttp.ClientSession:
+    """
+    Returns the process-wide ClientSession, creating it on first use.
+    The session is bound to the running event loop, so it is rebuilt if the loop changed.
+    """
+    global _session, _session_loop
+    loop = asyncio.get_running_loop()
+    if _session is None or _session.closed or _session_loop is not loop:
+        if _session is not None and not _session.closed:
+            logger.warning("Shared HTTP session was created on another event loop; creating a new one.")
+        _session = create_session()
+        _session_loop = loop
+        logger.info("Created shared HTTP client session.")
+    return _session
+
+
+async def close_session(*_args) -> None:
+    """Closes the shared session. Accepts (and ignores) the Application passed by post_shutdown."""
+    global _session, _session_loop
+    if _session is not None and not _session.closed:
+        await _session.close()
+        logger.info("Closed shared HTTP client session.")
+    _session = None
+    _session_loop = None
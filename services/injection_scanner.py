@@ -1,6 +1,6 @@
 import asyncio
 from urllib.parse import urlparse, parse_qs, urlencode
-import requests
+from services.http_client import create_requests_session
 
 class InjectionScanner:
     PAYLOADS = {
@@ -28,7 +28,7 @@ class InjectionScanner:
     }
 
     def __init__(self):
-        self.session = requests.Session()
+        self.session = create_requests_session()
         self.session.headers.update({
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) TelegramBotScanner/1.0"
         })
@@ -56,7 +56,7 @@ class InjectionScanner:
                             timeout=5
                         )
 
-                        if self._is_vulnerable(response, vuln_type):
+                        if self._is_vulnerable(response, vuln_type, payload):
                             vulnerabilities.append({
                                 "type": vuln_type,
                                 "url": url,
@@ -71,7 +71,7 @@ class InjectionScanner:
 
         return vulnerabilities
 
-    def _is_vulnerable(self, response, vuln_type):
+    def _is_vulnerable(self, response, vuln_type, payload):
         content = response.text.lower()
         status_code = response.status_code
 
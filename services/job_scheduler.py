@@ -0,0 +1,145 @@
+import asyncio
+import itertools
+import logging
+import os
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# --- Scheduler Configuration ---
+# Relative cost of each expensive command; a job only starts when its cost fits in the budget.
+JOB_COSTS = {
+    "nmap": 3,
+    "rustscan": 2,
+    "fuzz": 3,
+    "dirbuster": 2,
+    "wpscan": 2,
+    "recondora_all": 2,
+}
+GLOBAL_CAPACITY = int(os.environ.get("SCHEDULER_CAPACITY", "8"))
+PER_USER_RUNNING = int(os.environ.get("SCHEDULER_USER_RUNNING", "2"))   # Jobs one user may run at once
+PER_USER_QUEUED = int(os.environ.get("SCHEDULER_USER_QUEUED", "5"))     # Jobs one user may have waiting
+MAX_QUEUE_LENGTH = int(os.environ.get("SCHEDULER_QUEUE_LENGTH", "100"))
+
+QueueCallback = Callable[[int], Awaitable[None]]
+
+
+class QueueFullError(Exception):
+    """Raised when a job is refused at admission instead of being queued."""
+
+
+@dataclass
+class _Job:
+    user_id: int
+    kind: str
+    cost: int
+    seq: int
+    start_tag: float = 0.0
+    granted: asyncio.Future = field(default_factory=lambda: asyncio.get_running_loop().create_future())
+
+
+class JobScheduler:
+    """
+    Admission control and weighted fair queuing for expensive commands.
+    Each user has a virtual clock that advances by the cost of every job they submit, and jobs
+    start in order of their user's clock, so heavy users cannot starve everyone else.
+    """
+
+    def __init__(self, capacity: int = GLOBAL_CAPACITY, per_user_running: int = PER_USER_RUNNING,
+                 per_user_queued: int = PER_USER_QUEUED, max_queue: int = MAX_QUEUE_LENGTH):
+        self.capacity = capacity
+        self.per_user_running = per_user_running
+        self.per_user_queued = per_user_queued
+        self.max_queue = max_queue
+        self.in_use = 0
+        self._running: Dict[int, int] = {}
+        self._waiting: List[_Job] = []
+        self._virtual_time: Dict[int, float] = {}
+        self._global_virtual_time = 0.0
+        self._seq = itertools.count()
+
+    def _ordered(self) -> List[_Job]:
+        return sorted(self._waiting, key=lambda job: (job.start_tag, job.seq))
+
+    def _can_start(self, job: _Job) -> bool:
+        cost = min(job.cost, self.capacity)  # A job bigger than the whole budget still runs alone
+        return self.in_use + cost <= self.capacity and self._running.get(job.user_id, 0) < self.per_user_running
+
+    def _dispatch(self) -> None:
+        for job in self._ordered():
+            if job.granted.done():
+                self._waiting.remove(job)
+                continue
+            if self._running.get(job.user_id, 0) >= self.per_user_running:
+                continue  # Over the user's quota; later jobs from other users may still go
+            if not self._can_start(job):
+                break  # Keep the budget for the head of the queue instead of backfilling past it
+            self._waiting.remove(job)
+            self.in_use += min(job.cost, self.capacity)
+            self._running[job.user_id] = self._running.get(job.user_id, 0) + 1
+            self._global_virtual_time = max(self._global_virtual_time, job.start_tag)
+            job.granted.set_result(True)
+
+    def position(self, job: _Job) -> int:
+        """1-based place among waiting jobs, in the order they would be started."""
+        return self._ordered().index(job) + 1
+
+    @property
+    def queue_length(self) -> int:
+        return len(self._waiting)
+
+    @asynccontextmanager
+    async def slot(self, user_id: int, kind: str, on_queued: Optional[QueueCallback] = None) -> AsyncIterator[None]:
+        """
+        Waits until the job may run, then holds its share of the budget for the body of the block.
+        on_queued(position) is awaited once if the job has to wait. Raises QueueFullError at admission.
+        """
+        queued_by_user = sum(1 for job in self._waiting if job.user_id == user_id)
+        if queued_by_user >= self.per_user_queued:
+            raise QueueFullError(f"You already have {queued_by_user} jobs waiting. Please wait for them to finish.")
+        if len(self._waiting) >= self.max_queue:
+            raise QueueFullError("The server is at capacity. Please try again in a few minutes.")
+
+        job = _Job(user_id=user_id, kind=kind, cost=JOB_COSTS.get(kind, 1), seq=next(self._seq))
+        # A returning user resumes from the global clock, not from the credit they built up while idle
+        job.start_tag = max(self._virtual_time.get(user_id, 0.0), self._global_virtual_time)
+        # The user's next job is tagged after this one finishes, so a burst of jobs queues behind others
+        self._virtual_time[user_id] = job.start_tag + job.cost
+        self._waiting.append(job)
+        self._dispatch()
+
+        try:
+            if not job.granted.done():
+                logger.info(f"Queued {kind} for user {user_id} at position {self.position(job)}")
+                if on_queued:
+                    try:
+                        await on_queued(self.position(job))
+                    except Exception as e:
+                        logger.warning(f"Could not send queue position to user {user_id}: {e}")
+                await job.granted
+        except BaseException:
+            if job.granted.done() and not job.granted.cancelled():
+                self._release(job)
+            else:
+                job.granted.cancel()
+                if job in self._waiting:
+                    self._waiting.remove(job)
+            raise
+
+        try:
+            yield
+        finally:
+            self._release(job)
+
+    def _release(self, job: _Job) -> None:
+        self.in_use -= min(job.cost, self.capacity)
+        self._running[job.user_id] -= 1
+        if not self._running[job.user_id]:
+            del self._running[job.user_id]
+        self._dispatch()
+
+
+# The process-wide scheduler shared by every handler
+scheduler = JobScheduler()
@@ -0,0 +1,219 @@
+import html
+import re
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional, Sequence, Union
+
+from telegram.constants import ParseMode
+
+# Telegram limits message text to 4096 UTF-16 code units, measured after entities are parsed out
+MAX_MESSAGE_LENGTH = 4096
+
+# --- Single-pass escaping tables (str.translate) ---
+_MARKDOWN_V2_SPECIAL = "\\_*[]()~`>#+-=|{}.!"
+MARKDOWN_V2_ESCAPE = str.maketrans({c: "\\" + c for c in _MARKDOWN_V2_SPECIAL})
+MARKDOWN_V2_PRE_ESCAPE = str.maketrans({"`": "\\`", "\\": "\\\\"})  # Only these are special inside pre/code
+HTML_ESCAPE = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;"})
+
+_HTML_TAG = re.compile(r"<[^>]+>")
+_HTML_PRE = re.compile(r"<pre>(?:<code(?: class=\"language-([\w+-]+)\")?>)?(.*?)(?:</code>)?</pre>", re.S)
+
+
+@dataclass
+class Markup:
+    """Text that is already formatted for the target parse mode (escaped, with entities)."""
+    text: str
+
+
+@dataclass
+class Pre:
+    """Raw text shown as a code block; escaped at render time and reopened on every chunk it spans."""
+    text: str
+    language: str = ""
+
+
+Block = Union[Markup, Pre]
+
+
+def utf16_len(text: str) -> int:
+    """Length as Telegram counts it: characters outside the BMP take two UTF-16 units."""
+    return len(text) + sum(1 for c in text if ord(c) > 0xFFFF)
+
+
+def escape(text: str, parse_mode: Optional[str] = ParseMode.MARKDOWN_V2) -> str:
+    if parse_mode == ParseMode.MARKDOWN_V2:
+        return str(text).translate(MARKDOWN_V2_ESCAPE)
+    if parse_mode == ParseMode.HTML:
+        return str(text).translate(HTML_ESCAPE)
+    return str(text)
+
+
+def visible_length(markup: str, parse_mode: Optional[str]) -> int:
+    """UTF-16 length of the text Telegram shows once the markup is parsed (what the limit applies to)."""
+    if parse_mode == ParseMode.HTML:
+        return utf16_len(html.unescape(_HTML_TAG.sub("", markup)))
+    if parse_mode != ParseMode.MARKDOWN_V2:
+        return utf16_len(markup)
+
+    length, i, in_code, in_url = 0, 0, False, False
+    while i < len(markup):
+        c = markup[i]
+        if c == "\\" and i + 1 < len(markup):
+            if not in_url:
+                length += utf16_len(markup[i + 1])
+            i += 2
+            continue
+        if in_url:
+            in_url = c != ")"
+        elif c == "`":
+            in_code = not in_code
+        elif in_code:
+            length += utf16_len(c)
+        elif c == "]" and markup[i + 1:i + 2] == "(":
+            in_url = True
+            i += 1
+        elif c not in "*_~|[":
+            length += utf16_len(c)
+        i += 1
+    return length
+
+
+def _tokens(markup: str) -> Iterator[str]:
+    """Splits markup into pieces that are never cut apart: escape sequences and single characters."""
+    i = 0
+    while i < len(markup):
+        step = 2 if markup[i] == "\\" and i + 1 < len(markup) else 1
+        yield markup[i:i + step]
+        i += step
+
+
+def _fences(parse_mode: Optional[str], language: str) -> tuple:
+    if parse_mode == ParseMode.MARKDOWN_V2:
+        return f"```{language}\n", "\n```"
+    if parse_mode == ParseMode.HTML:
+        opening = f'<pre><code class="language-{language}">' if language else "<pre>"
+        return opening, "</code></pre>" if language else "</pre>"
+    return "", ""
+
+
+def _escape_pre(text: str, parse_mode: Optional[str]) -> str:
+    if parse_mode == ParseMode.MARKDOWN_V2:
+        return text.translate(MARKDOWN_V2_PRE_ESCAPE)
+    return escape(text, parse_mode)
+
+
+def iter_chunks(blocks: Iterable[Block], parse_mode: Optional[str] = ParseMode.MARKDOWN_V2,
+                limit: int = MAX_MESSAGE_LENGTH) -> Iterator[str]:
+    """
+    Lazily yields message texts of at most `limit` visible UTF-16 units each.
+    Markup is split at line ends (escape sequences are never cut); a Pre block that does not fit
+    is closed at the end of one chunk and reopened, with the same language, in the next.
+    """
+    parts: List[str] = []
+    used = 0
+
+    def flush() -> Iterator[str]:
+        nonlocal parts, used
+        text = "".join(parts).strip("\n")
+        parts, used = [], 0
+        if text.strip():
+            yield text
+
+    for block in blocks:
+        if isinstance(block, Markup):
+            for line in block.text.splitlines(keepends=True):
+                size = visible_length(line, parse_mode)
+                if used + size > limit:
+                    yield from flush()
+                if size <= limit:
+                    parts.append(line)
+                    used += size
+                    continue
+                for token in _tokens(line):  # A single line longer than a message
+                    size = visible_length(token, parse_mode)
+                    if used + size > limit:
+                        yield from flush()
+                    parts.append(token)
+                    used += size
+            continue
+
+        opening, closing = _fences(parse_mode, block.language)
+        # The newline before the closing fence is part of the code block's text
+        closing_size = 1 if parse_mode == ParseMode.MARKDOWN_V2 else 0
+        lines = block.text.rstrip("\n").splitlines() or [""]
+        open_block = False
+        for line in lines:
+            pieces = [line]
+            if utf16_len(line) + closing_size + 1 > limit:
+                pieces, piece = [], ""
+                for c in line:
+                    if utf16_len(piece) + utf16_len(c) + closing_size + 1 > limit:
+                        pieces.append(piece)
+                        piece = ""
+                    piece += c
+                pieces.append(piece)
+            for piece in pieces:
+                size = utf16_len(piece) + (1 if open_block else 0)
+                if used + size + closing_size > limit:
+                    if open_block:
+                        parts.append(closing)
+                        open_block = False
+                    yield from flush()
+                    size = utf16_len(piece)
+                if not open_block:
+                    parts.append(opening)
+                    open_block = True
+                else:
+                    parts.append("\n")
+                parts.append(_escape_pre(piece, parse_mode))
+                used += size
+        parts.append(closing)
+        used += closing_size
+
+    yield from flush()
+
+
+def parse_markup(text: str, parse_mode: Optional[str] = ParseMode.MARKDOWN_V2) -> List[Block]:
+    """
+    Splits an already formatted message into Markup and Pre blocks, so text built by older
+    handlers can be re-chunked without breaking its code blocks.
+    """
+    blocks: List[Block] = []
+    if parse_mode == ParseMode.HTML:
+        position = 0
+        for match in _HTML_PRE.finditer(text):
+            blocks.append(Markup(text[position:match.start()]))
+            blocks.append(Pre(html.unescape(match.group(2)), match.group(1) or ""))
+            position = match.end()
+        blocks.append(Markup(text[position:]))
+    elif parse_mode == ParseMode.MARKDOWN_V2:
+        i = position = 0
+        while i < len(text):
+            if text[i] == "\\":
+                i += 2
+                continue
+            if not text.startswith("```", i):
+                i += 1
+                continue
+            j = i + 3
+            while j < len(text) and not text.startswith("```", j):
+                j += 2 if text[j] == "\\" else 1
+            if j >= len(text):
+                break  # Unterminated fence: leave the rest as it is
+            blocks.append(Markup(text[position:i]))
+            language, newline, code = text[i + 3:j].partition("\n")
+            if not newline or not re.fullmatch(r"[\w+-]*", language):
+                language, code = "", text[i + 3:j]
+            # Any character may be escaped inside pre, so undo every escape
+            blocks.append(Pre(re.sub(r"\\(.)", r"\1", code, flags=re.S).rstrip("\n"), language))
+            i = position = j + 3
+        blocks.append(Markup(text[position:]))
+    else:
+        blocks.append(Markup(text))
+    return [block for block in blocks if not (isinstance(block, Markup) and not block.text)]
+
+
+def chunk_message(content: Union[str, Sequence[Block]], parse_mode: Optional[str] = ParseMode.MARKDOWN_V2,
+                  limit: int = MAX_MESSAGE_LENGTH) -> Iterator[str]:
+    """iter_chunks() for either a list of blocks or a finished message string."""
+    blocks = parse_markup(content, parse_mode) if isinstance(content, str) else content
+    return iter_chunks(blocks, parse_mode, limit)
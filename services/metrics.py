@@ -0,0 +1,282 @@
+import asyncio
+import glob
+import json
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# --- Metrics Configuration ---
+METRICS_DIR = os.path.join("persistence_data", "metrics")   # Snapshots other processes read for /metrics
+PUBLISH_INTERVAL = float(os.environ.get("METRICS_PUBLISH_INTERVAL", "5"))
+STALE_AFTER = 3 * PUBLISH_INTERVAL     # Snapshots older than this belong to a process that is gone
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+LabelValues = Tuple[str, ...]
+# A family as exported: (name, type, help, [(sample name suffix, {label: value}, value)])
+Family = Tuple[str, str, str, List[Tuple[str, Dict[str, str], float]]]
+
+
+class _Metric:
+    """
+    Base for the metric types. Children are created per label-value tuple on first use; updates
+    take one small lock, so they are safe from worker threads and cheap enough for hot paths.
+    A `function` makes the metric read its value(s) when scraped instead: it returns a number,
+    or a {label values: number} dict for labelled metrics.
+    """
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 function: Optional[Callable[[], Union[float, Dict[LabelValues, float]]]] = None,
+                 registry: Optional["Registry"] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.function = function
+        self._lock = threading.Lock()
+        self._children: Dict[LabelValues, object] = {}
+        (registry or REGISTRY).register(self)
+
+    def labels(self, *values) -> object:
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self) -> object:
+        raise NotImplementedError
+
+    def _values(self) -> Dict[LabelValues, object]:
+        if self.function is None:
+            return dict(self._children)
+        try:
+            value = self.function()
+        except Exception as e:
+            logger.warning(f"Metric {self.name} could not be read: {e!r}")
+            return {}
+        return value if isinstance(value, dict) else {(): value}
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        return [("", dict(zip(self.labelnames, key)), float(getattr(child, "value", child)))
+                for key, child in self._values().items()]
+
+
+class _Value:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self, lock: threading.Lock):
+        self.value = 0.0
+        self._lock = lock
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self) -> _Value:
+        return _Value(self._lock)
+
+    def inc(self, amount: float = 1) -> None:
+        self.labels().inc(amount)
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+
+class _HistogramValue:
+    __slots__ = ("buckets", "counts", "sum", "_lock")
+
+    def __init__(self, buckets: Tuple[float, ...], lock: threading.Lock):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # The last slot is +Inf
+        self.sum = 0.0
+        self._lock = lock
+
+    def observe(self, value: float) -> None:
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(time.monotonic() - started)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS, registry: Optional["Registry"] = None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry=registry)
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self.buckets, self._lock)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        samples = []
+        for key, child in self._values().items():
+            labels = dict(zip(self.labelnames, key))
+            with self._lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                samples.append(("_bucket", {**labels, "le": _format_number(bound)}, cumulative))
+            samples.append(("_sum", labels, total))
+            samples.append(("_count", labels, cumulative))
+        return samples
+
+
+class Registry:
+    """All metrics of this process, plus the snapshots other processes publish to METRICS_DIR."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self.role = "web"   # The "process" label; main.py switches it to "bot"
+
+    def register(self, metric: _Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered.")
+        self._metrics[metric.name] = metric
+
+    def collect(self) -> List[Family]:
+        return [(m.name, m.kind, m.documentation, m.samples()) for m in self._metrics.values()]
+
+    def snapshot_path(self) -> str:
+        return os.path.join(METRICS_DIR, f"{self.role}-{os.getpid()}.json")
+
+    def publish(self) -> None:
+        """Writes this process's metrics for the /metrics route of another process (atomically)."""
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        path = self.snapshot_path()
+        payload = {"role": self.role, "pid": os.getpid(), "time": time.time(), "families": self.collect()}
+        with open(path + ".tmp", "w") as f:
+            json.dump(payload, f, separators=(",", ":"))
+        os.replace(path + ".tmp", path)
+
+    def _published(self) -> List[dict]:
+        snapshots = []
+        for path in glob.glob(os.path.join(METRICS_DIR, "*.json")):
+            try:
+                with open(path) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if snapshot.get("pid") == os.getpid() or time.time() - snapshot.get("time", 0) > STALE_AFTER:
+                continue
+            snapshots.append(snapshot)
+        return snapshots
+
+    def render(self) -> str:
+        """Prometheus text exposition of this process and every live published snapshot."""
+        sources = [{"role": self.role, "families": self.collect()}] + self._published()
+        families: Dict[str, Tuple[str, str, List[str]]] = {}
+        for source in sources:
+            process = _escape_label(source["role"])
+            for name, kind, documentation, samples in source["families"]:
+                lines = families.setdefault(name, (kind, documentation, []))[2]
+                for suffix, labels, value in samples:
+                    label_text = ",".join([f'process="{process}"'] + [
+                        f'{key}="{_escape_label(val)}"' for key, val in labels.items()
+                    ])
+                    lines.append(f"{name}{suffix}{{{label_text}}} {_format_number(value)}")
+        output = []
+        for name, (kind, documentation, lines) in families.items():
+            output.append(f"# HELP {name} {documentation}")
+            output.append(f"# TYPE {name} {kind}")
+            output.extend(lines)
+        return "\n".join(output) + "\n"
+
+
+def _escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def rss_bytes() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0.0
+
+
+# The process-wide registry every module registers its metrics with
+REGISTRY = Registry()
+
+Gauge("process_resident_memory_bytes", "Resident memory of the process.", function=rss_bytes)
+
+
+# ==============================================================================
+# Publishing
+# ==============================================================================
+async def _publish_forever() -> None:
+    while True:
+        try:
+            await asyncio.to_thread(REGISTRY.publish)
+        except OSError as e:
+            logger.warning(f"Could not publish metrics: {e}")
+        await asyncio.sleep(PUBLISH_INTERVAL)
+
+
+_runtime_tasks: List[asyncio.Task] = []
+
+
+def start_runtime_metrics(role: str) -> None:
+    """Starts publishing this process's snapshot under `role`."""
+    REGISTRY.role = role
+    _runtime_tasks.append(asyncio.create_task(_publish_forever(), name="metrics_publisher"))
+
+
+async def stop_runtime_metrics() -> None:
+    for task in _runtime_tasks:
+        task.cancel()
+    await asyncio.gather(*_runtime_tasks, return_exceptions=True)
+    _runtime_tasks.clear()
+    try:
+        os.remove(REGISTRY.snapshot_path())
+    except OSError:
+        pass
@@ -0,0 +1,98 @@
+import asyncio
+import logging
+import os
+import secrets
+import sqlite3
+import threading
+import time
+import zlib
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# --- Storage Configuration ---
+STORE_DB = os.path.join("persistence_data", "paged_output.sqlite3")
+PAGE_TTL = int(os.environ.get("PAGED_OUTPUT_TTL", str(7 * 24 * 3600)))  # Seconds a stored output stays browsable
+PRUNE_EVERY_WRITES = 50
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS documents ("
+    "id TEXT PRIMARY KEY, created REAL NOT NULL, parse_mode TEXT, page_count INTEGER NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS pages ("
+    "doc_id TEXT NOT NULL, page_no INTEGER NOT NULL, data BLOB NOT NULL, PRIMARY KEY (doc_id, page_no)) WITHOUT ROWID",
+)
+
+
+class PagedOutputStore:
+    """
+    Keeps long tool output as zlib-compressed pages in SQLite, so the bot can send page one
+    and serve the rest on demand. Each page is stored (and read back) on its own row.
+    """
+
+    def __init__(self, path: str = STORE_DB, ttl: int = PAGE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._writes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            for statement in _SCHEMA:
+                self._conn.execute(statement)
+        return self._conn
+
+    def _save(self, pages: List[str], parse_mode: Optional[str]) -> str:
+        doc_id = secrets.token_hex(6)
+        rows = [(doc_id, number, zlib.compress(page.encode("utf-8"), 6)) for number, page in enumerate(pages)]
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("BEGIN")
+                conn.execute(
+                    "INSERT INTO documents VALUES (?, ?, ?, ?)",
+                    (doc_id, time.time(), None if parse_mode is None else str(parse_mode), len(pages)),
+                )
+                conn.executemany("INSERT INTO pages VALUES (?, ?, ?)", rows)
+            self._writes += 1
+            if self._writes % PRUNE_EVERY_WRITES == 0:
+                self._prune(conn)
+        return doc_id
+
+    def _prune(self, conn: sqlite3.Connection) -> None:
+        cutoff = time.time() - self.ttl
+        with conn:
+            conn.execute("BEGIN")
+            conn.execute("DELETE FROM pages WHERE doc_id IN (SELECT id FROM documents WHERE created < ?)", (cutoff,))
+            conn.execute("DELETE FROM documents WHERE created < ?", (cutoff,))
+
+    def _load(self, doc_id: str, page_no: int) -> Optional[Tuple[str, int, Optional[str]]]:
+        with self._lock:
+            conn = self._connect()
+            doc = conn.execute(
+                "SELECT page_count, parse_mode, created FROM documents WHERE id = ?", (doc_id,)
+            ).fetchone()
+            if doc is None or doc[2] < time.time() - self.ttl:
+                return None
+            row = conn.execute(
+                "SELECT data FROM pages WHERE doc_id = ? AND page_no = ?", (doc_id, page_no)
+            ).fetchone()
+        if row is None:
+            return None
+        return zlib.decompress(row[0]).decode("utf-8"), doc[0], doc[1]
+
+    async def save(self, pages: List[str], parse_mode: Optional[str]) -> str:
+        """Stores the rendered pages and returns the document id used in callback data."""
+        return await asyncio.to_thread(self._save, pages, parse_mode)
+
+    async def load(self, doc_id: str, page_no: int) -> Optional[Tuple[str, int, Optional[str]]]:
+        """Returns (page text, page count, parse mode), or None if the document expired."""
+        return await asyncio.to_thread(self._load, doc_id, page_no)
+
+
+# The process-wide store used by handlers/pager.py
+paged_output = PagedOutputStore()
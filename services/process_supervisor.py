@@ -0,0 +1,170 @@
+import asyncio
+import logging
+import os
+import resource
+import signal
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from services import metrics
+
+logger = logging.getLogger(__name__)
+
+# --- Supervisor Configuration ---
+# Maximum number of simultaneous runs per executable; anything else uses DEFAULT_CONCURRENCY.
+TOOL_CONCURRENCY = {
+    "nmap": 2,
+    "rustscan": 2,
+    "gobuster": 2,
+    "wpscan": 1,
+    "sherlock": 2,
+    "sqlmap": 1,
+    "ffuf": 2,
+}
+DEFAULT_CONCURRENCY = 4
+# Address-space cap applied to every tool (0 disables it). Installers run without limits.
+MEMORY_LIMIT_BYTES = int(os.environ.get("TOOL_MEMORY_LIMIT_MB", "1536")) * 1024 * 1024
+KILL_GRACE_SECONDS = 3
+STREAM_LIMIT_BYTES = 1024 * 1024  # Longest single output line we will buffer
+
+LineCallback = Callable[[str], Awaitable[None]]
+
+_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+TOOL_RUNTIME = metrics.Histogram("doraemon_tool_runtime_seconds", "Wall time of external tool runs.", ["tool"])
+TOOL_RUNS = metrics.Counter("doraemon_tool_runs_total", "External tool runs by outcome.", ["tool", "outcome"])
+
+
+@dataclass
+class ToolRun:
+    """The outcome of one supervised tool run."""
+    command: List[str]
+    returncode: int
+    stdout: str
+    stderr: str
+    wall_time: float
+    cpu_time: float
+
+
+def _semaphore_for(tool: str) -> asyncio.Semaphore:
+    if tool not in _semaphores:
+        _semaphores[tool] = asyncio.Semaphore(TOOL_CONCURRENCY.get(tool, DEFAULT_CONCURRENCY))
+    return _semaphores[tool]
+
+
+def _limit_resources(pid: int, memory_limit: Optional[int], cpu_limit: Optional[int]) -> None:
+    """
+    Applies the limits to a freshly spawned child with prlimit(2). A preexec_fn would do it
+    before exec, but that can deadlock the child while other threads of the bot hold locks.
+    """
+    try:
+        if memory_limit:
+            resource.prlimit(pid, resource.RLIMIT_AS, (memory_limit, memory_limit))
+        if cpu_limit:
+            resource.prlimit(pid, resource.RLIMIT_CPU, (cpu_limit, cpu_limit + KILL_GRACE_SECONDS))
+    except ProcessLookupError:
+        pass  # Already exited
+    except (AttributeError, OSError) as e:  # prlimit is Linux-only
+        logger.warning(f"Could not limit resources of pid {pid}: {e}")
+
+
+def _children_cpu_time() -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+async def _pump(stream: asyncio.StreamReader, on_line: Optional[LineCallback]) -> bytes:
+    """Drains a pipe line by line, handing each decoded line to on_line as it arrives."""
+    chunks = []
+    while True:
+        try:
+            line = await stream.readline()
+        except ValueError:
+            # Line longer than STREAM_LIMIT_BYTES; readline already discarded it.
+            continue
+        if not line:
+            break
+        chunks.append(line)
+        if on_line:
+            try:
+                await on_line(line.decode('utf-8', errors='ignore').rstrip('\r\n'))
+            except Exception as e:
+                logger.debug(f"Line callback failed: {e}")
+    return b"".join(chunks)
+
+
+async def kill_process_group(process: asyncio.subprocess.Process) -> None:
+    """Terminates the process and everything it spawned, escalating to SIGKILL."""
+    if process.returncode is not None:
+        return
+    for sig in (signal.SIGTERM, signal.SIGKILL):
+        try:
+            os.killpg(process.pid, sig)
+        except ProcessLookupError:
+            return
+        try:
+            await asyncio.wait_for(process.wait(), timeout=KILL_GRACE_SECONDS)
+            return
+        except asyncio.TimeoutError:
+            continue
+
+
+async def run_tool(
+    command: List[str],
+    timeout: float,
+    tool: Optional[str] = None,
+    memory_limit: Optional[int] = MEMORY_LIMIT_BYTES,
+    cpu_limit: Optional[int] = None,
+    on_line: Optional[LineCallback] = None,
+) -> ToolRun:
+    """
+    Runs an external tool in its own process group and returns its output.
+    At most TOOL_CONCURRENCY[tool] copies run at once; extra callers wait their turn.
+    On timeout or cancellation the whole process group is killed before the
+    asyncio.TimeoutError / CancelledError propagates. FileNotFoundError is raised
+    unchanged when the executable does not exist.
+    If on_line is given it is awaited with every stdout line while the tool is still running.
+    CPU time is taken from RUSAGE_CHILDREN, so it is approximate when several tools exit together.
+    """
+    tool = tool or os.path.basename(command[0])
+    cpu_limit = cpu_limit or int(timeout) + KILL_GRACE_SECONDS
+
+    async with _semaphore_for(tool):
+        started = time.monotonic()
+        cpu_before = _children_cpu_time()
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            start_new_session=True,
+            limit=STREAM_LIMIT_BYTES,
+        )
+        _limit_resources(process.pid, memory_limit, cpu_limit)
+
+        async def collect():
+            output = await asyncio.gather(_pump(process.stdout, on_line), _pump(process.stderr, None))
+            await process.wait()
+            return output
+
+        try:
+            stdout, stderr = await asyncio.wait_for(collect(), timeout=timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            logger.warning(f"Killing {tool} (pid {process.pid}) after {time.monotonic() - started:.1f}s")
+            await kill_process_group(process)
+            TOOL_RUNTIME.labels(tool).observe(time.monotonic() - started)
+            TOOL_RUNS.labels(tool, "timeout" if isinstance(e, asyncio.TimeoutError) else "cancelled").inc()
+            raise
+
+        run = ToolRun(
+            command=command,
+            returncode=process.returncode,
+            stdout=stdout.decode('utf-8', errors='ignore'),
+            stderr=stderr.decode('utf-8', errors='ignore'),
+            wall_time=time.monotonic() - started,
+            cpu_time=max(0.0, _children_cpu_time() - cpu_before),
+        )
+        logger.info(f"{tool} exited with {run.returncode} in {run.wall_time:.1f}s (cpu {run.cpu_time:.1f}s)")
+        TOOL_RUNTIME.labels(tool).observe(run.wall_time)
+        TOOL_RUNS.labels(tool, "ok" if run.returncode == 0 else "failed").inc()
+        return run
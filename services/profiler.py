@@ -0,0 +1,170 @@
+import asyncio
+import cProfile
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from services import stall_monitor
+
+logger = logging.getLogger(__name__)
+
+# --- Profiler Configuration ---
+SAMPLE_INTERVAL = float(os.environ.get("PROFILE_SAMPLE_INTERVAL", "0.01"))  # Seconds between stack samples
+MAX_STACK_DEPTH = 64
+TOP_FUNCTIONS = 25
+# Set PROFILER=cprofile to use the deterministic profiler even where sampling is available
+FORCE_CPROFILE = os.environ.get("PROFILER", "").lower() == "cprofile"
+
+# Leaf frames that mean "waiting for work" rather than running code
+_IDLE_LEAVES = {
+    ("selectors.py", "select"), ("selectors.py", "EpollSelector.select"), ("threading.py", "Condition.wait"),
+    ("threading.py", "Event.wait"), ("queue.py", "Queue.get"), ("threading.py", "Thread._wait_for_tstate_lock"),
+}
+
+
+@dataclass
+class ProfileReport:
+    mode: str                        # "sampling" or "cprofile"
+    seconds: float
+    summary: str                     # Ranked hot functions, plain text
+    document: bytes                  # Collapsed stacks (sampling) or pstats output (cprofile)
+    filename: str
+    samples: int = 0
+    idle_share: float = 0.0          # Share of event-loop samples spent waiting in select()
+    handlers: Dict[str, float] = field(default_factory=dict)  # "command (callback)" -> longest time seen running
+
+
+def _frame_label(code) -> str:
+    return f"{os.path.basename(code.co_filename)}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+class SamplingProfiler:
+    """
+    Samples the stack of every thread (sys._current_frames) from a background thread every
+    `interval` seconds and aggregates them into collapsed stacks ("thread;outer;...;leaf count"),
+    the input format of flamegraph.pl and speedscope. The profiled code is not instrumented.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.loop_samples = 0
+        self.loop_idle = 0
+        self.handlers: Dict[str, float] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._loop_thread_id = threading.get_ident()
+
+    def start(self) -> None:
+        self._loop_thread_id = threading.get_ident()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                self._record(names.get(thread_id, str(thread_id)), thread_id, frame)
+            for command, name, _, running_for in stall_monitor.running_handlers():
+                key = f"{command} ({name})"
+                self.handlers[key] = max(self.handlers.get(key, 0.0), running_for)
+            self.samples += 1
+
+    def _record(self, thread_name: str, thread_id: int, frame) -> None:
+        labels: List[str] = []
+        leaf = (os.path.basename(frame.f_code.co_filename), getattr(frame.f_code, "co_qualname", frame.f_code.co_name))
+        while frame is not None and len(labels) < MAX_STACK_DEPTH:
+            labels.append(_frame_label(frame.f_code))
+            frame = frame.f_back
+        idle = leaf in _IDLE_LEAVES
+        if thread_id == self._loop_thread_id:
+            self.loop_samples += 1
+            self.loop_idle += idle
+        if not idle:
+            self.stacks[";".join([thread_name] + labels[::-1])] += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def ranked(self, top: int = TOP_FUNCTIONS) -> str:
+        """Functions by self samples (as the leaf) with their inclusive share of the busy samples."""
+        own: Counter = Counter()
+        total: Counter = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")[1:]
+            own[frames[-1]] += count
+            for label in set(frames):
+                total[label] += count
+        busy = sum(self.stacks.values()) or 1
+        lines = [f"{'self%':>6} {'total%':>7}  function"]
+        for label, count in own.most_common(top):
+            lines.append(f"{100 * count / busy:6.1f} {100 * total[label] / busy:7.1f}  {label}")
+        return "\n".join(lines)
+
+
+_active = threading.Lock()
+
+
+class ProfilerBusyError(RuntimeError):
+    """Raised when a profile is requested while another one is still running."""
+
+
+async def profile_for(seconds: float) -> ProfileReport:
+    """
+    Profiles the whole bot process for `seconds` and returns the report. Uses the sampling profiler,
+    or cProfile on the event-loop thread where sys._current_frames is unavailable (or PROFILER=cprofile).
+    Only one profile runs at a time.
+    """
+    if not _active.acquire(blocking=False):
+        raise ProfilerBusyError("A profile is already being recorded. Try again when it has finished.")
+    try:
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        if hasattr(sys, "_current_frames") and not FORCE_CPROFILE:
+            sampler = SamplingProfiler()
+            sampler.start()
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                await asyncio.to_thread(sampler.stop)
+            return ProfileReport(
+                mode="sampling", seconds=seconds, summary=sampler.ranked(), document=sampler.collapsed().encode("utf-8"),
+                filename=f"profile-{stamp}.collapsed", samples=sampler.samples,
+                idle_share=sampler.loop_idle / sampler.loop_samples if sampler.loop_samples else 0.0,
+                handlers=sampler.handlers,
+            )
+
+        handlers = {f"{c} ({n})": t for c, n, _, t in stall_monitor.running_handlers()}
+        profile = cProfile.Profile()
+        profile.enable()  # Covers every coroutine and callback run on the event-loop thread meanwhile
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profile.disable()
+        for command, name, _, running_for in stall_monitor.running_handlers():
+            key = f"{command} ({name})"
+            handlers[key] = max(handlers.get(key, 0.0), running_for)
+        summary, full = io.StringIO(), io.StringIO()
+        pstats.Stats(profile, stream=summary).sort_stats("tottime").print_stats(TOP_FUNCTIONS)
+        pstats.Stats(profile, stream=full).sort_stats("cumulative").print_stats()
+        return ProfileReport(
+            mode="cprofile", seconds=seconds, summary=summary.getvalue().strip(), document=full.getvalue().encode("utf-8"),
+            filename=f"profile-{stamp}.pstats.txt", handlers=handlers,
+        )
+    finally:
+        _active.release()
@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import re
+import time
+from typing import Callable, List, Optional, Tuple
+
+from telegram import Message
+from telegram.constants import ParseMode
+from telegram.error import BadRequest, RetryAfter, TelegramError
+
+from utils import escape_markdown_v2, retry_after_seconds
+
+logger = logging.getLogger(__name__)
+
+EDIT_INTERVAL_SECONDS = 4       # Minimum gap between two edits of the status message
+HEARTBEAT_SECONDS = 30          # Refresh the elapsed time even when the tool prints nothing
+MAX_SHOWN_HITS = 15             # Only the latest hits are shown while the tool is running
+
+# A parser turns one output line into ("status", text), ("hit", text) or None.
+ProgressUpdate = Optional[Tuple[str, str]]
+LineParser = Callable[[str], ProgressUpdate]
+
+_NMAP_STATS = re.compile(r"^Stats: (\S+) elapsed; .*?(\d+ undergoing .+)$")
+_NMAP_TIMING = re.compile(r"^(.+) Timing: About ([\d.]+)% done(?:; ETC: \S+ \(([\d:]+) remaining\))?")
+_NMAP_PORT = re.compile(r"^(?:Discovered open port (\S+) on (\S+)|(\d+/(?:tcp|udp))\s+open\s+(\S+))")
+_RUSTSCAN_OPEN = re.compile(r"^Open (\S+)")
+_GOBUSTER_HIT = re.compile(r"^(/\S*)\s+\(Status:\s*(\d+)\)(?:\s+\[Size:\s*(\d+)\])?")
+
+
+def parse_nmap_line(line: str) -> ProgressUpdate:
+    """Understands nmap's --stats-every lines and open-port lines."""
+    line = line.strip()
+    match = _NMAP_TIMING.match(line)
+    if match:
+        phase, percent, remaining = match.groups()
+        status = f"{phase}: {float(percent):.1f}% done"
+        return "status", status + (f", {remaining} remaining" if remaining else "")
+    match = _NMAP_STATS.match(line)
+    if match:
+        return "status", f"{match.group(1)} elapsed, {match.group(2)}"
+    match = _NMAP_PORT.match(line)
+    if match:
+        if match.group(1):
+            return "hit", f"{match.group(1)} open on {match.group(2)}"
+        return "hit", f"{match.group(3)} open {match.group(4)}"
+    return None
+
+
+def without_status_lines(output: str, parser: LineParser) -> str:
+    """Drops the lines parser classifies as "status" (progress chatter) from a tool's final output."""
+    return "\n".join(line for line in output.splitlines() if (parser(line) or ("",))[0] != "status")
+
+
+def parse_rustscan_line(line: str) -> ProgressUpdate:
+    match = _RUSTSCAN_OPEN.match(line.strip())
+    if match:
+        return "hit", f"{match.group(1)} open"
+    return parse_nmap_line(line)
+
+
+def parse_gobuster_line(line: str) -> ProgressUpdate:
+    match = _GOBUSTER_HIT.match(line.strip())
+    if match:
+        path, status, size = match.groups()
+        return "hit", f"[{status}] {path}" + (f" ({size} bytes)" if size else "")
+    return None
+
+
+def parse_nothing(line: str) -> ProgressUpdate:
+    """For tools without parseable progress; the reporter still shows elapsed time and line count."""
+    return None
+
+
+class ProgressReporter:
+    """
+    Keeps a Telegram status message updated while a tool runs.
+    Pass feed() as run_tool's on_line callback; edits are sent from a background task,
+    at most once every EDIT_INTERVAL_SECONDS, so a chatty tool never waits on Telegram.
+    Subclasses can override render() and call refresh() when their own state changes.
+    """
+
+    def __init__(self, message: Message, title: str, parser: LineParser = parse_nothing):
+        self.message = message
+        self.title = title
+        self.parser = parser
+        self.status = "Starting..."
+        self.hits: List[str] = []
+        self.line_count = 0
+        self._started = time.monotonic()
+        self._last_edit = self._started - EDIT_INTERVAL_SECONDS  # The first change is shown at once
+        self._changed = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def __aenter__(self) -> "ProgressReporter":
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def feed(self, line: str) -> None:
+        self.line_count += 1
+        update = self.parser(line)
+        if not update:
+            return
+        kind, text = update
+        if kind == "status":
+            self.status = text
+        else:
+            self.hits.append(text)
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Schedules an edit; bursts of changes are coalesced into one."""
+        self._changed.set()
+
+    def render(self) -> str:
+        elapsed = int(time.monotonic() - self._started)
+        lines = [
+            self.title,
+            escape_markdown_v2(f"⏱ {elapsed // 60}m{elapsed % 60:02d}s · {self.status} · {self.line_count} lines of output"),
+        ]
+        if self.hits:
+            shown = self.hits[-MAX_SHOWN_HITS:]
+            header = f"Found so far ({len(self.hits)}):" if len(shown) == len(self.hits) else f"Found so far ({len(self.hits)}, latest {len(shown)}):"
+            lines.append(f"\n*{escape_markdown_v2(header)}*")
+            lines.append("```\n" + escape_markdown_v2("\n".join(shown)) + "\n```")
+        return "\n".join(lines)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                pass  # Nothing new, but refresh the elapsed time
+            await asyncio.sleep(max(self._last_edit + EDIT_INTERVAL_SECONDS - time.monotonic(), 0))
+            self._changed.clear()
+            self._last_edit = time.monotonic()
+            try:
+                await self.message.edit_text(self.render(), parse_mode=ParseMode.MARKDOWN_V2)
+            except RetryAfter as e:
+                await asyncio.sleep(retry_after_seconds(e))
+            except BadRequest as e:
+                if "not modified" not in str(e).lower():
+                    logger.debug(f"Progress edit rejected: {e}")
+            except TelegramError as e:
+                logger.debug(f"Progress edit failed: {e}")
@@ -0,0 +1,215 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Union
+from urllib.parse import urlsplit, urlunsplit
+
+from services import metrics
+from services.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# --- Cache Configuration ---
+# Seconds a successful answer is reused, per tool. Tools not listed use DEFAULT_TTL.
+TOOL_TTLS = {
+    # HackerTarget (recon_tools.ENDPOINTS)
+    "hostsearch": 6 * 3600,
+    "dnslookup": 3600,
+    "whois": 24 * 3600,
+    "geoip": 24 * 3600,
+    "reverseiplookup": 6 * 3600,
+    "findshareddns": 6 * 3600,
+    "zonetransfer": 6 * 3600,
+    "httpheaders": 600,
+    "pagelinks": 3600,
+    "nmap": 3600,
+    "mtr": 600,
+    "aslookup": 24 * 3600,
+    # Other remote lookups
+    "crtsh": 6 * 3600,
+    "cms": 24 * 3600,
+    "analyse": 24 * 3600,
+}
+DEFAULT_TTL = int(os.environ.get("RESULT_CACHE_TTL", "3600"))
+MEMORY_ENTRIES = int(os.environ.get("RESULT_CACHE_MEMORY_ENTRIES", "1024"))  # Size of the in-memory LRU tier
+CACHE_DB = os.path.join("persistence_data", "result_cache.sqlite3")
+PRUNE_EVERY_WRITES = 200  # Expired disk rows are deleted after this many writes
+
+Fetcher = Callable[[], Awaitable[Any]]
+TTL = Union[float, Callable[[Any], float]]
+
+_MISSING = object()
+
+
+def normalise_target(target: str) -> str:
+    """Canonical cache key for a domain, IP or URL (case, whitespace, trailing dot/slash)."""
+    target = target.strip()
+    if "://" in target:
+        parts = urlsplit(target)
+        path = parts.path.rstrip("/")
+        return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, parts.query, ""))
+    return target.lower().rstrip("./")
+
+
+class ResultCache:
+    """
+    Two-tier TTL cache for remote lookup results, keyed by (tool, normalised target).
+    A bounded LRU dict sits in front of a SQLite table, so answers survive restarts and are
+    shared by the bot and the web UI. Values must be JSON-serialisable. Safe to use from
+    several threads and event loops (worker threads, and every web worker has its own loop).
+    """
+
+    def __init__(self, path: str = CACHE_DB, memory_entries: int = MEMORY_ENTRIES):
+        self.path = path
+        self.memory_entries = memory_entries
+        self._memory: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+        self._memory_lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._writes = 0
+        self._flights = SingleFlight("result_cache")
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    # --- Disk tier (runs in a worker thread) ---
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "tool TEXT NOT NULL, target TEXT NOT NULL, value TEXT NOT NULL, expires REAL NOT NULL, "
+                "PRIMARY KEY (tool, target)) WITHOUT ROWID"
+            )
+        return self._conn
+
+    def _disk_get(self, key: Tuple[str, str]) -> Optional[Tuple[float, Any]]:
+        with self._db_lock:
+            row = self._connect().execute(
+                "SELECT value, expires FROM results WHERE tool = ? AND target = ?", key
+            ).fetchone()
+        if row is None or row[1] <= time.time():
+            return None
+        return row[1], json.loads(row[0])
+
+    def _disk_set(self, key: Tuple[str, str], expires: float, value: Any) -> None:
+        payload = json.dumps(value)
+        with self._db_lock:
+            conn = self._connect()
+            conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)", (*key, payload, expires))
+            self._writes += 1
+            if self._writes % PRUNE_EVERY_WRITES == 0:
+                conn.execute("DELETE FROM results WHERE expires <= ?", (time.time(),))
+
+    # --- Memory tier ---
+
+    def _memory_get(self, key: Tuple[str, str]) -> Any:
+        with self._memory_lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return _MISSING
+            if entry[0] <= time.time():
+                del self._memory[key]
+                return _MISSING
+            self._memory.move_to_end(key)
+            return entry[1]
+
+    def _memory_set(self, key: Tuple[str, str], expires: float, value: Any) -> None:
+        with self._memory_lock:
+            self._memory[key] = (expires, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    # --- Public API ---
+
+    async def get(self, tool: str, target: str) -> Any:
+        """Returns the cached value, or None if there is no live entry."""
+        value = await self._lookup((tool, normalise_target(target)))
+        return None if value is _MISSING else value
+
+    async def _lookup(self, key: Tuple[str, str]) -> Any:
+        value = self._memory_get(key)
+        if value is not _MISSING:
+            self.memory_hits += 1
+            return value
+        try:
+            entry = await asyncio.to_thread(self._disk_get, key)
+        except (sqlite3.Error, ValueError) as e:
+            logger.warning(f"Result cache read failed for {key}: {e}")
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return _MISSING
+        self.disk_hits += 1
+        self._memory_set(key, *entry)
+        return entry[1]
+
+    async def set(self, tool: str, target: str, value: Any, ttl: Optional[float] = None) -> None:
+        key = (tool, normalise_target(target))
+        expires = time.time() + (TOOL_TTLS.get(tool, DEFAULT_TTL) if ttl is None else ttl)
+        self._memory_set(key, expires, value)
+        try:
+            await asyncio.to_thread(self._disk_set, key, expires, value)
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.warning(f"Result cache write failed for {key}: {e}")
+
+    async def get_or_fetch(self, tool: str, target: str, fetch: Fetcher, ttl: Optional[TTL] = None) -> Any:
+        """
+        Returns the cached value for (tool, target), or awaits fetch() and caches its result.
+        Concurrent misses for the same key share one fetch() call. Exceptions raised by fetch()
+        propagate to every waiter and are never cached. ttl may be a callable
+        that picks the lifetime from the fetched value (e.g. shorter for empty answers);
+        a lifetime of 0 returns the value without caching it (error answers).
+        """
+        key = (tool, normalise_target(target))
+        value = await self._lookup(key)
+        if value is not _MISSING:
+            return value
+
+        async def fetch_and_store() -> Any:
+            fetched = await fetch()
+            lifetime = ttl(fetched) if callable(ttl) else ttl
+            if lifetime is None or lifetime > 0:
+                await self.set(tool, target, fetched, lifetime)
+            return fetched
+
+        # Callers that miss while the same lookup is already running share its result
+        return await self._flights.do(key, fetch_and_store)
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "coalesced": self._flights.coalesced,
+        }
+
+
+# The process-wide cache shared by the bot handlers and Web.py
+result_cache = ResultCache()
+
+metrics.Counter(
+    "doraemon_cache_lookups_total", "Result cache lookups by outcome.", ["cache", "result"],
+    function=lambda: {
+        ("results", "memory_hit"): result_cache.memory_hits,
+        ("results", "disk_hit"): result_cache.disk_hits,
+        ("results", "miss"): result_cache.misses,
+    },
+)
+metrics.Gauge(
+    "doraemon_cache_hit_ratio", "Share of lookups answered from the cache.", ["cache"],
+    function=lambda: {("results",): result_cache.stats()["hit_ratio"]},
+)
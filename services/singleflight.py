@@ -0,0 +1,66 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0  # Callers currently awaiting the task
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls: the first caller for a key starts the work and every
+    caller that arrives while it is running awaits the same task and gets the same result
+    (or exception). Nothing is remembered once the task finishes; caching is a separate layer.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._in_flight: Dict[Tuple[int, Hashable], _Flight] = {}
+        self.coalesced = 0  # Calls that joined a task started by someone else
+
+    def _forget(self, flight_key: Tuple[int, Hashable], flight: _Flight) -> None:
+        if self._in_flight.get(flight_key) is flight:
+            del self._in_flight[flight_key]
+
+    def _finish(self, flight_key: Tuple[int, Hashable], flight: _Flight) -> None:
+        self._forget(flight_key, flight)
+        if not flight.task.cancelled():
+            flight.task.exception()  # Mark as retrieved when every waiter has gone away
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Runs fn() once per key at a time. A waiter that is cancelled does not cancel the shared
+        task while other callers still wait for it; when the last one leaves, the task is
+        cancelled too, so abandoned work (a subprocess, a request) does not keep running.
+        """
+        # Futures belong to one event loop (callers may run on several), so key by loop too
+        flight_key = (id(asyncio.get_running_loop()), key)
+        flight = self._in_flight.get(flight_key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._in_flight[flight_key] = flight
+            flight.task.add_done_callback(lambda t: self._finish(flight_key, flight))
+        else:
+            self.coalesced += 1
+            logger.debug(f"{self.name}: joined in-flight call for {key!r}")
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if not flight.waiters and not flight.task.done():
+                logger.debug(f"{self.name}: every caller for {key!r} went away; cancelling it")
+                self._forget(flight_key, flight)  # Callers arriving now start afresh
+                flight.task.cancel()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
@@ -0,0 +1,272 @@
+import asyncio
+import hashlib
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+logger = logging.getLogger(__name__)
+
+# Row kinds. Dict-valued bot_data entries (hash_to_path, wordlist_last_used, ...) are stored one
+# item per row under "bot_map:<key>", so touching one wordlist rewrites one row, not the whole map.
+KIND_BOT = "bot"
+KIND_BOT_MAP = "bot_map:"
+KIND_USER = "user"
+KIND_CHAT = "chat"
+KIND_CALLBACK = "callback"
+KIND_CONVERSATION = "conv:"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS data (
+    kind TEXT NOT NULL,
+    key BLOB NOT NULL,
+    value BLOB NOT NULL,
+    PRIMARY KEY (kind, key)
+) WITHOUT ROWID
+"""
+
+
+def _dump(obj: Any) -> bytes:
+    return pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+class SQLitePersistence(BasePersistence):
+    """
+    BasePersistence on a single SQLite database in WAL mode.
+
+    * Only rows whose pickled value changed since the last write are written, each in its own
+      small transaction, so a crash can never corrupt the whole store.
+    * user_data and chat_data are loaded lazily, the first time PTB refreshes a given user/chat.
+    * bot_data and conversation states are loaded at startup; bot_data maps are stored per item.
+    """
+
+    def __init__(self, filepath: str, legacy_pickle: Optional[str] = None,
+                 store_data: Optional[PersistenceInput] = None, update_interval: float = 60):
+        super().__init__(store_data=store_data, update_interval=update_interval)
+        self.filepath = filepath
+        self.legacy_pickle = legacy_pickle
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._written: Dict[Tuple[str, bytes], bytes] = {}  # (kind, key) -> digest of the stored value
+        self._loaded_users: Set[int] = set()
+        self._loaded_chats: Set[int] = set()
+
+    # --- Storage helpers (run in a worker thread) ---
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.filepath) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.filepath, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(_SCHEMA)
+            self._import_legacy_pickle()
+        return self._conn
+
+    def _import_legacy_pickle(self) -> None:
+        """One-time import of the PicklePersistence file this store replaces."""
+        if not self.legacy_pickle or not os.path.exists(self.legacy_pickle):
+            return
+        if self._conn.execute("SELECT 1 FROM data LIMIT 1").fetchone():
+            return
+        try:
+            with open(self.legacy_pickle, "rb") as f:
+                legacy = pickle.load(f)
+        except Exception as e:
+            logger.warning(f"Could not import legacy persistence file {self.legacy_pickle}: {e}")
+            return
+        rows: List[Tuple[str, bytes, bytes]] = []
+        for key, value in (legacy.get("bot_data") or {}).items():
+            rows.extend(self._bot_rows(key, value))
+        for user_id, value in (legacy.get("user_data") or {}).items():
+            rows.append((KIND_USER, _dump(user_id), _dump(value)))
+        for chat_id, value in (legacy.get("chat_data") or {}).items():
+            rows.append((KIND_CHAT, _dump(chat_id), _dump(value)))
+        for name, states in (legacy.get("conversations") or {}).items():
+            for key, state in states.items():
+                rows.append((KIND_CONVERSATION + name, _dump(key), _dump(state)))
+        if legacy.get("callback_data") is not None:
+            rows.append((KIND_CALLBACK, b"", _dump(legacy["callback_data"])))
+        with self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("INSERT OR REPLACE INTO data VALUES (?, ?, ?)", rows)
+        logger.info(f"Imported {len(rows)} rows from legacy persistence file {self.legacy_pickle}")
+
+    @staticmethod
+    def _bot_rows(key: Any, value: Any) -> Iterable[Tuple[str, bytes, bytes]]:
+        if type(value) is dict and isinstance(key, str):
+            kind = KIND_BOT_MAP + key
+            return [(kind, _dump(k), _dump(v)) for k, v in value.items()] or [(kind, b"", b"")]
+        return [(KIND_BOT, _dump(key), _dump(value))]
+
+    def _select(self, kind: str, key: Optional[bytes] = None) -> List[Tuple[bytes, bytes]]:
+        with self._lock:
+            conn = self._connect()
+            if key is None:
+                return conn.execute("SELECT key, value FROM data WHERE kind = ?", (kind,)).fetchall()
+            return conn.execute("SELECT key, value FROM data WHERE kind = ? AND key = ?", (kind, key)).fetchall()
+
+    def _select_prefix(self, prefix: str) -> List[Tuple[str, bytes, bytes]]:
+        with self._lock:
+            conn = self._connect()
+            upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+            return conn.execute(
+                "SELECT kind, key, value FROM data WHERE kind >= ? AND kind < ?", (prefix, upper)
+            ).fetchall()
+
+    def _write(self, upserts: List[Tuple[str, bytes, bytes]], deletes: Iterable[Tuple[str, bytes]] = (),
+               stale_prefix: Optional[str] = None) -> None:
+        """
+        Writes only rows whose digest differs from what we last stored. With stale_prefix, rows of
+        kinds starting with it that are not among the upserts are deleted as well.
+        PTB runs the update_* calls concurrently, each in its own worker thread, so the digest
+        map is only read and changed under the lock.
+        """
+        digests = [(kind, key, value, hashlib.blake2b(value, digest_size=16).digest()) for kind, key, value in upserts]
+        with self._lock:
+            changed = [row for row in digests if self._written.get(row[:2]) != row[3]]
+            deletes = [d for d in deletes if d in self._written]
+            if stale_prefix is not None:
+                current = {row[:2] for row in digests}
+                deletes += [k for k in self._written if k[0].startswith(stale_prefix) and k not in current]
+            if not changed and not deletes:
+                return
+            conn = self._connect()
+            with conn:
+                conn.execute("BEGIN")
+                conn.executemany("INSERT OR REPLACE INTO data VALUES (?, ?, ?)", [c[:3] for c in changed])
+                conn.executemany("DELETE FROM data WHERE kind = ? AND key = ?", deletes)
+            for kind, key, _, digest in changed:
+                self._written[(kind, key)] = digest
+            for d in deletes:
+                self._written.pop(d, None)
+
+    def _remember(self, kind: str, key: bytes, value: bytes) -> None:
+        digest = hashlib.blake2b(value, digest_size=16).digest()
+        with self._lock:
+            self._written[(kind, key)] = digest
+
+    def _load_one(self, kind: str, key_obj: Any) -> Optional[Any]:
+        key = _dump(key_obj)
+        rows = self._select(kind, key)
+        if not rows:
+            return None
+        self._remember(kind, key, rows[0][1])
+        return pickle.loads(rows[0][1])
+
+    # --- Loading ---
+
+    async def get_bot_data(self) -> Dict[Any, Any]:
+        def load():
+            bot_data: Dict[Any, Any] = {}
+            for key, value in self._select(KIND_BOT):
+                self._remember(KIND_BOT, key, value)
+                bot_data[pickle.loads(key)] = pickle.loads(value)
+            for kind, key, value in self._select_prefix(KIND_BOT_MAP):
+                self._remember(kind, key, value)
+                mapping = bot_data.setdefault(kind[len(KIND_BOT_MAP):], {})
+                if key:
+                    mapping[pickle.loads(key)] = pickle.loads(value)
+            return bot_data
+        return await asyncio.to_thread(load)
+
+    async def get_user_data(self) -> Dict[int, Dict[Any, Any]]:
+        return {}  # Loaded per user in refresh_user_data
+
+    async def get_chat_data(self) -> Dict[int, Dict[Any, Any]]:
+        return {}  # Loaded per chat in refresh_chat_data
+
+    async def get_callback_data(self) -> Optional[Any]:
+        def load():
+            rows = self._select(KIND_CALLBACK, b"")
+            if not rows:
+                return None
+            self._remember(KIND_CALLBACK, b"", rows[0][1])
+            return pickle.loads(rows[0][1])
+        return await asyncio.to_thread(load)
+
+    async def get_conversations(self, name: str) -> Dict[Tuple[Any, ...], object]:
+        def load():
+            kind = KIND_CONVERSATION + name
+            states = {}
+            for key, value in self._select(kind):
+                self._remember(kind, key, value)
+                states[pickle.loads(key)] = pickle.loads(value)
+            return states
+        return await asyncio.to_thread(load)
+
+    async def refresh_user_data(self, user_id: int, user_data: Dict[Any, Any]) -> None:
+        if user_id in self._loaded_users:
+            return
+        self._loaded_users.add(user_id)
+        stored = await asyncio.to_thread(self._load_one, KIND_USER, user_id)
+        for key, value in (stored or {}).items():
+            user_data.setdefault(key, value)
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: Dict[Any, Any]) -> None:
+        if chat_id in self._loaded_chats:
+            return
+        self._loaded_chats.add(chat_id)
+        stored = await asyncio.to_thread(self._load_one, KIND_CHAT, chat_id)
+        for key, value in (stored or {}).items():
+            chat_data.setdefault(key, value)
+
+    async def refresh_bot_data(self, bot_data: Dict[Any, Any]) -> None:
+        pass  # bot_data only changes inside this process
+
+    # --- Writing ---
+
+    async def update_bot_data(self, data: Dict[Any, Any]) -> None:
+        def write():
+            upserts = []
+            for key, value in data.items():
+                upserts.extend(self._bot_rows(key, value))
+            self._write(upserts, stale_prefix=KIND_BOT)
+        await asyncio.to_thread(write)
+
+    async def _update_scoped(self, kind: str, loaded: Set[int], object_id: int, data: Dict[Any, Any]) -> None:
+        if object_id not in loaded:
+            # Never refreshed (e.g. written from outside a handler): merge what is already stored into
+            # PTB's own dict, as refresh_*_data would have, so later writes of `data` keep those keys
+            stored = await asyncio.to_thread(self._load_one, kind, object_id)
+            for key, value in (stored or {}).items():
+                data.setdefault(key, value)
+            loaded.add(object_id)
+        await asyncio.to_thread(lambda: self._write([(kind, _dump(object_id), _dump(data))]))
+
+    async def update_user_data(self, user_id: int, data: Dict[Any, Any]) -> None:
+        await self._update_scoped(KIND_USER, self._loaded_users, user_id, data)
+
+    async def update_chat_data(self, chat_id: int, data: Dict[Any, Any]) -> None:
+        await self._update_scoped(KIND_CHAT, self._loaded_chats, chat_id, data)
+
+    async def update_callback_data(self, data: Any) -> None:
+        await asyncio.to_thread(self._write, [(KIND_CALLBACK, b"", _dump(data))])
+
+    async def update_conversation(self, name: str, key: Tuple[Any, ...], new_state: Optional[object]) -> None:
+        kind = KIND_CONVERSATION + name
+        if new_state is None:
+            await asyncio.to_thread(self._write, [], [(kind, _dump(key))])
+        else:
+            await asyncio.to_thread(self._write, [(kind, _dump(key), _dump(new_state))])
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._loaded_users.discard(user_id)
+        await asyncio.to_thread(self._write, [], [(KIND_USER, _dump(user_id))])
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        self._loaded_chats.discard(chat_id)
+        await asyncio.to_thread(self._write, [], [(KIND_CHAT, _dump(chat_id))])
+
+    async def flush(self) -> None:
+        def close():
+            with self._lock:
+                if self._conn is not None:
+                    self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                    self._conn.close()
+                    self._conn = None
+        await asyncio.to_thread(close)
@@ -0,0 +1,194 @@
+import asyncio
+import functools
+import itertools
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from services import metrics
+
+logger = logging.getLogger(__name__)
+
+# --- Monitor Configuration ---
+STALL_THRESHOLD = float(os.environ.get("LOOP_STALL_THRESHOLD", "1.0"))   # Seconds the loop may be unresponsive
+HEARTBEAT_INTERVAL = 0.1        # Seconds between heartbeats of the event loop (also the lag probe)
+STACK_DEPTH = 25                # Innermost frames logged for a stall
+MAX_TRACKED_UPDATES = 1000      # Dispatched-update marks kept for updates no wrapped handler picks up
+
+LOOP_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+
+COMMAND_REQUESTS = metrics.Counter("doraemon_command_requests_total", "Handled updates by command.", ["command", "status"])
+COMMAND_DURATION = metrics.Histogram("doraemon_command_duration_seconds", "Wall time of one handler invocation, by command.", ["command"])
+DISPATCH_DELAY = metrics.Histogram(
+    "doraemon_update_dispatch_delay_seconds", "Time from a message being sent to the bot starting to handle it.",
+)
+EVENT_LOOP_LAG = metrics.Histogram("doraemon_event_loop_lag_seconds", "How late the event loop ran a timer.", buckets=LOOP_LAG_BUCKETS)
+LOOP_STALLS = metrics.Counter("doraemon_event_loop_stalls_total", "Times the event loop was blocked past the threshold, by running handler.", ["handler"])
+LOOP_STALL_DURATION = metrics.Histogram(
+    "doraemon_event_loop_stall_seconds", "How long each detected stall blocked the event loop.", buckets=LOOP_LAG_BUCKETS[4:] + (10, 30, 60),
+)
+
+# Handler invocations in progress: token -> (command, callback name, user id, started). Read from other threads.
+_running: Dict[int, Tuple[str, str, Optional[int], float]] = {}
+_tokens = itertools.count()
+# update_id -> monotonic time the update was dispatched (set by the group -1 TypeHandler)
+_dispatched: "OrderedDict[int, float]" = OrderedDict()
+
+
+# ==============================================================================
+# Handler middleware
+# ==============================================================================
+async def _mark_dispatch(update, context) -> None:
+    """Group -1 TypeHandler: runs before any other handler for every update."""
+    _dispatched[update.update_id] = time.monotonic()
+    if len(_dispatched) > MAX_TRACKED_UPDATES:
+        _dispatched.popitem(last=False)
+    message = update.effective_message
+    if message is not None and message.date is not None and update.edited_message is None:
+        DISPATCH_DELAY.observe(max(0.0, time.time() - message.date.timestamp()))
+
+
+def _timed(callback, command: str):
+    @functools.wraps(callback)
+    async def wrapper(update, context):
+        user = getattr(update, "effective_user", None)
+        token = next(_tokens)
+        started = time.monotonic()
+        _running[token] = (command, callback.__name__, user.id if user else None, started)
+        status = "ok"
+        try:
+            return await callback(update, context)
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            elapsed = time.monotonic() - started
+            del _running[token]
+            dispatched = _dispatched.pop(getattr(update, "update_id", None), None)
+            COMMAND_REQUESTS.labels(command, status).inc()
+            COMMAND_DURATION.labels(command).observe(elapsed)
+            waited = f" (+{started - dispatched:.2f}s before the handler ran)" if dispatched is not None and started - dispatched >= 0.01 else ""
+            logger.info(f"{command} for user {user.id if user else '-'} finished ({status}) in {elapsed:.2f}s{waited}")
+    return wrapper
+
+
+def instrument(application) -> None:
+    """
+    Registers the group -1 dispatch marker and wraps every registered handler callback so each
+    invocation is timed, logged and counted, and shows up in stall reports while it runs.
+    Call after all handlers are added.
+    """
+    from telegram import Update
+    from telegram.ext import CommandHandler, ConversationHandler, TypeHandler
+
+    def wrap(handler) -> None:
+        if isinstance(handler, ConversationHandler):
+            for child in handler.entry_points + handler.fallbacks + [h for hs in handler.states.values() for h in hs]:
+                wrap(child)
+            return
+        callback = getattr(handler, "callback", None)
+        if callback is None or hasattr(callback, "__wrapped__"):
+            return
+        if isinstance(handler, CommandHandler):
+            command = "/" + sorted(handler.commands)[0]
+        else:
+            command = getattr(callback, "__name__", type(handler).__name__)
+        handler.callback = _timed(callback, command)
+
+    for handlers in application.handlers.values():
+        for handler in handlers:
+            wrap(handler)
+    application.add_handler(TypeHandler(Update, _mark_dispatch), group=-1)
+
+
+# ==============================================================================
+# Event-loop watchdog
+# ==============================================================================
+class LoopWatchdog:
+    """
+    A heartbeat task on the event loop plus a thread that watches it. When the loop misses its
+    heartbeat for longer than `threshold`, the thread captures the loop thread's current stack
+    (sys._current_frames) and logs it together with the handlers that were running.
+    """
+
+    def __init__(self, threshold: float = STALL_THRESHOLD, interval: float = HEARTBEAT_INTERVAL):
+        self.threshold = threshold
+        self.interval = interval
+        self.stalls = 0
+        self._last_beat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._heartbeat(), name="loop_watchdog_heartbeat")
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._thread is not None:
+            await asyncio.to_thread(self._thread.join, 1)
+            self._thread = None
+
+    async def _heartbeat(self) -> None:
+        while True:
+            before = time.monotonic()
+            self._last_beat = before
+            await asyncio.sleep(self.interval)
+            EVENT_LOOP_LAG.observe(max(0.0, time.monotonic() - before - self.interval))
+
+    def _watch(self) -> None:
+        stalled_since: Optional[float] = None
+        while not self._stop.wait(self.interval):
+            silent_for = time.monotonic() - self._last_beat - self.interval
+            if silent_for < self.threshold:
+                if stalled_since is not None:
+                    duration = time.monotonic() - stalled_since
+                    LOOP_STALL_DURATION.observe(duration)
+                    logger.warning(f"Event loop recovered after being blocked for about {duration:.1f}s.")
+                    stalled_since = None
+                continue
+            if stalled_since is None:
+                stalled_since = self._last_beat + self.interval
+                self._report(silent_for)
+
+    def _report(self, silent_for: float) -> None:
+        self.stalls += 1
+        running = sorted(_running.values(), key=lambda entry: entry[3])
+        LOOP_STALLS.labels(running[-1][0] if running else "none").inc()
+
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = "".join(traceback.format_stack(frame, limit=STACK_DEPTH)) if frame else "  (loop thread not found)\n"
+        now = time.monotonic()
+        handlers = "\n".join(
+            f"  {command} for user {user_id if user_id is not None else '-'}, running {now - started:.1f}s"
+            for command, _, user_id, started in running
+        ) or "  (none)"
+        logger.warning(
+            f"Event loop blocked for {silent_for:.1f}s (threshold {self.threshold:.1f}s).\n"
+            f"Handlers in progress:\n{handlers}\nLoop thread stack (most recent call last):\n{stack.rstrip()}"
+        )
+
+
+def running_handlers() -> List[Tuple[str, str, Optional[int], float]]:
+    """(command, callback name, user id, seconds running) for every handler invocation in progress."""
+    now = time.monotonic()
+    return [(command, name, user_id, now - started) for command, name, user_id, started in list(_running.values())]
+
+
+# The bot's watchdog, started and stopped by main.py
+watchdog = LoopWatchdog()
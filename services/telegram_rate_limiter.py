@@ -0,0 +1,231 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Any, Callable, Coroutine, Deque, Dict, List, Optional, Set, Tuple, Union
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+from services import metrics
+
+logger = logging.getLogger(__name__)
+
+# --- Flood Limits (https://core.telegram.org/bots/faq#my-bot-is-hitting-limits-how-do-i-avoid-this) ---
+GLOBAL_RATE = float(os.environ.get("TELEGRAM_GLOBAL_RATE", "30"))   # Messages per second across all chats
+PRIVATE_CHAT_INTERVAL = 1.0     # Seconds between messages to one private chat
+GROUP_CHAT_INTERVAL = 3.0       # Groups allow about 20 messages per minute
+MAX_RETRIES = 3                 # RetryAfter retries before the error reaches the caller
+SHUTDOWN_DRAIN_SECONDS = 10     # How long shutdown waits for requests already being sent
+
+ChatId = Union[int, str]
+
+_current: Optional["TelegramRateLimiter"] = None   # The running instance, for the metrics below
+metrics.Gauge(
+    "doraemon_telegram_queue_depth", "Outgoing Bot API requests waiting in the rate limiter.",
+    function=lambda: _current.queue_depth if _current else 0,
+)
+metrics.Counter(
+    "doraemon_telegram_merged_edits_total", "Queued message edits replaced by a newer edit.",
+    function=lambda: _current.merged_edits if _current else 0,
+)
+RETRY_AFTER = metrics.Counter("doraemon_telegram_retry_after_total", "Flood-control (RetryAfter) answers from Telegram.")
+
+
+@dataclass
+class _Request:
+    callback: Callable[..., Coroutine[Any, Any, Any]]
+    args: Any
+    kwargs: Dict[str, Any]
+    endpoint: str
+    merge_key: Optional[Tuple[ChatId, Any]] = None
+    retries: int = 0
+    waiters: List[asyncio.Future] = field(default_factory=list)
+
+
+def _seconds(retry_after: Union[int, float, timedelta]) -> float:
+    return retry_after.total_seconds() if isinstance(retry_after, timedelta) else float(retry_after)
+
+
+class TelegramRateLimiter(BaseRateLimiter[None]):
+    """
+    One outbound queue for every Bot API call that targets a chat.
+
+    * Each chat gets its own FIFO and at most one request in flight, paced at PRIVATE_CHAT_INTERVAL
+      (or GROUP_CHAT_INTERVAL for groups and channels); all chats share GLOBAL_RATE.
+    * Chats with pending messages are served round-robin, so one long report cannot hold up
+      delivery to everyone else.
+    * An editMessageText for a message that still has an unsent edit queued replaces that edit;
+      both callers receive the result of the newest one.
+    * RetryAfter pauses only the affected chat (or everything, for calls without a chat) and the
+      request is retried at the head of its queue.
+    Calls without a chat_id (answerCallbackQuery, getMe, ...) are not queued.
+    """
+
+    def __init__(self, global_rate: float = GLOBAL_RATE, max_retries: int = MAX_RETRIES):
+        self.global_interval = 1.0 / global_rate
+        self.max_retries = max_retries
+        self._queues: "OrderedDict[ChatId, Deque[_Request]]" = OrderedDict()
+        self._pending_edits: Dict[Tuple[ChatId, Any], _Request] = {}
+        self._chat_ready_at: Dict[ChatId, float] = {}
+        self._in_flight: set = set()
+        self._global_ready_at = 0.0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._sends: Set[asyncio.Task] = set()  # Requests being sent; referenced so they are not garbage-collected
+        self.merged_edits = 0
+
+    async def initialize(self) -> None:
+        if self._dispatcher is not None:
+            return  # ExtBot.initialize() calls this again for the Updater's use of the same bot
+        global _current
+        _current = self
+        self._wakeup = asyncio.Event()
+        self._dispatcher = asyncio.create_task(self._dispatch_loop(), name="telegram_rate_limiter")
+
+    async def shutdown(self) -> None:
+        if self._dispatcher:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+            self._dispatcher = None
+        if self._sends:
+            # Let requests already on their way finish; cancel the ones that hang
+            _, hanging = await asyncio.wait(set(self._sends), timeout=SHUTDOWN_DRAIN_SECONDS)
+            for task in hanging:
+                task.cancel()
+            await asyncio.gather(*hanging, return_exceptions=True)
+        for queue in self._queues.values():
+            for request in queue:
+                for waiter in request.waiters:
+                    if not waiter.done():
+                        waiter.set_exception(RuntimeError("Rate limiter was shut down before the request was sent."))
+        self._queues.clear()
+        self._pending_edits.clear()
+
+    @property
+    def queue_depth(self) -> int:
+        """Requests waiting to be sent, across all chats."""
+        return sum(len(queue) for queue in self._queues.values())
+
+    @staticmethod
+    def _chat_interval(chat_id: ChatId) -> float:
+        if isinstance(chat_id, str) or chat_id < 0:
+            return GROUP_CHAT_INTERVAL
+        return PRIVATE_CHAT_INTERVAL
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args) -> Any:
+        chat_id = data.get("chat_id")
+        if chat_id is None or self._dispatcher is None:
+            return await self._call_direct(callback, args, kwargs)
+        if isinstance(chat_id, str) and chat_id.lstrip("-").isdigit():
+            chat_id = int(chat_id)
+
+        waiter = asyncio.get_running_loop().create_future()
+        merge_key = (chat_id, data.get("message_id")) if endpoint == "editMessageText" else None
+        pending = self._pending_edits.get(merge_key) if merge_key else None
+        if pending is not None:
+            # The older text would be overwritten a moment later anyway; send only the newest
+            pending.callback, pending.args, pending.kwargs = callback, args, kwargs
+            pending.waiters.append(waiter)
+            self.merged_edits += 1
+        else:
+            request = _Request(callback, args, kwargs, endpoint, merge_key, waiters=[waiter])
+            self._queues.setdefault(chat_id, deque()).append(request)
+            if merge_key:
+                self._pending_edits[merge_key] = request
+            self._wakeup.set()
+        return await waiter
+
+    async def _call_direct(self, callback, args, kwargs) -> Any:
+        for attempt in range(self.max_retries + 1):
+            delay = self._global_ready_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                RETRY_AFTER.inc()
+                if attempt == self.max_retries:
+                    raise
+                self._global_ready_at = time.monotonic() + _seconds(e.retry_after)
+                logger.warning(f"Flood control on a chat-less request; pausing {_seconds(e.retry_after):.0f}s.")
+
+    def _next_chat(self, now: float) -> Tuple[Optional[ChatId], float]:
+        """Returns the first chat in round-robin order that may send now, or how long to wait."""
+        soonest = float("inf")
+        for chat_id in self._queues:
+            if chat_id in self._in_flight:
+                continue
+            ready_at = self._chat_ready_at.get(chat_id, 0.0)
+            if ready_at <= now:
+                return chat_id, 0.0
+            soonest = min(soonest, ready_at - now)
+        return None, soonest
+
+    async def _dispatch_loop(self) -> None:
+        while True:
+            now = time.monotonic()
+            if self._global_ready_at > now:
+                await asyncio.sleep(self._global_ready_at - now)
+                continue
+            chat_id, wait = self._next_chat(now)
+            if chat_id is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=None if wait == float("inf") else wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            queue = self._queues.pop(chat_id)
+            request = queue.popleft()
+            if queue:
+                self._queues[chat_id] = queue  # Re-insert at the end: round-robin
+            if request.merge_key:
+                self._pending_edits.pop(request.merge_key, None)
+            self._in_flight.add(chat_id)
+            self._chat_ready_at[chat_id] = now + self._chat_interval(chat_id)
+            self._global_ready_at = now + self.global_interval
+            task = asyncio.create_task(self._send(chat_id, request))
+            self._sends.add(task)
+            task.add_done_callback(self._sends.discard)
+
+    async def _send(self, chat_id: ChatId, request: _Request) -> None:
+        try:
+            result = await request.callback(*request.args, **request.kwargs)
+        except RetryAfter as e:
+            RETRY_AFTER.inc()
+            pause = _seconds(e.retry_after)
+            self._chat_ready_at[chat_id] = time.monotonic() + pause
+            if request.retries < self.max_retries:
+                request.retries += 1
+                logger.warning(f"Flood control for chat {chat_id}; retrying {request.endpoint} in {pause:.0f}s.")
+                self._queues.setdefault(chat_id, deque()).appendleft(request)
+                return
+            self._resolve(request, error=e)
+        except Exception as e:
+            self._resolve(request, error=e)
+        except asyncio.CancelledError:
+            self._resolve(request, error=asyncio.CancelledError())
+            raise
+        else:
+            self._resolve(request, result=result)
+        finally:
+            self._in_flight.discard(chat_id)
+            self._wakeup.set()
+
+    @staticmethod
+    def _resolve(request: _Request, result: Any = None, error: Optional[BaseException] = None) -> None:
+        for waiter in request.waiters:
+            if waiter.done():
+                continue
+            if error is not None:
+                waiter.set_exception(error)
+            else:
+                waiter.set_result(result)
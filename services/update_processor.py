@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import os
+from typing import Any, Awaitable, Dict, Optional
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+from services import metrics
+
+logger = logging.getLogger(__name__)
+
+# --- Update Processing Configuration ---
+MAX_CONCURRENT_UPDATES = int(os.environ.get("BOT_CONCURRENT_UPDATES", "32"))  # Updates handled at once
+
+_UNBOUNDED = 2 ** 31 - 1  # Bound handed to PTB's semaphore; see ChatOrderedUpdateProcessor.__init__
+
+_current: Optional["ChatOrderedUpdateProcessor"] = None   # The running instance, for the metrics below
+metrics.Gauge(
+    "doraemon_updates_in_progress", "Updates being handled (holding one of the BOT_CONCURRENT_UPDATES slots).",
+    function=lambda: _current.current_concurrent_updates if _current else 0,
+)
+metrics.Gauge(
+    "doraemon_updates_waiting_chats", "Chats whose next update waits for an earlier one to finish.",
+    function=lambda: _current.waiting_chats if _current else 0,
+)
+
+
+class _ChatTurn:
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0  # Updates of this chat running or waiting; the entry is dropped at zero
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """
+    Handles up to max_concurrent_updates updates at once, but one chat's updates one at a time and
+    in arrival order. Users no longer wait behind each other's commands, while conversations
+    (/upload, /tool arguments) still see a chat's messages in the order they were sent.
+    An update only takes one of the slots once its chat's turn has come, so a backlog in one busy
+    chat (a group shares one chat id) cannot hold every slot and starve the other chats.
+    Handlers registered with block=False (the scheduled, expensive commands) run as their own
+    tasks, so they hold neither a slot nor their chat's turn while they wait or run.
+    """
+
+    __slots__ = ("_chats", "_limit", "_running", "_slots")
+
+    def __init__(self, max_concurrent_updates: int = MAX_CONCURRENT_UPDATES):
+        if max_concurrent_updates < 1:
+            raise ValueError("max_concurrent_updates must be a positive integer")
+        # PTB takes its own semaphore before do_process_update runs, i.e. before the chat's turn.
+        # The base class sizes it from the max_concurrent_updates property, so it is built while
+        # that still reports _UNBOUNDED; the real limit is the _slots semaphore below.
+        self._limit = _UNBOUNDED
+        super().__init__(_UNBOUNDED)
+        self._limit = max_concurrent_updates
+        self._slots = asyncio.Semaphore(max_concurrent_updates)
+        self._running = 0
+        self._chats: Dict[int, _ChatTurn] = {}
+
+    @property
+    def max_concurrent_updates(self) -> int:
+        return self._limit
+
+    @property
+    def current_concurrent_updates(self) -> int:
+        """Updates being handled right now, not counting those waiting for their chat's turn or a slot."""
+        return self._running
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        chat = update.effective_chat if isinstance(update, Update) else None
+        turn = None
+        if chat is not None:
+            turn = self._chats.get(chat.id)
+            if turn is None:
+                turn = self._chats[chat.id] = _ChatTurn()
+            turn.users += 1
+        try:
+            if turn is not None:
+                await turn.lock.acquire()
+            try:
+                async with self._slots:
+                    self._running += 1
+                    try:
+                        await coroutine
+                    finally:
+                        self._running -= 1
+            finally:
+                if turn is not None:
+                    turn.lock.release()
+        except BaseException:
+            coroutine.close()  # Never started if cancelled while waiting; a no-op once it has run
+            raise
+        finally:
+            if turn is not None:
+                turn.users -= 1
+                if not turn.users:
+                    del self._chats[chat.id]
+
+    @property
+    def waiting_chats(self) -> int:
+        """Chats with updates waiting for an earlier update of the same chat to finish."""
+        return sum(1 for turn in self._chats.values() if turn.users > 1)
+
+    async def initialize(self) -> None:
+        global _current
+        _current = self
+        logger.info(f"Handling up to {self.max_concurrent_updates} updates at once, one at a time per chat.")
+
+    async def shutdown(self) -> None:
+        global _current
+        if _current is self:
+            _current = None
@@ -0,0 +1,66 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict
+
+import whois
+
+from services.result_cache import result_cache
+
+# --- Configuration ---
+WHOIS_WORKERS = int(os.environ.get("WHOIS_WORKERS", "4"))           # Parallel WHOIS queries at most
+WHOIS_CACHE_TTL = int(os.environ.get("WHOIS_CACHE_TTL", "86400"))   # Seconds a parsed record is reused
+WHOIS_NEGATIVE_TTL = 3600                                           # "No public data" answers expire sooner
+
+# Second-level suffixes under which registrations happen one label deeper (example.co.uk).
+MULTI_PART_SUFFIXES = {
+    "co.uk", "org.uk", "ac.uk", "gov.uk", "com.au", "net.au", "org.au", "co.nz", "co.jp",
+    "co.in", "co.id", "co.za", "com.br", "com.cn", "com.tr", "com.mx", "com.sg", "com.my",
+}
+
+_executor = ThreadPoolExecutor(max_workers=WHOIS_WORKERS, thread_name_prefix="whois")
+
+
+def registrable_domain(domain: str) -> str:
+    """Reduces a host name to the part a registrar knows about (www.shop.example.co.uk -> example.co.uk)."""
+    labels = domain.lower().strip().rstrip(".").split(".")
+    if all(label.isdigit() for label in labels):
+        return ".".join(labels)  # IPv4 address, nothing to trim
+    keep = 3 if len(labels) > 2 and ".".join(labels[-2:]) in MULTI_PART_SUFFIXES else 2
+    return ".".join(labels[-keep:])
+
+
+def _format_value(value) -> str:
+    if isinstance(value, list):
+        return ", ".join(sorted(_format_value(v) for v in value))
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d')
+    return str(value)
+
+
+def _query(domain: str) -> Dict[str, str]:
+    """Blocking WHOIS query; runs on the worker pool. Returns only the fields the bot displays."""
+    w = whois.whois(domain)
+    if not w.domain_name:
+        return {}
+    fields = {
+        'Domain': w.domain_name, 'Registrar': w.registrar,
+        'Creation Date': w.creation_date, 'Expiration Date': w.expiration_date,
+        'Last Updated': w.updated_date, 'Name Servers': w.name_servers, 'Status': w.status,
+    }
+    return {key: _format_value(value) for key, value in fields.items() if value}
+
+
+async def lookup_whois(domain: str) -> Dict[str, str]:
+    """
+    Returns the parsed WHOIS record for the domain's registrable name ({} when there is no public data).
+    Records are kept in the shared result cache for WHOIS_CACHE_TTL seconds; query errors propagate and are not cached.
+    """
+    loop = asyncio.get_running_loop()
+    key = registrable_domain(domain)
+    return await result_cache.get_or_fetch(
+        "whois_record", key,
+        lambda: loop.run_in_executor(_executor, _query, key),
+        ttl=lambda record: WHOIS_CACHE_TTL if record else WHOIS_NEGATIVE_TTL,
+    )
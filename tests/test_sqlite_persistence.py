@@ -0,0 +1,28 @@
+import asyncio
+
+from services.sqlite_persistence import SQLitePersistence
+
+
+def test_never_refreshed_user_keeps_stored_keys_across_writes(tmp_path):
+    path = str(tmp_path / "persistence.sqlite3")
+
+    async def scenario():
+        first = SQLitePersistence(path)
+        await first.update_user_data(1, {"a": 1, "b": 2})
+        await first.flush()
+
+        # A fresh process writes user 1 without ever refreshing it, twice
+        second = SQLitePersistence(path)
+        data = {"c": 3}
+        await second.update_user_data(1, data)
+        data["c"] = 4
+        await second.update_user_data(1, data)
+        await second.flush()
+
+        third = SQLitePersistence(path)
+        stored = {}
+        await third.refresh_user_data(1, stored)
+        await third.flush()
+        return stored
+
+    assert asyncio.run(scenario()) == {"a": 1, "b": 2, "c": 4}
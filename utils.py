@@ -1,54 +1,57 @@
 # utils.py
 
-import re
 import shutil
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from typing import Sequence, Union
 from telegram import Update
+from telegram.constants import ParseMode
+from telegram.error import RetryAfter
 from telegram.ext import ContextTypes
 
+from services import message_chunker
+from services.job_scheduler import scheduler
+
 BOT_VERSION = "0.668-recondora"
 
 def escape_markdown_v2(text: str) -> str:
-    """Escapes string for Telegram's MarkdownV2 parser."""
-    if not isinstance(text, str):
-        text = str(text)
-    escape_chars = r'\_*[]()~`>#+-=|{}.!'
-    return re.sub(f'([{re.escape(escape_chars)}])', r'\\\1', text)
+    """Escapes string for Telegram's MarkdownV2 parser (single pass, backslashes included)."""
+    return message_chunker.escape(text, ParseMode.MARKDOWN_V2)
 
 def is_tool_installed(name: str) -> bool:
     """Checks whether a command-line tool is on PATH and executable."""
     return shutil.which(name) is not None
 
-async def send_long_message(update: Update, context: ContextTypes.DEFAULT_TYPE, text: str, **kwargs):
+def retry_after_seconds(error: RetryAfter) -> float:
+    """Returns RetryAfter's delay in seconds (PTB may report it as an int or a timedelta)."""
+    delay = error.retry_after
+    return delay.total_seconds() if isinstance(delay, timedelta) else float(delay)
+
+async def send_long_message(update: Update, context: ContextTypes.DEFAULT_TYPE,
+                            content: Union[str, Sequence[message_chunker.Block]], **kwargs):
     """
-    Sends a message, automatically splitting it into multiple parts if it exceeds
-    Telegram's character limit. Preserves kwargs for all parts.
+    Sends a message, splitting it into as many parts as Telegram's length limit requires.
+    content is either finished text in kwargs' parse_mode or a list of Markup/Pre blocks;
+    code blocks are closed and reopened across parts. Preserves kwargs for all parts.
     """
-    MAX_LENGTH = 4096
-    if len(text) <= MAX_LENGTH:
-        await update.message.reply_text(text=text, **kwargs)
-        return
+    chunks = message_chunker.chunk_message(content, kwargs.get('parse_mode'))
+    for index, part in enumerate(chunks):
+        if index == 0:
+            await update.message.reply_text(text=part, **kwargs)
+        else:
+            await context.bot.send_message(chat_id=update.effective_chat.id, text=part, **kwargs)
 
-    parts = []
-    while len(text) > 0:
-        if len(text) < MAX_LENGTH:
-            parts.append(text)
-            break
-        
-        split_pos = text.rfind('\n', 0, MAX_LENGTH)
-        if split_pos == -1:
-            split_pos = MAX_LENGTH
-            
-        parts.append(text[:split_pos])
-        text = text[split_pos:].lstrip()
+@asynccontextmanager
+async def scheduled_job(update: Update, kind: str):
+    """
+    Holds a fair-share scheduler slot for an expensive command, telling the user their
+    queue position if they have to wait. Raises QueueFullError if the job is refused.
+    """
+    async def on_queued(position: int) -> None:
+        await update.effective_message.reply_text(f"⏳ The server is busy. Your {kind} job is queued at position {position}.")
 
-    first_message_sent = False
-    for part in parts:
-        if part:
-            if not first_message_sent:
-                await update.message.reply_text(text=part, **kwargs)
-                first_message_sent = True
-            else:
-                await context.bot.send_message(chat_id=update.effective_chat.id, text=part, **kwargs)
+    async with scheduler.slot(update.effective_user.id, kind, on_queued):
+        yield
 
 def get_bot_branding() -> str:
     """Generates the bot's help and branding message."""
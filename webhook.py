@@ -0,0 +1,124 @@
+# webhook.py
+# Serves the Telegram webhook and the web UI (Web.app) from one hypercorn process and one event loop.
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import signal
+
+from hypercorn.asyncio import serve
+from hypercorn.config import Config
+from telegram import Update
+from telegram.ext import Application
+
+import Web
+from services import http_client
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+WEBHOOK_URL = os.environ.get("WEBHOOK_URL", "").rstrip("/")  # Public base URL, e.g. https://my-dyno.herokuapp.com
+WEBHOOK_PATH = "/telegram/webhook"
+PORT = int(os.environ.get("PORT", 8000))
+MAX_UPDATE_BYTES = 1024 * 1024
+
+
+def _secret_token(bot_token: str) -> str:
+    """Telegram echoes this in every webhook call so forged POSTs can be rejected."""
+    return os.environ.get("WEBHOOK_SECRET") or hashlib.sha256(bot_token.encode()).hexdigest()
+
+
+async def _respond(send, status: int, body: bytes = b"") -> None:
+    await send({"type": "http.response.start", "status": status, "headers": [(b"content-type", b"text/plain")]})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _handle_webhook(application: Application, secret: str, scope, receive, send) -> None:
+    if scope["method"] != "POST":
+        await _respond(send, 405, b"Method Not Allowed")
+        return
+    headers = dict(scope["headers"])
+    if headers.get(b"x-telegram-bot-api-secret-token", b"").decode() != secret:
+        await _respond(send, 403, b"Forbidden")
+        return
+
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if len(body) > MAX_UPDATE_BYTES:
+            await _respond(send, 413, b"Payload Too Large")
+            return
+        if not message.get("more_body"):
+            break
+
+    try:
+        update = Update.de_json(json.loads(body), application.bot)
+    except ValueError as e:
+        logger.warning(f"Rejected malformed webhook payload: {e}")
+        await _respond(send, 400, b"Bad Request")
+        return
+    # Answer Telegram immediately; the Application processes the update from its queue
+    await application.update_queue.put(update)
+    await _respond(send, 200)
+
+
+def create_asgi_app(application: Application):
+    """Routes WEBHOOK_PATH to the bot and everything else to the ASGI app from Web.py."""
+    secret = _secret_token(application.bot.token)
+
+    async def app(scope, receive, send):
+        if scope["type"] == "lifespan":
+            # The bot's lifecycle (and the shared HTTP pool) is driven by run_webhook(), so just
+            # acknowledge instead of running Web.app's own startup and shutdown.
+            while True:
+                message = await receive()
+                await send({"type": message["type"] + ".complete"})
+                if message["type"] == "lifespan.shutdown":
+                    return
+        elif scope["type"] == "http" and scope["path"] == WEBHOOK_PATH:
+            await _handle_webhook(application, secret, scope, receive, send)
+        elif scope["type"] == "http":
+            await Web.app(scope, receive, send)
+
+    return app
+
+
+async def run_webhook(application: Application) -> None:
+    """
+    Starts the Application, registers the webhook with Telegram and serves until SIGINT/SIGTERM.
+    Mirrors the lifecycle of Application.run_webhook(), including the post_* hooks.
+    """
+    shutdown_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, shutdown_event.set)
+
+    config = Config()
+    config.bind = [f"0.0.0.0:{PORT}"]
+    config.accesslog = None
+
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+    # Bind the shared HTTP pool to this loop so the web UI reuses it too
+    http_client.get_session()
+    await application.bot.set_webhook(
+        url=WEBHOOK_URL + WEBHOOK_PATH,
+        secret_token=_secret_token(application.bot.token),
+        allowed_updates=Update.ALL_TYPES,
+    )
+    await application.start()
+    logger.info(f"Webhook registered at {WEBHOOK_URL}{WEBHOOK_PATH}; serving bot and web UI on port {PORT}.")
+
+    try:
+        await serve(create_asgi_app(application), config, shutdown_trigger=shutdown_event.wait)
+    finally:
+        await application.stop()
+        if application.post_stop:
+            await application.post_stop(application)
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)